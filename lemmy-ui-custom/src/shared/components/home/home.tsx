@@ -121,6 +121,7 @@ interface HomeState {
   reportedPostIds: Set<number>; // CP reported posts (pre-fetched in SSR)
   membershipOnly: boolean; // Membership posts filter
   membershipPage: number; // Current page for membership posts (1-indexed)
+  membershipCursors: string[]; // next_page cursors of the pages visited so far
   isCurrentUserMember: boolean; // Whether current logged-in user has active membership
 }
 
@@ -259,6 +260,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
     reportedPostIds: new Set(), // Initialize empty, will be filled from isoData if available
     membershipOnly: false,
     membershipPage: 1,
+    membershipCursors: [],
     isCurrentUserMember: false,
   };
 
@@ -886,6 +888,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
           sort,
           this.state.membershipPage,
           listingType,
+          this.state.membershipCursors[this.state.membershipPage - 2],
         );
         if (token === this.fetchDataToken) {
           this.setState({ postsRes: membershipPostsRes });
@@ -936,6 +939,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
     sort: SortType,
     page: number,
     listingType?: ListingType,
+    pageCursor?: string,
   ): Promise<RequestState<GetPostsResponse>> {
     try {
       const baseUrl = `/api/membership/posts`;
@@ -945,6 +949,9 @@ export class Home extends Component<HomeRouteProps, HomeState> {
         limit: fetchLimit.toString(),
         type_: listingType ?? "Local",
       });
+      if (pageCursor) {
+        params.set("page_cursor", pageCursor);
+      }
       
       const url = `${baseUrl}?${params.toString()}`;
       console.log(`💰 [HOME] Fetching membership posts: ${url}`);
@@ -1002,7 +1009,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
       if (isMember && savedFilter) {
         // Member with default filter enabled → activate filter
         // fetchData will be called by componentWillMount after this returns
-        this.setState({ isCurrentUserMember: true, membershipOnly: true, membershipPage: 1 });
+        this.setState({ isCurrentUserMember: true, membershipOnly: true, membershipPage: 1, membershipCursors: [] });
       } else {
         this.setState({ isCurrentUserMember: isMember, membershipOnly: false });
       }
@@ -1039,7 +1046,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
   handleSortChange(val: SortType) {
     if (this.state.membershipOnly) {
       // Reset to page 1 and re-fetch with new sort
-      this.setState({ membershipPage: 1 }, () => {
+      this.setState({ membershipPage: 1, membershipCursors: [] }, () => {
         this.updateUrl({ sort: val, pageCursor: undefined });
       });
     } else {
@@ -1049,7 +1056,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
 
   handleListingTypeChange(val: ListingType) {
     if (this.state.membershipOnly) {
-      this.setState({ membershipPage: 1 }, () => {
+      this.setState({ membershipPage: 1, membershipCursors: [] }, () => {
         this.updateUrl({ listingType: val, pageCursor: undefined });
       });
     } else {
@@ -1072,7 +1079,7 @@ export class Home extends Component<HomeRouteProps, HomeState> {
     const newMembershipOnly = !this.state.membershipOnly;
     console.log(`💰 [HOME] Membership filter toggled: ${newMembershipOnly}`);
     this.setState(
-      { membershipOnly: newMembershipOnly, membershipPage: 1 },
+      { membershipOnly: newMembershipOnly, membershipPage: 1, membershipCursors: [] },
       () => {
         // Re-fetch data with the new membership filter state
         this.fetchData(this.props);
@@ -1081,9 +1088,13 @@ export class Home extends Component<HomeRouteProps, HomeState> {
   }
 
   handleMembershipPageNext() {
+    const cursor = this.getNextPage;
+    if (!cursor) return;
     const nextPage = this.state.membershipPage + 1;
     console.log(`💰 [HOME] Membership page next: ${nextPage}`);
-    this.setState({ membershipPage: nextPage }, () => {
+    const membershipCursors = this.state.membershipCursors.slice(0, nextPage - 2);
+    membershipCursors.push(cursor);
+    this.setState({ membershipPage: nextPage, membershipCursors }, () => {
       snapToTop();
       this.fetchData(this.props);
     });
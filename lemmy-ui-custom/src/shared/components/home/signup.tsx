@@ -29,6 +29,8 @@ import { RouteComponentProps } from "inferno-router/dist/Route";
 import { 
   computeProofOfWork, 
   getAdaptiveDifficulty,
+  createLocalChallenge,
+  fetchPowChallenge,
 } from "../../utils/proof-of-work";
 
 interface State {
@@ -606,14 +608,9 @@ export class Signup extends Component<
 
   async handleComputePoW(i: Signup) {
     try {
-      // 챌린지 생성 (타임스탬프 + 랜덤값)
-      // 이미 챌린지가 있다면 재사용 (중복 클릭 방지)
-      let challenge = i.state.powChallenge;
-      if (!challenge) {
-        const timestamp = Date.now();
-        const random = Math.random().toString(36).substring(2);
-        challenge = `${timestamp}-${random}`;
-      }
+      // 챌린지 준비: 서버 발급(서명된) 챌린지 사용, 조회 실패 시 기존 챌린지 재사용 또는 로컬 생성
+      const issued = await fetchPowChallenge('register');
+      let challenge = issued.challenge ?? i.state.powChallenge ?? createLocalChallenge();
       
       i.setState({ 
         powChallenge: challenge,
@@ -625,8 +622,9 @@ export class Signup extends Component<
       });
 
       // 기기 성능 감지 및 적응형 난이도 설정
+      // 서버가 요청 폭주로 난이도를 올린 상태면 서버 요구 난이도를 따름
       const adaptiveResult = await getAdaptiveDifficulty(i.state.powDifficulty);
-      const actualDifficulty = adaptiveResult.difficulty;
+      const actualDifficulty = Math.max(adaptiveResult.difficulty, issued.difficulty ?? 0);
       
       console.log(`[PoW] Using adaptive difficulty: ${actualDifficulty} (device: ${adaptiveResult.deviceType}, est: ${adaptiveResult.estimatedTime.toFixed(1)}s)`);
 
@@ -659,9 +657,7 @@ export class Signup extends Component<
           console.warn(`PoW 계산 시간 초과, 재시도 중... (${retryCount}/${maxRetries})`);
           toast(`계산 시간 초과, 재시도 중... (${retryCount}/${maxRetries})`, "info");
           
-          const timestamp = Date.now();
-          const random = Math.random().toString(36).substring(2);
-          challenge = `${timestamp}-${random}`;
+          challenge = (await fetchPowChallenge('register')).challenge ?? createLocalChallenge();
           
           i.setState({ 
             powChallenge: challenge,
@@ -193,6 +193,49 @@ export async function getAdaptiveDifficulty(baseDifficulty: number = 18): Promis
     estimatedTime
   };
 }
+/**
+ * 클라이언트 생성 챌린지 (타임스탬프 + 랜덤값)
+ * 서버 챌린지를 받지 못했을 때만 사용 — 서버가 서명된 챌린지만 허용하면 거부됨
+ */
+export function createLocalChallenge(): string {
+  const timestamp = Date.now();
+  const random = Math.random().toString(36).substring(2);
+  return `${timestamp}-${random}`;
+}
+
+/**
+ * 서버 발급 챌린지와 현재 요구 난이도 조회
+ * 챌린지는 HMAC 서명이 붙어 있어 서버가 위조 여부를 확인할 수 있으므로 이 챌린지로 계산한다.
+ * pow-validator는 요청률(엔드포인트별, IP 대역별)에 따라 요구 난이도를 올리므로
+ * 계산 직전에 조회해서 기기 기반 난이도와 비교해 큰 값을 사용한다.
+ * @param endpoint - 'register' | 'post' | 'comment'
+ * @returns 챌린지와 요구 난이도 (조회 실패 시 각각 undefined → 로컬 챌린지, 기기 기반 난이도만 사용)
+ */
+export async function fetchPowChallenge(
+  endpoint: 'register' | 'post' | 'comment'
+): Promise<{ challenge?: string; difficulty?: number }> {
+  const controller = new AbortController();
+  const timeout = setTimeout(() => controller.abort(), 3000);
+  try {
+    const response = await fetch(`/api/pow/challenge?endpoint=${endpoint}`, {
+      signal: controller.signal,
+    });
+    if (!response.ok) {
+      return {};
+    }
+    const data = await response.json();
+    return {
+      challenge: typeof data.challenge === 'string' ? data.challenge : undefined,
+      difficulty: typeof data.difficulty === 'number' ? data.difficulty : undefined,
+    };
+  } catch (error) {
+    console.warn('[PoW] Failed to fetch challenge:', error);
+    return {};
+  } finally {
+    clearTimeout(timeout);
+  }
+}
+
 /**
  * 댓글용 경량 PoW 계산
  * 댓글은 즉시성이 중요하므로 회원가입/게시글보다 낮은 난이도를 사용
@@ -204,15 +247,14 @@ export async function getAdaptiveDifficulty(baseDifficulty: number = 18): Promis
 export async function computeCommentPoW(
   onProgress?: (progress: number, attemptCount: number) => void
 ): Promise<{ challenge: string; nonce: number; hash: string; attempts: number; difficulty: number }> {
-  // 챌린지 생성 (타임스탬프 + 랜덤값)
-  const timestamp = Date.now();
-  const random = Math.random().toString(36).substring(2);
-  const challenge = `${timestamp}-${random}`;
+  // 서버 발급 챌린지 (실패 시 로컬 생성)
+  const issued = await fetchPowChallenge('comment');
+  const challenge = issued.challenge ?? createLocalChallenge();
 
   // 댓글용 적응형 난이도 (기본 15, 범위 13~15)
   const adaptiveResult = await getAdaptiveDifficulty(15);
-  // 댓글은 최소 13까지 허용 (저사양 기기 배려)
-  const difficulty = Math.max(13, adaptiveResult.difficulty);
+  // 댓글은 최소 13까지 허용 (저사양 기기 배려), 서버 요구 난이도가 더 높으면 그에 맞춤
+  const difficulty = Math.max(13, adaptiveResult.difficulty, issued.difficulty ?? 0);
 
   const result = await computeProofOfWork(challenge, difficulty, onProgress);
 
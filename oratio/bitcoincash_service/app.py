@@ -43,8 +43,8 @@ globals()['electron_cash'] = electron_cash
 # 한 번만 실행되도록 플래그 사용
 import os
 if os.environ.get('WERKZEUG_RUN_MAIN') != 'true' or os.environ.get('FLASK_ENV') != 'development':
-    # gunicorn 환경에서 워커당 한 번씩 실행됨
-    # 이는 정상이며, 각 워커가 독립적으로 백그라운드 체크를 수행
+    # gunicorn 환경에서 워커당 한 번씩 호출되지만,
+    # SQLite lease로 선출된 리더 워커 하나만 실제 작업을 실행함
     start_background_tasks()
 
 # 외부에서 사용할 수 있는 함수들 노출
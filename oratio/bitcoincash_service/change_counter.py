@@ -0,0 +1,42 @@
+"""
+Cross-process change counters
+=============================
+A tiny file holding an integer that writers bump after committing a change,
+so every gunicorn worker can tell with one small read whether its in-memory
+snapshot (CP blocklist, ad campaign index, ...) is stale.
+"""
+
+import os
+import fcntl
+import logging
+from typing import Optional
+
+logger = logging.getLogger('change_counter')
+
+
+def read_counter(path: str) -> int:
+    """Read a change counter (0 if it was never bumped)"""
+    try:
+        with open(path, 'r') as f:
+            raw = f.read().strip()
+        return int(raw) if raw.isdigit() else 0
+    except FileNotFoundError:
+        return 0
+
+
+def bump_counter(path: str) -> Optional[int]:
+    """Atomically increment a change counter; returns the new value or None on error"""
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            raw = f.read().strip()
+            version = int(raw) + 1 if raw.isdigit() else 1
+            f.seek(0)
+            f.write(str(version))
+            f.truncate()
+            f.flush()
+        return version
+    except OSError as e:
+        logger.error(f"Failed to bump change counter {path}: {e}")
+        return None
@@ -20,6 +20,13 @@ ELECTRON_CASH_URL = os.environ.get('ELECTRON_CASH_URL', 'http://electron-cash:77
 ELECTRON_CASH_USER = os.environ.get('ELECTRON_CASH_USER', 'bchrpc')
 ELECTRON_CASH_PASSWORD = os.environ.get('ELECTRON_CASH_PASSWORD', 'secure_password_change_me')
 EC_AVAILABLE = True  # Flag to indicate if Electron Cash is available
+EC_RPC_TIMEOUT = float(os.environ.get('EC_RPC_TIMEOUT', 10))  # RPC 요청 타임아웃 (초)
+EC_RPC_POOL_SIZE = int(os.environ.get('EC_RPC_POOL_SIZE', 8))  # keep-alive 연결 풀 크기
+EC_RPC_MAX_RETRIES = int(os.environ.get('EC_RPC_MAX_RETRIES', 2))  # 연결 오류/5xx 재시도 횟수
+EC_RPC_BACKOFF_BASE = float(os.environ.get('EC_RPC_BACKOFF_BASE', 0.2))  # 지수 백오프 시작값 (초)
+EC_RPC_BACKOFF_MAX = float(os.environ.get('EC_RPC_BACKOFF_MAX', 5))  # 지수 백오프 상한 (초)
+EC_BREAKER_THRESHOLD = int(os.environ.get('EC_BREAKER_THRESHOLD', 5))  # 연속 실패 시 회로 차단
+EC_BREAKER_COOLDOWN = float(os.environ.get('EC_BREAKER_COOLDOWN', 30))  # 회로 차단 유지 시간 (초)
 
 # Bitcoin Cash configuration
 # Zero-Confirmation 설정 (0으로 설정하면 즉시 수락)
@@ -34,6 +41,12 @@ ZERO_CONF_DELAY_SECONDS = int(os.environ.get('ZERO_CONF_DELAY_SECONDS', 5))  # 
 ZERO_CONF_MIN_FEE_PERCENT = int(os.environ.get('ZERO_CONF_MIN_FEE_PERCENT', 50))  # 최소 수수료율 (기본값의 몇 %, 50% = 0.5 sat/byte)
 ZERO_CONF_DOUBLE_SPEND_CHECK = os.environ.get('ZERO_CONF_DOUBLE_SPEND_CHECK', 'true').lower() == 'true'  # 이중지불 체크 활성화
 
+# 결제 주소 알림 설정 (ElectronCash `notify` → 주소 상태 변경 시 이 서비스로 POST)
+PAYMENT_NOTIFY_ENABLED = os.environ.get('PAYMENT_NOTIFY_ENABLED', 'true').lower() == 'true'
+PAYMENT_NOTIFY_CALLBACK_URL = os.environ.get('PAYMENT_NOTIFY_CALLBACK_URL', 'http://bitcoincash-service:8081/api/internal/address_notify')
+PAYMENT_FALLBACK_POLL_INTERVAL = int(os.environ.get('PAYMENT_FALLBACK_POLL_INTERVAL', 60))  # 알림 사용 시 안전망 폴링 간격 (초)
+PAYMENT_NOTIFY_RETRY_INTERVAL = int(os.environ.get('PAYMENT_NOTIFY_RETRY_INTERVAL', 300))  # notify 거부 후 재등록 시도까지 대기 (초, 연속 실패 시 2배씩 최대 1시간)
+
 # Application settings
 MOCK_MODE = os.environ.get('MOCK_MODE', 'false').lower() == 'true'
 TESTNET = os.environ.get('TESTNET', 'false').lower() == 'true'
@@ -46,3 +59,5 @@ LEMMY_API_URL = os.environ.get('LEMMY_API_URL', 'http://lemmy:8536')
 LEMMY_API_KEY = os.environ.get('LEMMY_API_KEY', 'changeme')
 LEMMY_ADMIN_USER = os.environ.get('LEMMY_ADMIN_USER', '')
 LEMMY_ADMIN_PASS = os.environ.get('LEMMY_ADMIN_PASS', '')
+# Lemmy's JWT signing secret (optional). When set, jwt cookies are signature-verified; otherwise they are only decoded
+LEMMY_JWT_SECRET = os.environ.get('LEMMY_JWT_SECRET', '')
@@ -0,0 +1,302 @@
+"""
+Shared database connection pools
+=================================
+Reusable SQLite and PostgreSQL connections for the whole service.
+
+Callers keep the existing `conn = get_xxx(); ...; conn.close()` pattern:
+the objects handed out here are thin wrappers whose close() returns the
+underlying connection to the pool instead of closing it.
+
+- SQLite: each thread keeps a few idle connections per database file.
+  WAL, synchronous=NORMAL and the other pragmas are applied once when the
+  connection is created, not on every checkout.
+- PostgreSQL: one psycopg2 ThreadedConnectionPool per connection config.
+  Checkout blocks (bounded by PG_POOL_WAIT_TIMEOUT) instead of raising
+  when the pool is exhausted.
+
+get_pool_stats() reports hit/miss counts and checkout wait times.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('db_pool')
+
+SQLITE_MAX_IDLE_PER_THREAD = int(os.environ.get('SQLITE_POOL_MAX_IDLE', 2))
+PG_POOL_MIN = int(os.environ.get('PG_POOL_MIN', 1))
+PG_POOL_MAX = int(os.environ.get('PG_POOL_MAX', 5))
+PG_POOL_WAIT_TIMEOUT = float(os.environ.get('PG_POOL_WAIT_TIMEOUT', 10))
+
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",  # 8 MB page cache per connection
+    "PRAGMA mmap_size=67108864",  # 64 MB
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'sqlite': {'hits': 0, 'misses': 0, 'discarded': 0},
+    'postgres': {'hits': 0, 'misses': 0, 'discarded': 0, 'waits': 0,
+                 'wait_time_total': 0.0, 'wait_time_max': 0.0, 'timeouts': 0},
+}
+
+
+def _count(kind: str, key: str, amount=1):
+    with _stats_lock:
+        _stats[kind][key] += amount
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Return a snapshot of pool counters (for health/metrics endpoints)"""
+    with _stats_lock:
+        stats = {kind: dict(values) for kind, values in _stats.items()}
+    with _pg_pools_lock:
+        stats['postgres']['pools'] = len(_pg_pools)
+        stats['postgres']['in_use'] = sum(len(p._pool._used) for p in _pg_pools.values())
+    return stats
+
+
+# ==========================================
+# SQLite
+# ==========================================
+
+class PooledSQLiteConnection:
+    """sqlite3.Connection proxy whose close() hands the connection back to the pool"""
+
+    def __init__(self, conn: sqlite3.Connection, path: str):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_path', path)
+        object.__setattr__(self, '_owner', threading.get_ident())
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.row_factory = sqlite3.Row
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, '_conn', None)
+        if threading.get_ident() != self._owner:
+            # sqlite3 connections are bound to the creating thread; let GC drop it
+            _count('sqlite', 'discarded')
+            return
+        _release_sqlite(self._path, conn)
+
+    def __del__(self):
+        # Connections that callers forget to close still go back to the pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+_sqlite_local = threading.local()
+
+
+def _sqlite_idle(path: str) -> list:
+    pid = os.getpid()
+    if getattr(_sqlite_local, 'pid', None) != pid:
+        # Never reuse connections inherited across fork()
+        _sqlite_local.pid = pid
+        _sqlite_local.idle = {}
+    return _sqlite_local.idle.setdefault(path, [])
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection that remembers the per-checkout pragma state"""
+    _pool_foreign_keys = False
+
+
+def _open_sqlite(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, factory=_Connection)
+    for pragma in _SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _release_sqlite(path: str, conn: sqlite3.Connection):
+    try:
+        if conn.in_transaction:
+            conn.rollback()  # same outcome as closing without commit
+        conn.row_factory = None
+        idle = _sqlite_idle(path)
+        if len(idle) < SQLITE_MAX_IDLE_PER_THREAD:
+            idle.append(conn)
+            return
+    except sqlite3.Error as e:
+        logger.warning(f"Discarding broken SQLite connection: {e}")
+    _count('sqlite', 'discarded')
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def get_sqlite_connection(path: str, foreign_keys: bool = False) -> PooledSQLiteConnection:
+    """Check out a SQLite connection for the calling thread.
+
+    Args:
+        path: Database file
+        foreign_keys: Enable PRAGMA foreign_keys for this checkout
+    """
+    idle = _sqlite_idle(path)
+    if idle:
+        conn = idle.pop()
+        _count('sqlite', 'hits')
+    else:
+        conn = _open_sqlite(path)
+        _count('sqlite', 'misses')
+
+    if conn._pool_foreign_keys != foreign_keys:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+        conn._pool_foreign_keys = foreign_keys
+    return PooledSQLiteConnection(conn, path)
+
+
+# ==========================================
+# PostgreSQL
+# ==========================================
+
+class _BlockingPool:
+    """ThreadedConnectionPool that waits for a free connection instead of raising"""
+
+    def __init__(self, config: Dict[str, Any]):
+        from psycopg2.pool import ThreadedConnectionPool
+        self._pool = ThreadedConnectionPool(PG_POOL_MIN, PG_POOL_MAX, **config)
+        self._slots = threading.BoundedSemaphore(PG_POOL_MAX)
+        self._pid = os.getpid()
+
+    def getconn(self):
+        if not self._slots.acquire(blocking=False):
+            _count('postgres', 'waits')
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=PG_POOL_WAIT_TIMEOUT)
+            waited = time.monotonic() - started
+            with _stats_lock:
+                _stats['postgres']['wait_time_total'] += waited
+                _stats['postgres']['wait_time_max'] = max(_stats['postgres']['wait_time_max'], waited)
+            if not acquired:
+                _count('postgres', 'timeouts')
+                raise TimeoutError(f"No PostgreSQL connection available after {PG_POOL_WAIT_TIMEOUT}s")
+        try:
+            reused = len(self._pool._pool) > 0
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        _count('postgres', 'hits' if reused else 'misses')
+        return conn
+
+    def putconn(self, conn):
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                # Leave no transaction open on an idle connection
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            _count('postgres', 'discarded')
+        try:
+            self._pool.putconn(conn, close=broken)
+        finally:
+            self._slots.release()
+
+
+class PooledPGConnection:
+    """psycopg2 connection proxy whose close() hands the connection back to the pool"""
+
+    def __init__(self, conn, pool: _BlockingPool):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_pool', pool)
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            import psycopg2
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    @property
+    def closed(self):
+        return 1 if self._conn is None else self._conn.closed
+
+    def close(self):
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, '_conn', None)
+        if conn.autocommit:
+            conn.autocommit = False
+        self._pool.putconn(conn)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+_pg_pools: Dict[tuple, _BlockingPool] = {}
+_pg_pools_lock = threading.Lock()
+
+
+def lemmy_pg_config() -> Dict[str, Any]:
+    """Lemmy PostgreSQL connection settings from the environment"""
+    return {
+        'host': os.environ.get('POSTGRES_HOST', 'postgres'),
+        'port': int(os.environ.get('POSTGRES_PORT', 5432)),
+        'user': os.environ.get('POSTGRES_USER', 'lemmy'),
+        'password': os.environ.get('POSTGRES_PASSWORD', ''),
+        'dbname': os.environ.get('POSTGRES_DB', 'lemmy'),
+    }
+
+
+def get_pg_connection(config: Optional[Dict[str, Any]] = None) -> PooledPGConnection:
+    """Check out a PostgreSQL connection (defaults to the Lemmy database).
+
+    Args:
+        config: psycopg2.connect keyword arguments; one pool is kept per distinct config
+    """
+    config = dict(config or lemmy_pg_config())
+    if 'database' in config:
+        config['dbname'] = config.pop('database')
+    key = tuple(sorted(config.items()))
+
+    with _pg_pools_lock:
+        pool = _pg_pools.get(key)
+        if pool is None or pool._pid != os.getpid():
+            pool = _BlockingPool(config)
+            _pg_pools[key] = pool
+    return PooledPGConnection(pool.getconn(), pool)
@@ -1,9 +1,142 @@
 """JWT 토큰 처리 유틸리티"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
-from flask import request
-from config import logger
+from flask import request, g
+from config import logger, LEMMY_JWT_SECRET
 from typing import Optional, Dict
 
+# 토큰 해시 → 디코드된 claim LRU 캐시 (워커 프로세스 단위)
+_TOKEN_CACHE_MAX = 4096
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+# person_id → (username, 만료 시각) 캐시
+_USERNAME_TTL_SECONDS = 600
+_USERNAME_MISS_TTL_SECONDS = 30  # 조회 실패도 잠시 캐시해서 Lemmy 장애 시 매 요청 HTTP 호출 방지
+_username_cache = {}
+_username_cache_lock = threading.Lock()
+
+_ADMIN_PERSON_ID = 1  # Lemmy 관리자는 항상 person_id = 1
+
+
+def _token_key(jwt_token: str) -> str:
+    return hashlib.sha256(jwt_token.encode('utf-8')).hexdigest()
+
+
+def _decode_token(jwt_token: str) -> Optional[Dict]:
+    """
+    JWT를 디코드하고 결과를 토큰 해시 기준 LRU 캐시에 저장
+    
+    LEMMY_JWT_SECRET이 설정되어 있으면 서명까지 검증하고,
+    없으면 기존처럼 서명 검증 없이 디코드 (서명 검증은 lemmy 서버에서 이미 했음)
+    
+    Returns:
+        dict or None: {'person_id': int, 'exp': int or None}, 실패 시 None
+    """
+    key = _token_key(jwt_token)
+    now = time.time()
+    
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            if cached['exp'] is None or cached['exp'] > now:
+                _token_cache.move_to_end(key)
+                return cached
+            del _token_cache[key]
+    
+    try:
+        if LEMMY_JWT_SECRET:
+            decoded = jwt.decode(jwt_token, LEMMY_JWT_SECRET, algorithms=['HS256'])
+        else:
+            decoded = jwt.decode(jwt_token, options={"verify_signature": False})
+    except jwt.PyJWTError as e:
+        logger.error(f"JWT 디코드 실패: {str(e)}")
+        return None
+    
+    # Lemmy JWT 구조: {"sub": person_id, "iss": "lemmy", "iat": timestamp}
+    # 'sub'는 int 또는 str일 수 있으므로 int로 정규화
+    person_id = decoded.get('sub')
+    if isinstance(person_id, str):
+        person_id = int(person_id) if person_id.isdigit() else None
+    if not isinstance(person_id, int):
+        logger.warning("JWT에 유효한 'sub' 필드가 없음")
+        return None
+    
+    claims = {'person_id': person_id, 'exp': decoded.get('exp')}
+    with _token_cache_lock:
+        _token_cache[key] = claims
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+    return claims
+
+
+def get_cached_username(person_id: int) -> Optional[str]:
+    """
+    person_id로 username 조회 (만료 시간이 있는 캐시 사용)
+    
+    재방문 사용자는 Lemmy HTTP 호출 없이 캐시에서 바로 반환
+    """
+    now = time.time()
+    with _username_cache_lock:
+        cached = _username_cache.get(person_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
+    username = get_username_from_lemmy(person_id)
+    ttl = _USERNAME_TTL_SECONDS if username else _USERNAME_MISS_TTL_SECONDS
+    with _username_cache_lock:
+        _username_cache[person_id] = (username, now + ttl)
+    return username
+
+
+def resolve_identity(jwt_token: Optional[str] = None, with_username: bool = False) -> Optional[Dict]:
+    """
+    요청의 JWT로 사용자 신원을 확인 (모든 blueprint 공용)
+    
+    같은 요청 안에서는 flask.g에 결과를 저장해서 한 번만 계산하고,
+    디코드 결과는 토큰 해시 기준 LRU 캐시를, username은 TTL 캐시를 사용
+    
+    Args:
+        jwt_token: 확인할 토큰 (없으면 쿠키의 jwt 사용)
+        with_username: True면 username도 채움 (필요할 때만 Lemmy 조회)
+    
+    Returns:
+        dict or None: {'person_id': int, 'username': str or None,
+                       'is_admin': bool, 'is_moderator': bool}, 토큰이 없거나 잘못되면 None
+    """
+    if jwt_token is None:
+        jwt_token = request.cookies.get('jwt')
+    if not jwt_token:
+        return None
+    
+    scoped = g.get('_identity')
+    if scoped is not None and scoped[0] == jwt_token:
+        identity = scoped[1]
+    else:
+        claims = _decode_token(jwt_token)
+        if claims is None:
+            return None
+        person_id = claims['person_id']
+        
+        # Lemmy 커뮤니티 모더레이터 여부는 CP 블록리스트 스냅샷에서 확인 (DB 조회 없음)
+        from middleware.cp_post_blocker import is_lemmy_community_moderator
+        identity = {
+            'person_id': person_id,
+            'username': None,
+            'is_admin': person_id == _ADMIN_PERSON_ID,
+            'is_moderator': is_lemmy_community_moderator(person_id),
+        }
+        g._identity = (jwt_token, identity)
+    
+    if with_username and identity['username'] is None:
+        identity['username'] = get_cached_username(identity['person_id'])
+    return identity
+
 
 def extract_user_info_from_jwt() -> Optional[Dict[str, str]]:
     """
@@ -14,37 +147,25 @@ def extract_user_info_from_jwt() -> Optional[Dict[str, str]]:
     """
     try:
         # 쿠키에서 jwt 토큰 가져오기 (lemmy-ui가 사용하는 쿠키 이름)
-        jwt_token = request.cookies.get('jwt')
-        
-        if not jwt_token:
+        if not request.cookies.get('jwt'):
             logger.debug("JWT 토큰이 쿠키에 없음")
             return None
         
-        # JWT 디코드 (검증 없이 - 서명 검증은 lemmy 서버에서 이미 했음)
-        # Lemmy의 JWT는 HS256 알고리즘을 사용하지만, 여기서는 검증 없이 디코드만 함
-        decoded = jwt.decode(jwt_token, options={"verify_signature": False})
-        
-        # Lemmy JWT 구조: {"sub": person_id, "iss": "lemmy", "iat": timestamp}
-        person_id = decoded.get('sub')
-        
-        if not person_id:
-            logger.warning("JWT에 'sub' 필드가 없음")
+        identity = resolve_identity(with_username=True)
+        if not identity:
             return None
         
-        # person_id로 username 조회
-        username = get_username_from_lemmy(person_id)
+        person_id = identity['person_id']
+        username = identity['username']
         
         user_info = {
             'person_id': str(person_id),
             'username': username or f"User#{person_id}"
         }
         
-        logger.info(f"JWT에서 사용자 정보 추출 성공: person_id={person_id}, username={username}")
+        logger.debug(f"JWT에서 사용자 정보 추출 성공: person_id={person_id}, username={username}")
         return user_info
             
-    except jwt.DecodeError as e:
-        logger.error(f"JWT 디코드 실패: {str(e)}")
-        return None
     except Exception as e:
         logger.error(f"JWT 처리 중 예외 발생: {str(e)}")
         return None
@@ -6,10 +6,17 @@ This module provides an endpoint that nginx can call to verify if a post should
 """
 
 from flask import Blueprint, request, jsonify
-import sqlite3
 import logging
 import os
 import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from services.cp_moderation import get_cp_blocklist_version
+from jwt_utils import resolve_identity
+from db_pool import get_sqlite_connection, get_pg_connection
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,8 @@ cp_blocker_bp = Blueprint('cp_blocker', __name__)
 
 DB_PATH = os.environ.get('PAYMENT_DB_PATH', '/data/payments.db')
 
+_POST_URI_RE = re.compile(r'^/post/(\d+)')
+
 
 def get_lemmy_db_password():
     """Read PostgreSQL password from lemmy.hjson config file.
@@ -53,147 +62,186 @@ LEMMY_DB_USER = os.environ.get('POSTGRES_USER', 'lemmy')
 LEMMY_DB_PASS = get_lemmy_db_password()
 LEMMY_DB_NAME = os.environ.get('POSTGRES_DB', 'lemmy')
 
-# In-memory cache for blocked post IDs (refreshed every 5 seconds)
-_blocked_cache = {'post_ids': set(), 'timestamp': 0}
-# Cache for moderator-accessible posts (pending review at moderator level)
-_mod_accessible_cache = {'post_ids': set(), 'timestamp': 0}
-# Cache for Lemmy community moderators (person_ids)
-_lemmy_mods_cache = {'person_ids': set(), 'timestamp': 0}
-_CACHE_TTL = 5  # seconds
-
 
 def get_lemmy_db_connection():
-    """Get PostgreSQL connection to Lemmy database"""
-    import psycopg2
-    return psycopg2.connect(
-        host=LEMMY_DB_HOST,
-        user=LEMMY_DB_USER,
-        password=LEMMY_DB_PASS,
-        dbname=LEMMY_DB_NAME
-    )
+    """Get pooled PostgreSQL connection to Lemmy database"""
+    return get_pg_connection({
+        'host': LEMMY_DB_HOST,
+        'user': LEMMY_DB_USER,
+        'password': LEMMY_DB_PASS,
+        'dbname': LEMMY_DB_NAME,
+    })
+
+
+# ==========================================
+# Blocklist Snapshot
+# ==========================================
+#
+# Every /post/<id> page view goes through nginx auth_request, so the decision
+# must not touch SQLite or PostgreSQL. Each worker keeps one immutable snapshot
+# and swaps it atomically. The CP part is rebuilt only when the change counter
+# bumped by services/cp_moderation.py moves. The Lemmy moderator set changes
+# outside our control, so it is refreshed in a background thread every
+# _MODERATORS_REFRESH_SECONDS while the current snapshot keeps being served.
+
+_MODERATORS_REFRESH_SECONDS = int(os.environ.get('CP_BLOCKER_MODERATORS_REFRESH', 60))
+
+
+class BlocklistSnapshot:
+    """Immutable view of everything the access check needs"""
+
+    __slots__ = ('version', 'blocked_post_ids', 'creator_map',
+                 'mod_accessible_post_ids', 'moderator_ids', 'moderators_loaded_at')
+
+    def __init__(self, version, blocked_post_ids, creator_map,
+                 mod_accessible_post_ids, moderator_ids, moderators_loaded_at):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'blocked_post_ids', frozenset(blocked_post_ids))
+        object.__setattr__(self, 'creator_map', MappingProxyType(dict(creator_map)))
+        object.__setattr__(self, 'mod_accessible_post_ids', frozenset(mod_accessible_post_ids))
+        object.__setattr__(self, 'moderator_ids', frozenset(moderator_ids))
+        object.__setattr__(self, 'moderators_loaded_at', moderators_loaded_at)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BlocklistSnapshot is immutable")
+
+    def with_moderators(self, moderator_ids, loaded_at):
+        """Copy of this snapshot with a new Lemmy moderator set"""
+        return BlocklistSnapshot(self.version, self.blocked_post_ids, self.creator_map,
+                                 self.mod_accessible_post_ids, moderator_ids, loaded_at)
+
+
+# version=-1 forces a full build on the first request
+_snapshot = BlocklistSnapshot(-1, (), {}, (), (), 0)
+_rebuild_lock = threading.Lock()
+_moderators_refresh_lock = threading.Lock()
+
+
+def _load_cp_blocklist():
+    """Read blocked posts, their creators and mod-accessible posts in one query"""
+    conn = get_sqlite_connection(DB_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT content_id, creator_person_id, escalation_level, status FROM cp_reports
+            WHERE content_type = 'post' AND content_hidden = 1
+        ''')
+        blocked, creators, mod_accessible = set(), {}, set()
+        for content_id, creator_person_id, escalation_level, status in cursor.fetchall():
+            blocked.add(content_id)
+            creators[content_id] = creator_person_id
+            if escalation_level == 'moderator' and status == 'pending':
+                mod_accessible.add(content_id)
+        return blocked, creators, mod_accessible
+    finally:
+        conn.close()
+
+
+def _load_lemmy_moderators():
+    """Get all person_ids who moderate any community in Lemmy"""
+    pg_conn = get_lemmy_db_connection()
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute('SELECT DISTINCT person_id FROM community_moderator')
+        return set(row[0] for row in pg_cursor.fetchall())
+    finally:
+        pg_conn.close()
+
+
+def _refresh_moderators():
+    """Background refresh of the Lemmy moderator set (never blocks a request)"""
+    global _snapshot
+    try:
+        try:
+            mod_ids = _load_lemmy_moderators()
+            logger.info(f"📋 [CP POST BLOCKER] Refreshed Lemmy mods cache: {len(mod_ids)} moderators")
+        except Exception as e:
+            logger.error(f"Error fetching Lemmy moderators: {e}")
+            mod_ids = None  # keep serving the old set, retry after the next interval
+        with _rebuild_lock:
+            current = _snapshot
+            _snapshot = current.with_moderators(
+                current.moderator_ids if mod_ids is None else mod_ids, time.time())
+    finally:
+        _moderators_refresh_lock.release()
+
+
+def _rebuild_snapshot(version):
+    """Rebuild the CP part of the snapshot for the given change counter value"""
+    global _snapshot
+    with _rebuild_lock:
+        current = _snapshot
+        if current.version == version:
+            return current  # another thread already rebuilt it
+        try:
+            blocked, creators, mod_accessible = _load_cp_blocklist()
+        except Exception as e:
+            logger.error(f"Error fetching blocked post IDs: {e}")
+            return current  # serve the stale snapshot, retry on the next request
+
+        moderator_ids, loaded_at = current.moderator_ids, current.moderators_loaded_at
+        if current.version == -1:
+            # First build: load moderators inline so mods aren't denied right after startup
+            try:
+                moderator_ids, loaded_at = _load_lemmy_moderators(), time.time()
+            except Exception as e:
+                logger.error(f"Error fetching Lemmy moderators: {e}")
+
+        _snapshot = BlocklistSnapshot(version, blocked, creators, mod_accessible,
+                                      moderator_ids, loaded_at)
+        logger.info(f"📋 [CP POST BLOCKER] Snapshot v{version}: {len(blocked)} blocked, "
+                    f"{len(mod_accessible)} mod-accessible, {len(moderator_ids)} moderators")
+        return _snapshot
+
+
+def get_blocklist_snapshot() -> BlocklistSnapshot:
+    """Return the current snapshot, rebuilding it only if the change counter moved.
+    
+    Steady-state cost is one tiny file read - no SQLite or PostgreSQL round-trip.
+    """
+    snapshot = _snapshot
+    try:
+        version = get_cp_blocklist_version()
+    except OSError as e:
+        logger.error(f"Error reading CP blocklist version: {e}")
+        version = snapshot.version if snapshot.version != -1 else 0
+    if version != snapshot.version:
+        snapshot = _rebuild_snapshot(version)
+
+    if (time.time() - snapshot.moderators_loaded_at >= _MODERATORS_REFRESH_SECONDS
+            and _moderators_refresh_lock.acquire(blocking=False)):
+        threading.Thread(target=_refresh_moderators, daemon=True).start()
+    return snapshot
 
 
 def is_lemmy_community_moderator(person_id: int) -> bool:
     """Check if person_id is a moderator of ANY community in Lemmy.
     
-    Uses cache with 5-second TTL. Checks Lemmy's community_moderator table.
-    
     Moderator access logic:
     1. If user is in Lemmy's community_moderator table → allowed (default)
     2. Admin can explicitly revoke by setting cp_review_revoked=1 in our DB
     
     Note: can_review_cp=0 is the default value for all users, so we DON'T use
-    it to block. Instead we check cp_review_revoked flag (if it exists).
+    it to block. For now we trust Lemmy's community_moderator as the source of truth.
     """
-    import time
-    now = time.time()
-    
-    # First check Lemmy's community_moderator table
-    # Refresh cache if stale
-    if now - _lemmy_mods_cache['timestamp'] >= _CACHE_TTL:
-        try:
-            pg_conn = get_lemmy_db_connection()
-            pg_cursor = pg_conn.cursor()
-            # Get all unique person_ids who are moderators of any community
-            pg_cursor.execute('SELECT DISTINCT person_id FROM community_moderator')
-            mod_ids = set(row[0] for row in pg_cursor.fetchall())
-            pg_conn.close()
-            
-            _lemmy_mods_cache['person_ids'] = mod_ids
-            _lemmy_mods_cache['timestamp'] = now
-            logger.info(f"📋 [CP POST BLOCKER] Refreshed Lemmy mods cache: {len(mod_ids)} moderators")
-        except Exception as e:
-            logger.error(f"Error fetching Lemmy moderators: {e}")
-    
-    # Check if user is a Lemmy community moderator
-    is_mod = person_id in _lemmy_mods_cache['person_ids']
-    
-    if not is_mod:
-        return False
-    
-    # User is a Lemmy mod - now check if admin explicitly revoked their CP review permission
-    # We use can_review_cp=0 ONLY if the user record exists AND was explicitly set by admin
-    # For now, we'll trust Lemmy's community_moderator as the source of truth
-    # Admin revocation can be implemented later with a separate cp_review_revoked column
-    
-    logger.info(f"✅ [CP POST BLOCKER] person_id={person_id} is a Lemmy community moderator")
-    return True
-
-# In-memory cache for blocked post IDs (refreshed every 5 seconds)
-_blocked_cache = {'post_ids': set(), 'timestamp': 0}
-# Cache for moderator-accessible posts (pending review at moderator level)
-_mod_accessible_cache = {'post_ids': set(), 'timestamp': 0}
-# Cache for blocked post creator person_ids {post_id: creator_person_id}
-_blocked_creator_cache = {'mapping': {}, 'timestamp': 0}
-_CACHE_TTL = 5  # seconds
+    return person_id in get_blocklist_snapshot().moderator_ids
 
 
 def get_blocked_post_creator_map():
     """Get mapping of blocked post_id -> creator_person_id.
     
     Used to explicitly block the creator from accessing their own reported post.
-    Uses in-memory cache with 5-second TTL.
     """
-    import time
-    now = time.time()
-    
-    if now - _blocked_creator_cache['timestamp'] < _CACHE_TTL:
-        return _blocked_creator_cache['mapping']
-    
-    try:
-        conn = sqlite3.connect(DB_PATH, timeout=30)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT content_id, creator_person_id FROM cp_reports
-            WHERE content_type = 'post' AND content_hidden = 1
-        ''')
-        mapping = {row[0]: row[1] for row in cursor.fetchall()}
-        conn.close()
-        
-        _blocked_creator_cache['mapping'] = mapping
-        _blocked_creator_cache['timestamp'] = now
-        return mapping
-    except Exception as e:
-        logger.error(f"Error fetching blocked post creators: {e}")
-        return _blocked_creator_cache['mapping'] if _blocked_creator_cache['mapping'] else {}
+    return get_blocklist_snapshot().creator_map
+
 
 def get_blocked_post_ids():
-    """Get list of post IDs that should be blocked (content_hidden=1)
-    
-    Uses in-memory cache with 5-second TTL to minimize DB queries.
-    Critical for nginx auth_request performance.
-    """
-    import time
-    now = time.time()
-    
-    # Return cached result if fresh
-    if now - _blocked_cache['timestamp'] < _CACHE_TTL:
-        return _blocked_cache['post_ids']
-    
-    try:
-        conn = sqlite3.connect(DB_PATH, timeout=30)
-        cursor = conn.cursor()
-        # OPTIMIZED: Use DISTINCT to avoid duplicates from multiple reports
-        cursor.execute('''
-            SELECT DISTINCT content_id FROM cp_reports 
-            WHERE content_type = 'post' AND content_hidden = 1
-        ''')
-        post_ids = set(row[0] for row in cursor.fetchall())
-        conn.close()
-        
-        # Update cache
-        _blocked_cache['post_ids'] = post_ids
-        _blocked_cache['timestamp'] = now
-        
-        return post_ids
-    except Exception as e:
-        logger.error(f"Error fetching blocked post IDs: {e}")
-        # Return stale cache if available, otherwise empty set
-        return _blocked_cache['post_ids'] if _blocked_cache['post_ids'] else set()
+    """Get set of post IDs that should be blocked (content_hidden=1)"""
+    return get_blocklist_snapshot().blocked_post_ids
 
 
 def get_mod_accessible_post_ids():
-    """Get list of post IDs that moderators can still access.
+    """Get set of post IDs that moderators can still access.
     
     Moderators can ONLY access posts that are:
     - content_hidden = 1 (reported)
@@ -203,194 +251,77 @@ def get_mod_accessible_post_ids():
     Once a moderator confirms CP (escalation_level becomes 'admin'), 
     moderators can NO LONGER access the post. Only admin can.
     """
-    import time
-    now = time.time()
-    
-    # Return cached result if fresh
-    if now - _mod_accessible_cache['timestamp'] < _CACHE_TTL:
-        return _mod_accessible_cache['post_ids']
-    
-    try:
-        conn = sqlite3.connect(DB_PATH, timeout=30)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT content_id FROM cp_reports 
-            WHERE content_type = 'post' 
-              AND content_hidden = 1 
-              AND escalation_level = 'moderator'
-              AND status = 'pending'
-        ''')
-        post_ids = set(row[0] for row in cursor.fetchall())
-        conn.close()
-        
-        # Update cache
-        _mod_accessible_cache['post_ids'] = post_ids
-        _mod_accessible_cache['timestamp'] = now
-        
-        logger.info(f"📋 [CP POST BLOCKER] Mod-accessible posts (pending at moderator level): {post_ids}")
-        return post_ids
-    except Exception as e:
-        logger.error(f"Error fetching mod-accessible post IDs: {e}")
-        return _mod_accessible_cache['post_ids'] if _mod_accessible_cache['post_ids'] else set()
+    return get_blocklist_snapshot().mod_accessible_post_ids
 
-@cp_blocker_bp.route('/api/cp/check-post-access/<int:post_id>', methods=['GET'])
-def check_post_access(post_id):
-    """
-    Check if a post should be blocked.
-    Returns: 
-      200 {"allowed": true} if accessible
-      403 {"allowed": false, "reason": "..."} if blocked
+
+def decide_post_access(post_id: int, jwt_token: Optional[str]) -> Tuple[bool, Dict]:
+    """Decide whether the requester may view post_id using the current snapshot.
     
-    Admin users can always access CP-reported posts.
+    Returns:
+        (allowed, info) - info carries 'admin'/'moderator' flags or a deny 'reason'
     """
-    logger.info(f"🔍 [CP POST BLOCKER] Checking access to post {post_id}")
-    logger.info(f"🍪 [CP POST BLOCKER] Cookies: {request.cookies}")
-    
-    # Check if user is admin (via JWT from cookie)
-    # Admin is always person_id = 1 in Lemmy
-    jwt_token = request.cookies.get('jwt')
-    logger.info(f"🔑 [CP POST BLOCKER] JWT token present: {bool(jwt_token)}")
-    
+    snapshot = get_blocklist_snapshot()
+
     if jwt_token:
         try:
-            import jwt as pyjwt
-            decoded = pyjwt.decode(jwt_token, options={"verify_signature": False})
-            person_id = decoded.get('sub')
-            
-            # JWT 'sub' can be either int or str, normalize to int
-            if isinstance(person_id, str):
-                person_id = int(person_id) if person_id.isdigit() else None
-            
-            # Admin user (quick check)
-            logger.info(f"👤 [CP POST BLOCKER] Decoded person_id: {person_id} (type: {type(person_id).__name__})")
-            if person_id == 1:
-                logger.info(f"✅ [CP POST BLOCKER] Admin access to post {post_id} - ALLOWED")
-                return jsonify({"allowed": True, "admin": True}), 200
-
-            # Check if user is a Lemmy community moderator (any community)
-            # Also respects admin's manual revocation of CP review permission
-            if is_lemmy_community_moderator(person_id):
-                # Moderator found - but check if this post is still at moderator level
-                mod_accessible_posts = get_mod_accessible_post_ids()
-                blocked_posts = get_blocked_post_ids()
-                
-                if post_id in mod_accessible_posts:
-                    # Post is pending at moderator level - allow access
+            identity = resolve_identity(jwt_token)
+            person_id = identity['person_id'] if identity else None
+
+            # Admin is always person_id = 1 in Lemmy
+            if identity and identity['is_admin']:
+                return True, {"admin": True}
+
+            # Lemmy community moderator (any community)
+            if identity and identity['is_moderator']:
+                if post_id in snapshot.mod_accessible_post_ids:
                     logger.info(f"✅ [CP POST BLOCKER] Moderator (person_id={person_id}) access to post {post_id} (pending review) - ALLOWED")
-                    return jsonify({"allowed": True, "moderator": True}), 200
-                elif post_id in blocked_posts:
-                    # Post is hidden but NOT at moderator level (escalated to admin or already reviewed)
-                    # Moderator cannot access anymore
-                    logger.info(f"❌ [CP POST BLOCKER] Moderator DENIED access to post {post_id} (escalated to admin or reviewed)")
-                    return jsonify({
-                        "allowed": False,
-                        "reason": "Content under admin review - moderator access revoked"
-                    }), 403
-                else:
-                    # Post is not blocked at all - allow normal access
-                    logger.info(f"✅ [CP POST BLOCKER] Moderator access to post {post_id} (not blocked) - ALLOWED")
-                    return jsonify({"allowed": True, "moderator": True}), 200
+                    return True, {"moderator": True}
+                if post_id in snapshot.blocked_post_ids:
+                    # Escalated to admin or already reviewed - moderator cannot access anymore
+                    logger.info(f"❌ [CP POST BLOCKER] Moderator DENIED access to post {post_id} (escalated/reviewed)")
+                    return False, {"reason": "Content under admin review - moderator access revoked"}
+                return True, {"moderator": True}
 
             # Explicit creator check: block the content creator from accessing their own reported post
-            creator_map = get_blocked_post_creator_map()
-            if post_id in creator_map and creator_map[post_id] == person_id:
+            if snapshot.creator_map.get(post_id) == person_id:
                 logger.info(f"❌ [CP POST BLOCKER] CREATOR (person_id={person_id}) blocked from own reported post {post_id}")
-                return jsonify({
-                    "allowed": False,
-                    "reason": "Content unavailable (removed or under review)"
-                }), 403
+                return False, {"reason": "Content unavailable (removed or under review)"}
         except Exception as e:
             logger.error(f"Error decoding JWT: {e}")
-    
-    blocked_posts = get_blocked_post_ids()
-    logger.info(f"🚫 [CP POST BLOCKER] Blocked posts: {blocked_posts}")
-    
-    if post_id in blocked_posts:
+
+    if post_id in snapshot.blocked_post_ids:
         logger.info(f"❌ [CP POST BLOCKER] Post {post_id} is blocked - denying access")
-        return jsonify({
-            "allowed": False,
-            "reason": "Content unavailable (removed or under review)"
-        }), 403
+        return False, {"reason": "Content unavailable (removed or under review)"}
+
+    return True, {}
+
+
+@cp_blocker_bp.route('/api/cp/check-post-access/<int:post_id>', methods=['GET'])
+def check_post_access(post_id):
+    """
+    Check if a post should be blocked.
+    Returns: 
+      200 {"allowed": true} if accessible
+      403 {"allowed": false, "reason": "..."} if blocked
     
-    logger.info(f"✅ [CP POST BLOCKER] Post {post_id} not blocked - allowing access")
-    return jsonify({"allowed": True}), 200
+    Admin users can always access CP-reported posts.
+    """
+    allowed, info = decide_post_access(post_id, request.cookies.get('jwt'))
+    return jsonify({"allowed": allowed, **info}), (200 if allowed else 403)
 
 
-@cp_blocker_bp.route('/api/cp/check-post-uri', methods=['GET'])
 @cp_blocker_bp.route('/api/cp/check-post-uri', methods=['GET'])
 def check_post_uri():
     """
     Check if a post should be blocked by parsing X-Original-URI header.
     Used by nginx auth_request.
     """
-    import re
-    
     original_uri = request.headers.get('X-Original-URI', '')
-    logger.info(f"🔍 [CP POST BLOCKER] Checking URI: {original_uri}")
     
     # Extract post_id from URI like /post/136
-    match = re.match(r'^/post/(\d+)', original_uri)
+    match = _POST_URI_RE.match(original_uri)
     if not match:
-        logger.warning(f"⚠️ [CP POST BLOCKER] Could not extract post_id from URI: {original_uri}")
         return '', 200  # Allow if we can't parse (fail open for non-post URIs)
     
-    post_id = int(match.group(1))
-    logger.info(f"🔍 [CP POST BLOCKER] Extracted post_id: {post_id}")
-    
-    # Check if user is admin (via JWT from cookie)
-    jwt_token = request.cookies.get('jwt')
-    logger.info(f"🔑 [CP POST BLOCKER] JWT token present: {bool(jwt_token)}")
-    
-    if jwt_token:
-        try:
-            import jwt as pyjwt
-            decoded = pyjwt.decode(jwt_token, options={"verify_signature": False})
-            person_id = decoded.get('sub')
-            
-            # JWT 'sub' can be either int or str, normalize to int
-            if isinstance(person_id, str):
-                person_id = int(person_id) if person_id.isdigit() else None
-            
-            # Admin user (quick check)
-            logger.info(f"👤 [CP POST BLOCKER] Decoded person_id: {person_id} (type: {type(person_id).__name__})")
-            if person_id == 1:
-                logger.info(f"✅ [CP POST BLOCKER] Admin access to post {post_id} - ALLOWED")
-                return '', 200
-
-            # Check if user is a Lemmy community moderator (any community)
-            # Also respects admin's manual revocation of CP review permission
-            if is_lemmy_community_moderator(person_id):
-                # Moderator found - check if post is still at moderator level
-                mod_accessible_posts = get_mod_accessible_post_ids()
-                blocked_posts = get_blocked_post_ids()
-                
-                if post_id in mod_accessible_posts:
-                    logger.info(f"✅ [CP POST BLOCKER] Moderator (person_id={person_id}) access to post {post_id} (pending review) - ALLOWED")
-                    return '', 200
-                elif post_id in blocked_posts:
-                    # Escalated to admin or already reviewed - deny mod access
-                    logger.info(f"❌ [CP POST BLOCKER] Moderator DENIED access to post {post_id} (escalated/reviewed)")
-                    return '', 403
-                else:
-                    # Not blocked - normal access
-                    logger.info(f"✅ [CP POST BLOCKER] Moderator access to post {post_id} (not blocked) - ALLOWED")
-                    return '', 200
-
-            # Explicit creator check: block the content creator from accessing their own reported post
-            creator_map = get_blocked_post_creator_map()
-            if post_id in creator_map and creator_map[post_id] == person_id:
-                logger.info(f"❌ [CP POST BLOCKER] CREATOR (person_id={person_id}) blocked from own reported post {post_id} (URI check)")
-                return '', 403
-        except Exception as e:
-            logger.error(f"Error decoding JWT: {e}")
-    
-    blocked_posts = get_blocked_post_ids()
-    logger.info(f"🚫 [CP POST BLOCKER] Blocked posts: {blocked_posts}")
-    
-    if post_id in blocked_posts:
-        logger.info(f"❌ [CP POST BLOCKER] Post {post_id} is blocked - denying access")
-        return '', 403
-    
-    logger.info(f"✅ [CP POST BLOCKER] Post {post_id} not blocked - allowing access")
-    return '', 200
-
+    allowed, _ = decide_post_access(int(match.group(1)), request.cookies.get('jwt'))
+    return '', (200 if allowed else 403)
@@ -3,11 +3,12 @@ import time
 import logging
 import uuid
 from config import DB_PATH, logger
+from db_pool import get_sqlite_connection
 
 def init_db():
     """데이터베이스 초기화"""
     try:
-        conn = sqlite3.connect(DB_PATH, timeout=30)  # Add a 30-second timeout
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # 인보이스 테이블 생성
@@ -58,6 +59,9 @@ def init_db():
         )
         ''')
         
+        # 결제 주소 알림/폴링 시 대기 중 인보이스 조회용
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_invoices_status_address ON invoices(status, payment_address)')
+        
         # PoW related tables removed
         
         # 사용자 멤버십 테이블 (Annual Membership)
@@ -68,10 +72,18 @@ def init_db():
             purchased_at INTEGER NOT NULL,
             expires_at INTEGER NOT NULL,
             amount_paid REAL NOT NULL,
-            is_active BOOLEAN DEFAULT TRUE
+            is_active BOOLEAN DEFAULT TRUE,
+            updated_at INTEGER NOT NULL DEFAULT 0
         )
         ''')
         
+        # 변경 추적용 updated_at 컬럼 (PostgreSQL 증분 동기화에서 사용)
+        try:
+            cursor.execute('ALTER TABLE user_memberships ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0')
+        except sqlite3.OperationalError:
+            pass  # 이미 존재
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_memberships_updated_at ON user_memberships(updated_at)')
+        
         # 멤버십 거래 기록 테이블 (User → Admin BCH transfer)
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS membership_transactions (
@@ -324,6 +336,28 @@ def init_db():
         )
         ''')
         
+        # 백그라운드 작업 리더 lease (gunicorn 워커 중 하나만 작업 실행)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS background_task_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at INTEGER NOT NULL,
+            acquired_at INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        
+        # Zero-Conf 검증 상태 (first_seen → recheck_at 경과 후 재확인 → validated/failed)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS zero_conf_checks (
+            invoice_id TEXT PRIMARY KEY,
+            tx_hash TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'first_seen',
+            first_seen_at INTEGER NOT NULL,
+            recheck_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        ''')
+        
         # ==================== User Settings ====================
         # 유저별 커스텀 설정 (Lemmy API가 지원하지 않는 Oratio 전용 설정)
         cursor.execute('''
@@ -354,11 +388,8 @@ def init_db():
         raise
 
 def get_db_connection():
-    """데이터베이스 연결 생성"""
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute("PRAGMA journal_mode = WAL")
-    conn.execute("PRAGMA busy_timeout = 30000")
-    return conn
+    """데이터베이스 연결 가져오기 (스레드별 풀에서 재사용, WAL 등 프라그마는 생성 시 한 번만 설정)"""
+    return get_sqlite_connection(DB_PATH)
 
 def save_address(address):
     """새 주소를 데이터베이스에 저장"""
@@ -501,6 +532,28 @@ def get_pending_invoices():
     conn.close()
     return [row[0] for row in result]
 
+def get_pending_invoice_addresses():
+    """대기 중인 인보이스의 (id, 결제 주소) 목록 조회"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, payment_address FROM invoices WHERE status = 'pending'")
+    result = cursor.fetchall()
+    conn.close()
+    return [(row[0], row[1]) for row in result]
+
+def get_pending_invoice_ids_by_address(address):
+    """결제 주소로 대기 중인 인보이스 ID 조회 (bitcoincash: 접두사 없이 저장됨)"""
+    clean_address = address.replace('bitcoincash:', '')
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM invoices WHERE payment_address = ? AND status = 'pending'",
+        (clean_address,)
+    )
+    result = cursor.fetchall()
+    conn.close()
+    return [row[0] for row in result]
+
 def get_paid_invoices():
     """지불 확인된 인보이스 목록 조회"""
     conn = get_db_connection()
@@ -510,6 +563,77 @@ def get_paid_invoices():
     conn.close()
     return [(row[0], row[1]) for row in result]
 
+def has_unconfirmed_zero_conf_invoices():
+    """이중지불 재검증이 필요한 인보이스(0-conf로 완료, 아직 미확인)가 있는지 확인"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 1 FROM invoices
+        WHERE status = 'completed'
+        AND confirmations < 1
+        AND tx_hash IS NOT NULL
+        AND tx_hash NOT LIKE 'mock_%'
+        LIMIT 1
+    """)
+    result = cursor.fetchone()
+    conn.close()
+    return result is not None
+
+def get_or_create_zero_conf_check(invoice_id, tx_hash, delay_seconds):
+    """Zero-Conf 검증 상태 조회 (없으면 first_seen으로 생성)
+    
+    Returns:
+        (dict, created): {"tx_hash", "state", "first_seen_at", "recheck_at"}, 새로 생성되었는지 여부
+    """
+    now = int(time.time())
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT OR IGNORE INTO zero_conf_checks (invoice_id, tx_hash, state, first_seen_at, recheck_at, updated_at)
+        VALUES (?, ?, 'first_seen', ?, ?, ?)
+    ''', (invoice_id, tx_hash, now, now + delay_seconds, now))
+    created = cursor.rowcount > 0
+    conn.commit()
+    cursor.execute(
+        "SELECT tx_hash, state, first_seen_at, recheck_at FROM zero_conf_checks WHERE invoice_id = ?",
+        (invoice_id,)
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return {"tx_hash": row[0], "state": row[1], "first_seen_at": row[2], "recheck_at": row[3]}, created
+
+def set_zero_conf_check_state(invoice_id, state):
+    """Zero-Conf 검증 상태 변경 (validated / failed)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE zero_conf_checks SET state = ?, updated_at = ? WHERE invoice_id = ?",
+        (state, int(time.time()), invoice_id)
+    )
+    conn.commit()
+    conn.close()
+
+def delete_zero_conf_check(invoice_id):
+    """Zero-Conf 검증 상태 삭제 (다른 트랜잭션으로 처음부터 다시 검증)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM zero_conf_checks WHERE invoice_id = ?", (invoice_id,))
+    conn.commit()
+    conn.close()
+
+def purge_zero_conf_checks(max_age_seconds=86400):
+    """오래된 Zero-Conf 검증 기록 삭제"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM zero_conf_checks WHERE updated_at < ?",
+        (int(time.time()) - max_age_seconds,)
+    )
+    count = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
 def expire_pending_invoices():
     """만료된 인보이스 처리"""
     conn = get_db_connection()
@@ -807,14 +931,15 @@ def create_membership(user_id, amount_paid, tx_hash=None):
         
         # 기존 멤버십이 있으면 업데이트, 없으면 생성
         cursor.execute('''
-            INSERT INTO user_memberships (user_id, membership_type, purchased_at, expires_at, amount_paid, is_active)
-            VALUES (?, 'annual', ?, ?, ?, TRUE)
+            INSERT INTO user_memberships (user_id, membership_type, purchased_at, expires_at, amount_paid, is_active, updated_at)
+            VALUES (?, 'annual', ?, ?, ?, TRUE, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 purchased_at = ?,
                 expires_at = ?,
                 amount_paid = ?,
-                is_active = TRUE
-        ''', (user_id, now, expires_at, amount_paid, now, expires_at, amount_paid))
+                is_active = TRUE,
+                updated_at = ?
+        ''', (user_id, now, expires_at, amount_paid, now, now, expires_at, amount_paid, now))
         
         # ===== FIX: Update existing user_upload_quotas if exists =====
         cursor.execute('''
@@ -848,6 +973,7 @@ def create_membership(user_id, amount_paid, tx_hash=None):
         conn.close()
         
         logger.info(f"사용자 {user_id}의 연간 멤버십 생성/갱신: {amount_paid} BCH, 만료일: {expires_at}")
+        _notify_membership_changed([user_id])
         return True
     except Exception as e:
         logger.error(f"멤버십 생성 중 오류: {str(e)}")
@@ -914,14 +1040,15 @@ def deactivate_membership(user_id):
         
         cursor.execute('''
             UPDATE user_memberships
-            SET is_active = FALSE
+            SET is_active = FALSE, updated_at = ?
             WHERE user_id = ?
-        ''', (user_id,))
+        ''', (int(time.time()), user_id))
         
         conn.commit()
         conn.close()
         
         logger.info(f"사용자 {user_id}의 멤버십 비활성화됨")
+        _notify_membership_changed([user_id])
         return True
     except Exception as e:
         logger.error(f"멤버십 비활성화 중 오류: {str(e)}")
@@ -947,9 +1074,9 @@ def check_and_expire_memberships():
         for (user_id,) in expired_users:
             cursor.execute('''
                 UPDATE user_memberships
-                SET is_active = FALSE
+                SET is_active = FALSE, updated_at = ?
                 WHERE user_id = ?
-            ''', (user_id,))
+            ''', (now, user_id))
             logger.info(f"사용자 {user_id}의 멤버십이 만료되어 비활성화됨")
             # 멤버십 만료 시 membership_default_filter 설정도 자동 해제
             clear_user_membership_filter(user_id)
@@ -957,11 +1084,21 @@ def check_and_expire_memberships():
         conn.commit()
         conn.close()
         
+        if expired_users:
+            _notify_membership_changed([user_id for (user_id,) in expired_users])
         return len(expired_users)
     except Exception as e:
         logger.error(f"멤버십 만료 확인 중 오류: {str(e)}")
         return 0
 
+def _notify_membership_changed(user_ids):
+    """멤버십 변경을 PostgreSQL 동기화에 바로 알림 (실패해도 주기 동기화가 처리)"""
+    try:
+        from services.membership_sync import notify_membership_changed
+        notify_membership_changed(user_ids)
+    except Exception as e:
+        logger.warning(f"멤버십 동기화 알림 실패 (주기 동기화로 처리됨): {str(e)}")
+
 def get_membership_transactions(user_id, limit=50):
     """사용자의 멤버십 거래 내역 조회"""
     try:
@@ -4,6 +4,7 @@ from datetime import datetime
 from functools import wraps
 from config import logger, LEMMY_API_KEY
 import models
+from db_pool import get_pool_stats
 
 # Blueprint 생성
 api_bp = Blueprint('api', __name__)
@@ -74,8 +75,17 @@ def has_user_payment(username):
 @api_bp.route('/health')
 def health_check():
     """서비스 상태 확인 API"""
+    from services.background_tasks import get_background_status
+    from services.payment_watcher import payment_watcher
+    from services.electron_cash import electron_cash
+    from services.ad_write_buffer import ad_write_buffer
     return jsonify({
         "status": "ok", 
         "service": "bch-payment-service",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "db_pools": get_pool_stats(),
+        "background_tasks": get_background_status(),
+        "payment_watcher": payment_watcher.status(),
+        "electron_cash": electron_cash.status(),
+        "ad_write_buffer": ad_write_buffer.status()
     })
\ No newline at end of file
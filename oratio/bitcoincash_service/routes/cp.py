@@ -25,7 +25,7 @@ from services.cp_moderation import (
     # Background tasks
     run_cp_background_tasks,
 )
-from jwt_utils import extract_user_info_from_jwt
+from jwt_utils import extract_user_info_from_jwt, resolve_identity
 import traceback
 
 cp_bp = Blueprint('cp', __name__, url_prefix='/api/cp')
@@ -458,15 +458,14 @@ def api_get_reported_content_ids():
         
         if jwt_token:
             try:
-                import jwt as pyjwt
-                decoded = pyjwt.decode(jwt_token, options={"verify_signature": False})
-                person_id = decoded.get('sub')
+                identity = resolve_identity(jwt_token)
+                person_id = identity['person_id'] if identity else None
                 
                 # Quick check: admin is always person_id = 1
-                if person_id == 1 or str(person_id) == '1':
+                if identity and identity['is_admin']:
                     is_admin = True
                     logger.info(f"Admin detected (person_id={person_id}) - returning empty content list")
-                else:
+                elif identity:
                     # Check local DB if user has review permissions (moderator/reviewer) - fast path
                     try:
                         conn = get_db()
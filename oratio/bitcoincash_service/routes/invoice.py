@@ -4,10 +4,12 @@ import time
 import qrcode
 from io import BytesIO
 import base64
+import hmac
 from config import logger, TESTNET, MIN_CONFIRMATIONS
 import models
 from services.electron_cash import electron_cash
 from services.payment import process_payment, format_invoice_for_display
+from services.payment_watcher import payment_watcher, NOTIFY_TOKEN
 from jwt_utils import get_user_id_from_request
 
 # Blueprint 생성
@@ -46,6 +48,12 @@ def generate_invoice():
     # 인보이스 생성
     invoice_data = models.create_invoice(payment_address, amount, user_id)
     
+    # 주소 상태 변경 알림 등록 (실패 시 백그라운드 폴링으로 대체)
+    try:
+        payment_watcher.watch(payment_address)
+    except Exception as e:
+        logger.warning(f"주소 알림 등록 오류: {str(e)}")
+    
     # 응답 반환
     if request.headers.get('Accept', '').find('application/json') != -1:
         return jsonify(invoice_data)
@@ -120,6 +128,22 @@ def check_payment(invoice_id):
             else:
                 return jsonify({"error": "결제 확인 중 오류가 발생했습니다"}), 500
 
+@invoice_bp.route('/api/internal/address_notify', methods=['POST'])
+def address_notify():
+    """ElectronCash 주소 상태 변경 알림 수신 (notify 콜백)"""
+    token = request.args.get('token', '')
+    if not hmac.compare_digest(token, NOTIFY_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+    
+    data = request.get_json(silent=True) or {}
+    address = data.get('address')
+    if not address:
+        return jsonify({"error": "address is required"}), 400
+    
+    # 결제 처리는 워커 풀에서 비동기로 실행 - 즉시 응답
+    queued = payment_watcher.on_address_notification(address, data.get('status'))
+    return jsonify({"success": True, "queued": queued})
+
 @invoice_bp.route('/payment_success/<invoice_id>')
 def payment_success(invoice_id):
     """결제 성공 페이지 렌더링"""
@@ -341,14 +341,16 @@ def get_membership_posts():
     
     Query params:
         sort: SortType (Active, Hot, New, Old, etc.) — default: Active
-        page: Page number (1-indexed) — default: 1
+        page_cursor: next_page from the previous response (keyset pagination)
+        page: Page number (1-indexed), used only without page_cursor — default: 1
         limit: Posts per page — default: 20
         type_: ListingType (Local, All) — default: Local
     """
     try:
-        from services.membership_posts import fetch_membership_posts
+        from services.membership_posts import fetch_membership_posts, InvalidCursorError
         
         sort = request.args.get('sort', 'Active')
+        page_cursor = request.args.get('page_cursor') or None
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         listing_type = request.args.get('type_', 'Local')
@@ -359,12 +361,16 @@ def get_membership_posts():
         if limit < 1 or limit > 50:
             limit = 20
         
-        result = fetch_membership_posts(
-            sort=sort,
-            page=page,
-            limit=limit,
-            listing_type=listing_type,
-        )
+        try:
+            result = fetch_membership_posts(
+                sort=sort,
+                page=page,
+                limit=limit,
+                listing_type=listing_type,
+                page_cursor=page_cursor,
+            )
+        except InvalidCursorError as e:
+            return jsonify({"posts": [], "next_page": None, "error": str(e)}), 400
         
         return jsonify(result)
         
@@ -3,14 +3,21 @@ Advertisement Service
 광고 선택, 노출, 크레딧 관리 핵심 로직
 """
 
+import os
 import sqlite3
+import threading
 import time
 import uuid
 import random
 import re
 import json
+from bisect import bisect_left
+from itertools import accumulate
 from typing import Optional, Dict, List, Any
 from config import DB_PATH, logger
+from db_pool import get_sqlite_connection
+from change_counter import read_counter, bump_counter
+from services.ad_write_buffer import ad_write_buffer
 
 # Post ID → Community 캐시 (성능 최적화)
 # TTL 1시간, 최대 1000개 항목
@@ -25,6 +32,111 @@ _post_content_cache: Dict[int, str] = {}
 _post_content_cache_time: Dict[int, float] = {}
 
 
+# 캠페인 색인 무효화 카운터 (캠페인 승인/변경 시 증가 → 모든 워커가 색인 재구축)
+AD_INDEX_VERSION_PATH = os.environ.get('AD_INDEX_VERSION_PATH', DB_PATH + '.ad_campaigns_version')
+# 다른 워커의 load_points 변경, 캠페인 기간 만료 등을 반영하기 위한 최대 색인 수명 (초)
+AD_INDEX_MAX_AGE = int(os.environ.get('AD_INDEX_MAX_AGE', 30))
+_SELECTION_CACHE_MAX = 256
+
+_POST_ID_RE = re.compile(r'/post/(\d+)')
+
+
+def bump_ad_campaigns_version() -> Optional[int]:
+    """캠페인 색인 무효화 (노출 대상 캠페인 집합이 바뀌는 커밋 후 호출)"""
+    return bump_counter(AD_INDEX_VERSION_PATH)
+
+
+class _IndexedCampaign:
+    """타겟팅 조건을 미리 파싱/컴파일해 둔 캠페인"""
+    __slots__ = ('id', 'ad', 'budget', 'is_nsfw', 'start_date', 'end_date',
+                 'community_targeted', 'regex', 'has_targeting')
+
+    def __init__(self, ad: Dict):
+        self.id = ad["id"]
+        self.ad = ad
+        self.budget = ad["monthly_budget_usd"] or 0.0
+        self.is_nsfw = bool(ad["is_nsfw"])
+        self.start_date = ad["start_date"]
+        self.end_date = ad["end_date"]
+        # load_points 부여 대상 (show_on_all=False 또는 target_regex가 있는 경우)
+        self.has_targeting = bool(not ad.get("show_on_all", True) or ad.get("target_regex"))
+
+        # 잘못된 JSON/정규식은 기존과 동일하게 해당 조건을 무시
+        self.community_targeted = False
+        if not ad["show_on_all"] and ad["target_communities"]:
+            try:
+                json.loads(ad["target_communities"])
+                self.community_targeted = True
+            except json.JSONDecodeError:
+                pass
+
+        self.regex = None
+        if ad["target_regex"]:
+            try:
+                self.regex = re.compile(ad["target_regex"], re.IGNORECASE)
+            except re.error:
+                pass
+
+
+class AdCampaignIndex:
+    """
+    활성 캠페인 인메모리 색인 - 광고 선택 시 DB 조회 없음
+    
+    - 커뮤니티 타겟: 소문자 커뮤니티 이름 → 캠페인 ID 집합 (hash 조회)
+    - 정규식 타겟: 색인 구축 시 한 번만 컴파일
+    - 예산 가중치 선택: 후보 집합별 누적 예산 배열 + bisect (O(log n))
+    """
+
+    def __init__(self, campaigns: List[Dict], config: Dict[str, Any], version: int):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.config = config
+        self.campaigns = [_IndexedCampaign(ad) for ad in campaigns]
+        self.load_points = {ad["id"]: ad["load_points"] or 0 for ad in campaigns}
+
+        community_map: Dict[str, set] = {}
+        for campaign in self.campaigns:
+            if campaign.community_targeted:
+                targets = json.loads(campaign.ad["target_communities"]) or []
+                if isinstance(targets, str):
+                    targets = [targets]
+                for name in targets:
+                    community_map.setdefault(str(name).lower(), set()).add(campaign.id)
+        self.community_map = {name: frozenset(ids) for name, ids in community_map.items()}
+
+        self._cumulative_cache: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def communities_matching(self, community: Optional[str], display_name: Optional[str]) -> frozenset:
+        """name 또는 display_name 중 하나라도 타겟에 포함된 캠페인 ID (대소문자 무시)"""
+        matched = frozenset()
+        for name in (community, display_name):
+            if name:
+                matched = matched | self.community_map.get(name.lower(), frozenset())
+        return matched
+
+    def weighted_choice(self, campaigns: List[_IndexedCampaign]) -> Optional[_IndexedCampaign]:
+        """예산 비율에 따른 확률 선택 (누적 예산 배열을 후보 집합별로 캐시)"""
+        key = tuple(c.id for c in campaigns)
+        with self._lock:
+            cumulative = self._cumulative_cache.get(key)
+        if cumulative is None:
+            cumulative = list(accumulate(c.budget for c in campaigns))
+            with self._lock:
+                if len(self._cumulative_cache) >= _SELECTION_CACHE_MAX:
+                    self._cumulative_cache.clear()
+                self._cumulative_cache[key] = cumulative
+        if not cumulative or cumulative[-1] <= 0:
+            return None
+        position = bisect_left(cumulative, random.random() * cumulative[-1])
+        return campaigns[min(position, len(campaigns) - 1)]
+
+    def adjust_load_points(self, campaign_id: str, delta: int):
+        with self._lock:
+            if campaign_id in self.load_points:
+                self.load_points[campaign_id] = max(0, self.load_points[campaign_id] + delta)
+
+
 def _parse_post_id_from_url(page_url: str) -> Optional[int]:
     """
     URL에서 post ID 추출
@@ -33,7 +145,7 @@ def _parse_post_id_from_url(page_url: str) -> Optional[int]:
     """
     if not page_url:
         return None
-    match = re.search(r'/post/(\d+)', page_url)
+    match = _POST_ID_RE.search(page_url)
     if match:
         return int(match.group(1))
     return None
@@ -136,6 +248,26 @@ def _get_post_content_by_id(post_id: int) -> Optional[str]:
     return None
 
 
+class _LazyMatchText:
+    """정규식 매칭 대상 텍스트 - 정규식 타겟 광고가 있을 때만, 요청당 한 번만 조회"""
+    
+    def __init__(self, page_url: str, page_content: str):
+        self._page_url = page_url
+        self._text = page_content or None
+    
+    def get(self) -> str:
+        if self._text is None:
+            # page_content가 없으면 URL에서 post ID 추출하여 게시글 콘텐츠 조회
+            text = None
+            post_id = _parse_post_id_from_url(self._page_url) if self._page_url else None
+            if post_id:
+                text = _get_post_content_by_id(post_id)
+                logger.info(f"[Targeting] fetched post content for regex matching (post_id={post_id}, content_len={len(text or '')})")
+            # 콘텐츠도 없으면 URL에서 매칭 시도
+            self._text = text or self._page_url or ''
+        return self._text
+
+
 class AdService:
     """광고 시스템 핵심 서비스"""
     
@@ -144,14 +276,17 @@ class AdService:
         # key: campaign_id, value: last_increment_timestamp
         self._load_point_cache: Dict[str, float] = {}
         self._cache_ttl = 5  # 5초 내 같은 광고는 load_points 증가 안 함
+        # 광고 선택용 인메모리 캠페인 색인
+        self._campaign_index: Optional[AdCampaignIndex] = None
+        self._campaign_index_lock = threading.Lock()
     
     # ============================================================
     # Database Helpers
     # ============================================================
     
     def get_db_connection(self):
-        """데이터베이스 연결 생성"""
-        conn = sqlite3.connect(DB_PATH, timeout=30)
+        """데이터베이스 연결 가져오기 (풀에서 재사용)"""
+        conn = get_sqlite_connection(DB_PATH)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -438,6 +573,7 @@ class AdService:
             
             conn.commit()
             conn.close()
+            bump_ad_campaigns_version()
             logger.info(f"캠페인 승인: {campaign_id} by {admin_username}")
             return {"success": True, "campaign_id": campaign_id, "approval_status": "approved"}
         
@@ -572,6 +708,42 @@ class AdService:
     # Ad Selection Algorithm
     # ============================================================
     
+    def _load_campaign_index(self, version: int) -> AdCampaignIndex:
+        """활성 캠페인과 설정을 읽어 색인 구축 (시작일 필터는 선택 시점에 적용)"""
+        config = self.get_config()
+        conn = self.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.*
+            FROM ad_campaigns c
+            WHERE c.approval_status = 'approved'
+              AND c.is_active = TRUE
+              AND c.is_deleted = FALSE
+              AND (c.end_date IS NULL OR c.end_date >= ?)
+            ORDER BY c.load_points DESC, c.monthly_budget_usd DESC
+        """, (int(time.time()),))
+        campaigns = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return AdCampaignIndex(campaigns, config, version)
+    
+    def get_campaign_index(self) -> AdCampaignIndex:
+        """캠페인 색인 조회 (버전 변경 또는 AD_INDEX_MAX_AGE 경과 시 재구축)"""
+        version = read_counter(AD_INDEX_VERSION_PATH)
+        index = self._campaign_index
+        if index is not None and index.version == version and time.monotonic() - index.built_at < AD_INDEX_MAX_AGE:
+            return index
+        
+        with self._campaign_index_lock:
+            # 다른 스레드가 이미 재구축했으면 재사용
+            index = self._campaign_index
+            if index is not None and index.version == version and time.monotonic() - index.built_at < AD_INDEX_MAX_AGE:
+                return index
+            index = self._load_campaign_index(version)
+            self._campaign_index = index
+            logger.info(f"[AdService] Campaign index rebuilt: {len(index.campaigns)} campaigns, "
+                        f"{len(index.community_map)} target communities (version={version})")
+            return index
+    
     def select_ad_to_display(
         self,
         community: Optional[str] = None,
@@ -589,6 +761,8 @@ class AdService:
         3. 타겟 미매치 시 해당 광고에 로드 포인트 부여 (세션당 1회)
         4. 선택된 캠페인의 4개 위치 이미지 모두 반환
         
+        후보 조회/타겟팅은 인메모리 캠페인 색인으로 처리 (DB 조회 없음)
+        
         Args:
             community: 현재 페이지의 커뮤니티 이름 (None = 홈/전체)
             community_display_name: 커뮤니티 표시 이름 (title)
@@ -615,31 +789,20 @@ class AdService:
                         community_display_name = community_info.get("title")
                     logger.info(f"[AdService] Resolved community from post URL: post_id={post_id} → community={community}")
         
-        config = self.get_config()
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        index = self.get_campaign_index()
         now = int(time.time())
         
-        # 활성화된 승인 광고 조회 (기간 내 캠페인만)
-        cursor.execute("""
-            SELECT c.*
-            FROM ad_campaigns c
-            WHERE c.approval_status = 'approved'
-              AND c.is_active = TRUE
-              AND c.is_deleted = FALSE
-              AND (c.start_date IS NULL OR c.start_date <= ?)
-              AND (c.end_date IS NULL OR c.end_date >= ?)
-            ORDER BY c.load_points DESC, c.monthly_budget_usd DESC
-        """, (now, now))
-        
-        candidates = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        # 기간 내 캠페인만
+        candidates = [
+            c for c in index.campaigns
+            if (c.start_date is None or c.start_date <= now) and (c.end_date is None or c.end_date >= now)
+        ]
         
         if not candidates:
             return None
         
         # 전체 예산 합계 계산
-        total_budget = sum(ad["monthly_budget_usd"] for ad in candidates)
+        total_budget = sum(c.budget for c in candidates)
         
         if total_budget <= 0:
             return None
@@ -647,154 +810,87 @@ class AdService:
         # ========================================
         # 1단계: 모든 광고의 타겟팅 매치 여부 확인
         # ========================================
+        community_matches = index.communities_matching(community, community_display_name)
+        match_text = _LazyMatchText(page_url, page_content)
         eligible_ads = []  # 타겟 매치된 모든 광고
+        missed_targeted = []
         
-        for ad in candidates:
-            targeting_match = self._check_targeting(ad, community, community_display_name, is_nsfw, page_url, page_content)
-            
-            if targeting_match:
-                eligible_ads.append(ad)
-            else:
+        for campaign in candidates:
+            if self._check_targeting(campaign, community_matches, bool(community or community_display_name), is_nsfw, match_text):
+                eligible_ads.append(campaign)
+            elif campaign.has_targeting:
                 # 타겟 미매치 + 타겟팅 설정이 있는 광고만 load_points +1
-                # (show_on_all=False 또는 target_regex가 있는 경우)
-                # session_id로 세션당 1회만 증가
-                has_targeting = not ad.get("show_on_all", True) or ad.get("target_regex")
-                if has_targeting:
-                    self._increment_load_points(ad["id"], session_id)
-        
-        if not eligible_ads:
-            return None
+                missed_targeted.append(campaign.id)
         
         # ========================================
         # 2단계: load_points > 0인 광고 우선 풀 생성
         # ========================================
-        load_point_ads = [ad for ad in eligible_ads if ad["load_points"] > 0]
-        normal_ads = [ad for ad in eligible_ads if ad["load_points"] <= 0]
+        load_point_ads = [c for c in eligible_ads if index.load_points.get(c.id, 0) > 0]
+        normal_ads = [c for c in eligible_ads if index.load_points.get(c.id, 0) <= 0]
+        
+        # session_id로 세션당 1회만 증가
+        for campaign_id in missed_targeted:
+            self._increment_load_points(campaign_id, session_id)
+        
+        if not eligible_ads:
+            return None
         
         logger.info(f"[AdService] Eligible ads: {len(eligible_ads)}, load_point_ads: {len(load_point_ads)}, normal_ads: {len(normal_ads)}")
         
-        selected_ad = None
+        selected = None
         
         # ========================================
         # 3단계: 우선 풀에서 확률 기반 선택
         # ========================================
         if load_point_ads:
             # 우선 풀 내에서 예산 비율에 따른 확률 선택
-            lp_total = sum(ad["monthly_budget_usd"] for ad in load_point_ads)
-            if lp_total > 0:
-                rand_value = random.random() * lp_total
-                cumulative = 0.0
-                
-                for ad in load_point_ads:
-                    cumulative += ad["monthly_budget_usd"]
-                    if rand_value <= cumulative:
-                        selected_ad = ad
-                        # 로드 포인트 감소 (세션당 1회만)
-                        self._decrement_load_points(ad["id"], session_id)
-                        logger.info(f"[AdService] Selected from load_point pool: {ad.get('title')} (budget=${ad['monthly_budget_usd']}, load_points={ad['load_points']})")
-                        break
+            selected = index.weighted_choice(load_point_ads)
+            if selected:
+                logger.info(f"[AdService] Selected from load_point pool: {selected.ad.get('title')} (budget=${selected.budget}, load_points={index.load_points.get(selected.id)})")
+                # 로드 포인트 감소 (세션당 1회만)
+                self._decrement_load_points(selected.id, session_id)
         
         # ========================================
         # 4단계: 우선 풀에서 선택 안 됐으면 일반 풀에서 확률 선택
         # ========================================
-        if not selected_ad and normal_ads:
-            normal_total = sum(ad["monthly_budget_usd"] for ad in normal_ads)
-            if normal_total > 0:
-                rand_value = random.random() * normal_total
-                cumulative = 0.0
-                
-                for ad in normal_ads:
-                    cumulative += ad["monthly_budget_usd"]
-                    if rand_value <= cumulative:
-                        selected_ad = ad
-                        logger.info(f"[AdService] Selected from normal pool: {ad.get('title')} (budget=${ad['monthly_budget_usd']})")
-                        break
+        if not selected and normal_ads:
+            selected = index.weighted_choice(normal_ads)
+            if selected:
+                logger.info(f"[AdService] Selected from normal pool: {selected.ad.get('title')} (budget=${selected.budget})")
         
         # Fallback: 아직 선택 안 됐으면 eligible_ads 중 첫 번째
-        if not selected_ad and eligible_ads:
-            selected_ad = eligible_ads[0]
-            logger.info(f"[AdService] Fallback selection: {selected_ad.get('title')}")
+        if not selected and eligible_ads:
+            selected = eligible_ads[0]
+            logger.info(f"[AdService] Fallback selection: {selected.ad.get('title')}")
         
-        if selected_ad:
-            return self._record_impression_and_return(selected_ad, community, is_nsfw, page_url, config)
+        if selected:
+            return self._record_impression_and_return(selected.ad, community, is_nsfw, page_url, index.config)
         
         return None
     
     def _check_targeting(
         self,
-        ad: Dict,
-        community: Optional[str],
-        community_display_name: Optional[str],
+        campaign: _IndexedCampaign,
+        community_matches: frozenset,
+        has_community: bool,
         is_nsfw: bool,
-        page_url: str,
-        page_content: str
+        match_text: '_LazyMatchText'
     ) -> bool:
-        """타겟팅 조건 확인"""
-        ad_title = ad.get("title", ad.get("id", "unknown"))
-        
+        """타겟팅 조건 확인 (색인된 캠페인 기준)"""
         # NSFW 체크: NSFW 광고는 NSFW 페이지에서만
-        if ad["is_nsfw"] and not is_nsfw:
-            logger.debug(f"[Targeting] {ad_title}: NSFW mismatch")
+        if campaign.is_nsfw and not is_nsfw:
             return False
         
-        # 비NSFW 광고도 NSFW 페이지에는 표시하지 않음 (선택적 정책)
-        # if not ad["is_nsfw"] and is_nsfw:
-        #     return False
-        
         # 커뮤니티 타겟팅 (name 또는 display_name 중 하나만 매치해도 OK)
-        if not ad["show_on_all"] and ad["target_communities"]:
-            try:
-                target_comms = json.loads(ad["target_communities"])
-                # 대소문자 무시 비교
-                target_comms_lower = [c.lower() for c in target_comms]
-                community_lower = community.lower() if community else None
-                display_name_lower = community_display_name.lower() if community_display_name else None
-                
-                logger.info(f"[Targeting] {ad_title}: target_comms={target_comms}, community={community}, display_name={community_display_name}")
-                
-                # 둘 중 하나라도 매치하면 OK
-                name_match = community_lower and community_lower in target_comms_lower
-                display_match = display_name_lower and display_name_lower in target_comms_lower
-                
-                if community_lower or display_name_lower:
-                    if not name_match and not display_match:
-                        logger.info(f"[Targeting] {ad_title}: neither '{community}' nor '{community_display_name}' in {target_comms} -> REJECT")
-                        return False
-                else:
-                    # 홈페이지에서는 특정 커뮤니티 타겟 광고 미표시
-                    logger.info(f"[Targeting] {ad_title}: no community but has target -> REJECT")
-                    return False
-                    
-                logger.info(f"[Targeting] {ad_title}: community MATCH (name={name_match}, display={display_match}) -> ACCEPT")
-            except json.JSONDecodeError:
-                pass
+        # 홈페이지(커뮤니티 없음)에서는 특정 커뮤니티 타겟 광고 미표시
+        if campaign.community_targeted and (not has_community or campaign.id not in community_matches):
+            logger.debug(f"[Targeting] {campaign.ad.get('title')}: community mismatch -> REJECT")
+            return False
         
         # 정규식 타겟팅
-        if ad["target_regex"]:
-            try:
-                pattern = re.compile(ad["target_regex"], re.IGNORECASE)
-                
-                # page_content가 있으면 사용, 없으면 URL에서 post ID 추출하여 게시글 콘텐츠 조회
-                text_to_match = page_content
-                if not text_to_match and page_url:
-                    # URL에서 post ID 추출 후 게시글 콘텐츠 조회
-                    post_id = _parse_post_id_from_url(page_url)
-                    if post_id:
-                        text_to_match = _get_post_content_by_id(post_id)
-                        logger.info(f"[Targeting] {ad_title}: fetched post content for regex matching (post_id={post_id}, content_len={len(text_to_match or '')})")
-                
-                # 콘텐츠도 없으면 URL에서 매칭 시도
-                if not text_to_match:
-                    text_to_match = page_url
-                
-                if not pattern.search(text_to_match):
-                    logger.info(f"[Targeting] {ad_title}: regex '{ad['target_regex']}' NOT matched in content (len={len(text_to_match)}) -> REJECT")
-                    return False
-                else:
-                    logger.info(f"[Targeting] {ad_title}: regex '{ad['target_regex']}' MATCHED in content -> ACCEPT")
-            except re.error:
-                # 잘못된 정규식은 무시
-                pass
+        if campaign.regex is not None and not campaign.regex.search(match_text.get()):
+            logger.debug(f"[Targeting] {campaign.ad.get('title')}: regex '{campaign.ad['target_regex']}' NOT matched -> REJECT")
+            return False
         
         return True
     
@@ -814,16 +910,10 @@ class AdService:
                     k: v for k, v in self._load_point_cache.items() if v > cutoff
                 }
         
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE ad_campaigns
-            SET load_points = load_points + 1,
-                updated_at = ?
-            WHERE id = ?
-        """, (int(time.time()), campaign_id))
-        conn.commit()
-        conn.close()
+        if self._campaign_index is not None:
+            self._campaign_index.adjust_load_points(campaign_id, 1)
+        
+        ad_write_buffer.add_load_points(campaign_id, 1)
     
     def _decrement_load_points(self, campaign_id: str, session_id: Optional[str] = None):
         """로드 포인트 감소 (세션당 1회만)"""
@@ -841,16 +931,11 @@ class AdService:
                     k: v for k, v in self._load_point_cache.items() if v > cutoff
                 }
         
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE ad_campaigns
-            SET load_points = CASE WHEN load_points > 0 THEN load_points - 1 ELSE 0 END,
-                updated_at = ?
-            WHERE id = ?
-        """, (int(time.time()), campaign_id))
-        conn.commit()
-        conn.close()
+        if self._campaign_index is not None:
+            self._campaign_index.adjust_load_points(campaign_id, -1)
+        
+        # DB에서는 0 미만으로 내려가지 않음 (flush 시 MAX(0, ...))
+        ad_write_buffer.add_load_points(campaign_id, -1)
     
     def _record_impression_and_return(
         self,
@@ -860,143 +945,102 @@ class AdService:
         page_url: str,
         config: Dict
     ) -> Dict:
-        """노출 기록 및 광고 정보 반환 (과금 없음 - 월 예산 기반, 4개 위치 이미지 포함)"""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        """노출 기록 및 광고 정보 반환 (과금 없음 - 월 예산 기반, 4개 위치 이미지 포함)
+        
+        노출 기록과 캠페인 노출 수 증가는 쓰기 버퍼를 통해 1초 단위로 일괄 기록
+        """
         now = int(time.time())
         impression_id = str(uuid.uuid4())
         
         try:
-            # 노출 기록 (비용 없음)
-            cursor.execute("""
-                INSERT INTO ad_impressions (
-                    id, campaign_id, advertiser_username,
-                    page_url, community_name, is_nsfw_page,
-                    cost_usd, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, 0, ?)
-            """, (
+            # 노출 기록 (비용 없음, 캠페인 통계는 flush 시 함께 갱신)
+            ad_write_buffer.add_impression(
                 impression_id, ad["id"], ad["advertiser_username"],
                 page_url, community, is_nsfw, now
-            ))
-            
-            # 캠페인 통계 업데이트 (노출 수만, 비용 차감 없음)
-            cursor.execute("""
-                UPDATE ad_campaigns
-                SET total_impressions = total_impressions + 1,
-                    updated_at = ?
-                WHERE id = ?
-            """, (now, ad["id"]))
-            
-            conn.commit()
-            conn.close()
-            
-            # 크레딧 차감 없음 (월 예산 기반)
-            
-            # 광고 정보 반환 (4개 위치 이미지 모두 포함)
-            return {
-                "campaign_id": ad["id"],
-                "impression_id": impression_id,
-                "title": ad["title"],
-                "link_url": ad["link_url"],
-                "alt_text": ad["alt_text"],
-                "advertiser": ad["advertiser_username"],
-                "is_nsfw": ad["is_nsfw"],
-                # 4개 위치별 이미지 URL
-                "images": {
-                    "sidebar": ad.get("image_sidebar_url"),
-                    "post_top": ad.get("image_post_top_url"),
-                    "post_bottom": ad.get("image_post_bottom_url"),
-                    "feed_inline": ad.get("image_feed_inline_url"),
-                },
-                # Backward compatibility
-                "image_url": ad.get("image_sidebar_url") or ad.get("image_url"),
-            }
-        
+            )
         except Exception as e:
-            conn.rollback()
-            conn.close()
             logger.error(f"노출 기록 실패: {e}")
             return None
+        
+        # 크레딧 차감 없음 (월 예산 기반)
+        
+        # 광고 정보 반환 (4개 위치 이미지 모두 포함)
+        return {
+            "campaign_id": ad["id"],
+            "impression_id": impression_id,
+            "title": ad["title"],
+            "link_url": ad["link_url"],
+            "alt_text": ad["alt_text"],
+            "advertiser": ad["advertiser_username"],
+            "is_nsfw": ad["is_nsfw"],
+            # 4개 위치별 이미지 URL
+            "images": {
+                "sidebar": ad.get("image_sidebar_url"),
+                "post_top": ad.get("image_post_top_url"),
+                "post_bottom": ad.get("image_post_bottom_url"),
+                "feed_inline": ad.get("image_feed_inline_url"),
+            },
+            # Backward compatibility
+            "image_url": ad.get("image_sidebar_url") or ad.get("image_url"),
+        }
     
     # ============================================================
     # Click Tracking
     # ============================================================
     
     def record_click(self, impression_id: str) -> bool:
-        """광고 클릭 기록 (과금 없음 - 통계용)"""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        """광고 클릭 기록 (과금 없음 - 통계용, 쓰기 버퍼를 통해 일괄 기록)"""
         now = int(time.time())
         
-        try:
+        if ad_write_buffer.has_pending_click(impression_id):
+            return False
+        
+        # 아직 기록되지 않은 노출이면 버퍼에서 확인
+        campaign_id = ad_write_buffer.pending_impression(impression_id)
+        if campaign_id is None:
             # 노출 정보 조회
-            cursor.execute("""
-                SELECT campaign_id, advertiser_username, clicked
-                FROM ad_impressions WHERE id = ?
-            """, (impression_id,))
-            row = cursor.fetchone()
-            
-            if not row or row["clicked"]:
-                conn.close()
+            conn = self.get_db_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    SELECT campaign_id, advertiser_username, clicked
+                    FROM ad_impressions WHERE id = ?
+                """, (impression_id,))
+                row = cursor.fetchone()
+            except Exception as e:
+                logger.error(f"클릭 기록 실패: {e}")
                 return False
+            finally:
+                conn.close()
             
-            # 클릭 기록
-            cursor.execute("""
-                UPDATE ad_impressions
-                SET clicked = TRUE, clicked_at = ?
-                WHERE id = ?
-            """, (now, impression_id))
-            
-            # 캠페인 클릭 수 업데이트
-            cursor.execute("""
-                UPDATE ad_campaigns
-                SET total_clicks = total_clicks + 1,
-                    updated_at = ?
-                WHERE id = ?
-            """, (now, row["campaign_id"]))
-            
-            conn.commit()
-            conn.close()
-            
-            # 클릭 비용 차감 없음 (월 예산 기반)
-            
-            return True
+            if row is not None:
+                if row["clicked"]:
+                    return False
+                campaign_id = row["campaign_id"]
+            # 행이 없으면 다른 워커 버퍼에 있는 노출일 수 있음 - campaign_id는 flush 시 확인
+            # (AD_WRITE_RETRY_SECONDS 동안 노출 행이 생기지 않으면 버림)
         
-        except Exception as e:
-            conn.rollback()
-            conn.close()
-            logger.error(f"클릭 기록 실패: {e}")
-            return False
+        # 클릭 기록 + 캠페인 클릭 수 업데이트 (flush 시 첫 클릭만 반영)
+        ad_write_buffer.add_click(impression_id, campaign_id, now)
+        
+        # 클릭 비용 차감 없음 (월 예산 기반)
+        
+        return True
 
     # ============================================================
     # Impression helpers
     # ============================================================
 
     def update_impression_slot(self, impression_id: str, ad_slot: str, viewer_user_id: Optional[str] = None, viewer_ip_hash: Optional[str] = None) -> bool:
-        """Update impression record with the ad_slot and optional viewer info."""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        now = int(time.time())
+        """Queue the ad_slot and optional viewer info for an impression.
 
+        Written by the write-behind buffer on its next flush. The impression may
+        still be buffered in another worker, so a missing row is retried for a while.
+        """
         try:
-            # Update the ad_slot and optional viewer fields
-            cursor.execute("""
-                UPDATE ad_impressions
-                SET ad_slot = ?, viewer_user_id = COALESCE(?, viewer_user_id), viewer_ip_hash = COALESCE(?, viewer_ip_hash)
-                WHERE id = ?
-            """, (ad_slot, viewer_user_id, viewer_ip_hash, impression_id))
-
-            if cursor.rowcount == 0:
-                conn.close()
-                return False
-
-            conn.commit()
-            conn.close()
+            ad_write_buffer.add_slot(impression_id, ad_slot, viewer_user_id, viewer_ip_hash)
             return True
-
         except Exception as e:
-            conn.rollback()
-            conn.close()
             logger.error(f"update_impression_slot failed: {e}")
             return False
 
@@ -0,0 +1,355 @@
+"""
+Ad Write-Behind Buffer
+======================
+광고 노출/클릭/슬롯 확인/load_points 변경을 프로세스 내에서 모았다가
+AD_WRITE_FLUSH_INTERVAL(기본 1초)마다 하나의 트랜잭션으로 기록합니다.
+
+- 노출 INSERT, 캠페인 카운터(노출/클릭/load_points) 변경은 executemany로 일괄 처리
+- 모든 이벤트는 먼저 append-only 스풀 파일(JSON lines)에 기록 → 프로세스가 죽어도
+  다른 워커(또는 재시작된 워커)가 남은 스풀을 재생해 DB에 반영
+- 스풀 파일은 소유 프로세스가 flock을 잡고 있으므로, 잠금을 얻을 수 있는 파일은
+  주인이 없는 파일로 간주하고 재생 후 삭제
+
+다른 워커가 만든 노출에 대한 슬롯 확인/클릭은 아직 DB에 없을 수 있어,
+대상 행이 없으면 AD_WRITE_RETRY_SECONDS 동안 다음 flush에서 다시 시도합니다.
+"""
+
+import atexit
+import fcntl
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import DB_PATH, logger
+from db_pool import get_sqlite_connection
+
+AD_WRITE_FLUSH_INTERVAL = float(os.environ.get('AD_WRITE_FLUSH_INTERVAL', 1.0))
+AD_WRITE_RETRY_SECONDS = int(os.environ.get('AD_WRITE_RETRY_SECONDS', 30))
+AD_SPOOL_DIR = os.environ.get('AD_SPOOL_DIR', os.path.join(os.path.dirname(DB_PATH) or '.', 'ad_spool'))
+
+
+class AdWriteBuffer:
+    """광고 쓰기 이벤트 버퍼 (프로세스당 하나)"""
+
+    def __init__(self, spool_dir: str = AD_SPOOL_DIR, flush_interval: float = AD_WRITE_FLUSH_INTERVAL):
+        self.spool_dir = spool_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._seq = 0
+        self._spool = None  # 현재 스풀 세그먼트 (flock 보유)
+        self._sealed: List = []  # 기록 대기 중인 이전 세그먼트 (커밋 후 삭제)
+        self._reset_batch()
+        self.stats = {'flushes': 0, 'events': 0, 'flush_errors': 0, 'recovered_events': 0,
+                      'retried': 0, 'dropped': 0, 'last_flush_ms': 0.0}
+
+    def _reset_batch(self):
+        self._impressions: Dict[str, tuple] = {}  # impression_id → INSERT 파라미터
+        self._slots: Dict[str, dict] = {}  # impression_id → 슬롯 확인 이벤트
+        self._clicks: Dict[str, dict] = {}  # impression_id → 클릭 이벤트
+        self._deltas: Dict[str, List[int]] = {}  # campaign_id → [노출, 클릭, load_points]
+
+    # ------------------------------------------------------------
+    # 스풀 파일
+    # ------------------------------------------------------------
+
+    def _open_segment(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._seq += 1
+        path = os.path.join(self.spool_dir, f"ad_spool.{os.getpid()}.{self._seq}.jsonl")
+        f = open(path, 'a', encoding='utf-8')
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def _ensure_started(self):
+        """프로세스별 초기화 (fork 후 첫 사용 시): 고아 스풀 재생, 세그먼트 열기, flush 스레드 시작"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._flush_lock:
+            if self._pid == pid:
+                return
+            # fork 이전 상태는 부모 프로세스 소유 - 버리고 새로 시작
+            self._reset_batch()
+            self._sealed = []
+            self._seq = 0
+            try:
+                self._spool = self._open_segment()
+            except OSError as e:
+                logger.error(f"[AdWriteBuffer] 스풀 파일을 열 수 없음 (메모리 버퍼만 사용): {e}")
+                self._spool = None
+            self._pid = pid
+            self._recover_orphaned_spools()
+            self._thread = threading.Thread(target=self._run, name="ad-write-buffer", daemon=True)
+            self._thread.start()
+
+    def _spool_write(self, event: dict):
+        if self._spool is None:
+            return
+        try:
+            self._spool.write(json.dumps(event, separators=(',', ':')) + '\n')
+            self._spool.flush()
+        except (OSError, ValueError) as e:
+            logger.error(f"[AdWriteBuffer] 스풀 기록 실패: {e}")
+
+    def _recover_orphaned_spools(self):
+        """소유 프로세스가 사라진 스풀 세그먼트를 재생하고 삭제"""
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, 'ad_spool.*.jsonl'))):
+            try:
+                f = open(path, 'r', encoding='utf-8')
+            except OSError:
+                continue
+            try:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # 살아있는 프로세스가 사용 중
+                if os.fstat(f.fileno()).st_nlink == 0:
+                    continue  # 다른 프로세스가 이미 재생 후 삭제
+                events = []
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        pass  # 크래시로 잘린 마지막 줄
+                if events:
+                    with self._lock:
+                        for event in events:
+                            self._apply(event)
+                            self._spool_write(event)
+                    self.stats['recovered_events'] += len(events)
+                    logger.info(f"[AdWriteBuffer] 스풀 복구: {os.path.basename(path)} ({len(events)}개 이벤트)")
+                os.unlink(path)
+            finally:
+                f.close()
+
+    # ------------------------------------------------------------
+    # 이벤트 적재
+    # ------------------------------------------------------------
+
+    def _delta(self, campaign_id: str) -> List[int]:
+        delta = self._deltas.get(campaign_id)
+        if delta is None:
+            delta = self._deltas[campaign_id] = [0, 0, 0]
+        return delta
+
+    def _apply(self, event: dict):
+        kind = event['t']
+        if kind == 'imp':
+            if event['id'] not in self._impressions:
+                self._impressions[event['id']] = (
+                    event['id'], event['campaign_id'], event['advertiser'],
+                    event.get('page_url'), event.get('community'), event.get('is_nsfw'), event['ts']
+                )
+                self._delta(event['campaign_id'])[0] += 1
+        elif kind == 'slot':
+            self._slots[event['id']] = event
+        elif kind == 'click':
+            self._clicks.setdefault(event['id'], event)
+        elif kind == 'lp':
+            self._delta(event['campaign_id'])[2] += event['d']
+
+    def _add(self, event: dict):
+        self._ensure_started()
+        with self._lock:
+            self._apply(event)
+            self._spool_write(event)
+        self.stats['events'] += 1
+
+    def add_impression(self, impression_id: str, campaign_id: str, advertiser: str,
+                       page_url: str, community: Optional[str], is_nsfw: bool, created_at: int):
+        self._add({'t': 'imp', 'id': impression_id, 'campaign_id': campaign_id, 'advertiser': advertiser,
+                   'page_url': page_url, 'community': community, 'is_nsfw': bool(is_nsfw), 'ts': created_at})
+
+    def add_slot(self, impression_id: str, ad_slot: str, viewer_user_id: Optional[str] = None,
+                 viewer_ip_hash: Optional[str] = None):
+        self._add({'t': 'slot', 'id': impression_id, 'slot': ad_slot, 'user': viewer_user_id,
+                   'ip': viewer_ip_hash, 'ts': int(time.time())})
+
+    def add_click(self, impression_id: str, campaign_id: Optional[str], clicked_at: int):
+        """campaign_id가 None이면 (다른 워커 버퍼에 있는 노출) flush 시 노출 행에서 확인"""
+        self._add({'t': 'click', 'id': impression_id, 'campaign_id': campaign_id, 'ts': clicked_at})
+
+    def add_load_points(self, campaign_id: str, delta: int):
+        self._add({'t': 'lp', 'campaign_id': campaign_id, 'd': delta})
+
+    def pending_impression(self, impression_id: str) -> Optional[str]:
+        """아직 기록되지 않은 노출이면 campaign_id 반환"""
+        with self._lock:
+            row = self._impressions.get(impression_id)
+        return row[1] if row else None
+
+    def has_pending_click(self, impression_id: str) -> bool:
+        with self._lock:
+            return impression_id in self._clicks
+
+    # ------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[AdWriteBuffer] flush 오류: {e}")
+
+    def flush(self) -> int:
+        """버퍼를 하나의 트랜잭션으로 기록. 기록한 이벤트 수 반환"""
+        if self._pid != os.getpid():
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                impressions, slots, clicks, deltas = self._impressions, self._slots, self._clicks, self._deltas
+                if not (impressions or slots or clicks or deltas):
+                    return 0
+                self._reset_batch()
+                # 새 이벤트는 새 세그먼트로 - 이번 배치의 세그먼트는 커밋 후 삭제
+                if self._spool is not None:
+                    self._sealed.append(self._spool)
+                    try:
+                        self._spool = self._open_segment()
+                    except OSError as e:
+                        logger.error(f"[AdWriteBuffer] 스풀 세그먼트 생성 실패: {e}")
+                        self._spool = None
+
+            started = time.perf_counter()
+            try:
+                retry = self._write(impressions, slots, clicks, deltas)
+            except sqlite3.Error as e:
+                # 실패한 배치는 버퍼로 되돌려 다음 flush에서 재시도 (스풀 세그먼트는 유지)
+                self.stats['flush_errors'] += 1
+                logger.error(f"[AdWriteBuffer] DB 기록 실패, 재시도 예정: {e}")
+                with self._lock:
+                    for row in impressions.values():
+                        self._impressions.setdefault(row[0], row)
+                    for impression_id, event in slots.items():
+                        self._slots.setdefault(impression_id, event)
+                    for impression_id, event in clicks.items():
+                        self._clicks.setdefault(impression_id, event)
+                    for campaign_id, (imp, clk, lp) in deltas.items():
+                        delta = self._delta(campaign_id)
+                        delta[0] += imp
+                        delta[1] += clk
+                        delta[2] += lp
+                return 0
+
+            # 커밋 완료 - 이전 세그먼트 삭제
+            for segment in self._sealed:
+                try:
+                    os.unlink(segment.name)
+                except OSError:
+                    pass
+                segment.close()
+            self._sealed = []
+
+            # 대상 노출이 아직 없는 슬롯 확인/클릭은 다음 flush에서 재시도
+            for event in retry:
+                self._add(event)
+            self.stats['retried'] += len(retry)
+
+            count = len(impressions) + len(slots) + len(clicks) + len(deltas)
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return count
+
+    def _write(self, impressions, slots, clicks, deltas) -> List[dict]:
+        now = int(time.time())
+        retry = []
+        conn = get_sqlite_connection(DB_PATH)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            if impressions:
+                # INSERT OR IGNORE: 스풀 재생 시 중복 기록 방지
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO ad_impressions (
+                        id, campaign_id, advertiser_username,
+                        page_url, community_name, is_nsfw_page,
+                        cost_usd, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+                """, list(impressions.values()))
+
+            if slots:
+                cursor.executemany("""
+                    UPDATE ad_impressions
+                    SET ad_slot = ?, viewer_user_id = COALESCE(?, viewer_user_id), viewer_ip_hash = COALESCE(?, viewer_ip_hash)
+                    WHERE id = ?
+                """, [(e['slot'], e['user'], e['ip'], e['id']) for e in slots.values()])
+                if cursor.rowcount != len(slots):
+                    ids = list(slots)
+                    placeholders = ','.join('?' * len(ids))
+                    cursor.execute(f"SELECT id FROM ad_impressions WHERE id IN ({placeholders})", ids)
+                    found = {row[0] for row in cursor.fetchall()}
+                    for impression_id, event in slots.items():
+                        if impression_id in found:
+                            continue
+                        if now - event['ts'] < AD_WRITE_RETRY_SECONDS:
+                            retry.append(event)
+                        else:
+                            self.stats['dropped'] += 1
+
+            # 클릭 카운트는 이 트랜잭션 안에서만 더함 - 호출자의 deltas를 건드리면
+            # 커밋 실패 시 flush가 되돌린 delta + 재시도된 클릭으로 이중 집계됨
+            counters = {campaign_id: list(delta) for campaign_id, delta in deltas.items()}
+            for event in clicks.values():
+                # 첫 클릭만 기록 (이미 클릭된 노출은 무시)
+                cursor.execute("""
+                    UPDATE ad_impressions
+                    SET clicked = TRUE, clicked_at = ?
+                    WHERE id = ? AND clicked = FALSE
+                """, (event['ts'], event['id']))
+                if cursor.rowcount:
+                    campaign_id = event['campaign_id']
+                    if campaign_id is None:
+                        cursor.execute("SELECT campaign_id FROM ad_impressions WHERE id = ?", (event['id'],))
+                        campaign_id = cursor.fetchone()[0]
+                    counters.setdefault(campaign_id, [0, 0, 0])[1] += 1
+                    continue
+                cursor.execute("SELECT 1 FROM ad_impressions WHERE id = ?", (event['id'],))
+                if cursor.fetchone() is not None:
+                    continue  # 이미 클릭된 노출
+                # 다른 워커 버퍼에 아직 남아 있는 노출
+                if now - event['ts'] < AD_WRITE_RETRY_SECONDS:
+                    retry.append(event)
+                else:
+                    self.stats['dropped'] += 1
+
+            if counters:
+                cursor.executemany("""
+                    UPDATE ad_campaigns
+                    SET total_impressions = total_impressions + ?,
+                        total_clicks = total_clicks + ?,
+                        load_points = MAX(0, load_points + ?),
+                        updated_at = ?
+                    WHERE id = ?
+                """, [(imp, clk, lp, now, campaign_id) for campaign_id, (imp, clk, lp) in counters.items()])
+
+            conn.commit()
+        finally:
+            conn.close()
+        return retry
+
+    def status(self) -> Dict:
+        with self._lock:
+            pending = len(self._impressions) + len(self._slots) + len(self._clicks) + len(self._deltas)
+        return {'pending': pending, **self.stats}
+
+
+ad_write_buffer = AdWriteBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        ad_write_buffer.flush()
+    except Exception:
+        pass
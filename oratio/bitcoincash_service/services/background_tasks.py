@@ -1,20 +1,22 @@
+import os
+import socket
+import sqlite3
 import threading
 import time
 import traceback
+import uuid
 from config import (
     logger, ZERO_CONF_ENABLED, ZERO_CONF_DOUBLE_SPEND_CHECK, FORWARD_PAYMENTS
 )
 import models
 from services.electron_cash import electron_cash
 from services.payment import process_payment
-from zero_conf_validator import get_validator
-from services.membership_sync import setup_membership_sync
+from services.payment_watcher import payment_watcher
+from zero_conf_validator import get_validator, MEMPOOL_INDEX_REFRESH_SECONDS
+from services.membership_sync import get_membership_sync_service
 from services.cp_moderation import run_cp_background_tasks  # CP system
 from services.referral_verifier import reverify_approved_links, reverify_early_backoff  # Referral Phase B
 
-# Initialize membership sync service
-membership_sync_service = None
-
 # ==================== DB-based Task Scheduler ====================
 # 컨테이너 재시작에도 유지되는 DB 기반 스케줄러
 
@@ -57,15 +59,10 @@ def _set_last_task_run(task_name: str, timestamp: int = None):
         logger.error(f"[TaskScheduler] Failed to update last run for {task_name}: {e}")
 
 
-def _is_task_due(task_name: str, interval_seconds: int) -> bool:
-    """작업의 마지막 실행으로부터 interval_seconds 이상 경과했는지 확인."""
-    last_run = _get_last_task_run(task_name)
-    now = int(time.time())
-    return (now - last_run) >= interval_seconds
-
 def cleanup_expired_invoices():
     """만료된 인보이스 처리"""
     count = models.expire_pending_invoices()
+    models.purge_zero_conf_checks()
     return count
 
 def update_paid_invoices():
@@ -90,6 +87,7 @@ def monitor_zero_conf_transactions():
     try:
         # completed 상태이지만 confirmations < 1인 인보이스 조회
         conn = models.get_db_connection()
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, tx_hash, payment_address, amount, created_at, confirmations
@@ -111,13 +109,15 @@ def monitor_zero_conf_transactions():
         
         validator = get_validator(electron_cash)
         
+        # 트랜잭션 상태 재확인 - 전체를 배치 요청 1회로 조회
+        tx_details_by_hash = electron_cash.get_transactions([invoice['tx_hash'] for invoice in zero_conf_invoices])
+        
         for invoice in zero_conf_invoices:
             invoice_id = invoice['id']
             tx_hash = invoice['tx_hash']
             
             try:
-                # 트랜잭션 상태 재확인
-                tx_details = electron_cash.call_method("gettransaction", [tx_hash])
+                tx_details = tx_details_by_hash.get(tx_hash)
                 
                 if not tx_details:
                     logger.warning(f"⚠️ 트랜잭션을 찾을 수 없음: {tx_hash} (인보이스: {invoice_id})")
@@ -153,70 +153,57 @@ def monitor_zero_conf_transactions():
         logger.error(f"Zero-Conf 모니터링 전체 오류: {str(e)}")
         logger.error(traceback.format_exc())
 
+def refresh_mempool_index():
+    """이중지불 체크용 mempool 색인 delta 갱신 (검증 시점에 색인이 최신 상태가 되도록)
+    
+    재검증할 0-conf 인보이스가 없으면 ElectronCash를 호출하지 않음
+    """
+    if not ZERO_CONF_ENABLED or not ZERO_CONF_DOUBLE_SPEND_CHECK:
+        return
+    if not models.has_unconfirmed_zero_conf_invoices():
+        return
+    get_validator(electron_cash).mempool_index.refresh()
+
 def check_pending_invoices():
-    """대기 중인 인보이스 상태 확인"""
-    # 대기 중인 인보이스 목록 조회
-    pending_invoices = models.get_pending_invoices()
+    """대기 중인 인보이스 상태 확인
     
-    for invoice_id in pending_invoices:
-        process_payment(invoice_id)
+    주소 알림(notify)이 등록된 인보이스는 PAYMENT_FALLBACK_POLL_INTERVAL마다만 폴링하고,
+    알림 등록이 안 된 인보이스는 매번 폴링
+    """
+    payment_watcher.sync_pending()
 
-def run_background_tasks():
-    """백그라운드 작업 처리"""
-    while True:
-        try:
-            # 만료된 인보이스 처리
-            cleanup_expired_invoices()
-            
-            # 대기 중인 인보이스 상태 확인
-            check_pending_invoices()
-            
-            # 지불 확인된 인보이스 업데이트
-            update_paid_invoices()
-            
-            # Zero-Conf 트랜잭션 모니터링 (이중지불 체크)
-            monitor_zero_conf_transactions()
-            
-            # 멤버십 만료 체크 (새로 추가)
-            check_expired_memberships()
-            
-            # 업로드 쿼터 리셋 체크 (새로 추가)
-            reset_expired_upload_quotas()
-            
-            # CP 시스템 백그라운드 작업 (auto-unban, auto-delete)
-            run_cp_background_tasks()
-
-            # ── Referral Phase B: 주기적 재검증 (DB 기반 12시간 간격) ──
-            # 컨테이너 재시작에도 영향받지 않음: DB에 마지막 실행 시각 저장
-            if _is_task_due(REFERRAL_REVERIFY_TASK_NAME, REFERRAL_REVERIFY_INTERVAL):
-                logger.info("[Referral] 12h interval reached — starting re-verification cycle")
-                _set_last_task_run(REFERRAL_REVERIFY_TASK_NAME)
-
-                try:
-                    # 승인 직후 지수 백오프 재검증 (12h~64d 구간)
-                    early_checked = reverify_early_backoff()
-                    if early_checked:
-                        logger.info(f"[Referral] Early backoff re-verification done: {early_checked} links")
-                except Exception as eb_err:
-                    logger.error(f"[Referral] Early backoff re-verification error: {eb_err}")
-
-                try:
-                    # 정기 90일 재검증
-                    checked = reverify_approved_links()
-                    if checked:
-                        logger.info(f"[Referral] Periodic re-verification done: {checked} links")
-                except Exception as rv_err:
-                    logger.error(f"[Referral] Re-verification error: {rv_err}")
-            
-            # 주기적으로 자금 전송 시도 (설정에 따라)
-            if FORWARD_PAYMENTS:
-                electron_cash.forward_to_payout_wallet()
-                
-        except Exception as e:
-            logger.error(f"백그라운드 작업 오류: {str(e)}")
-        
-        # 15초마다 실행 (Zero-Conf를 위해 더 자주 체크)
-        time.sleep(15)
+def reverify_referral_links():
+    """Referral Phase B: 승인 직후 지수 백오프 재검증 + 정기 90일 재검증"""
+    logger.info("[Referral] 12h interval reached — starting re-verification cycle")
+    try:
+        # 승인 직후 지수 백오프 재검증 (12h~64d 구간)
+        early_checked = reverify_early_backoff()
+        if early_checked:
+            logger.info(f"[Referral] Early backoff re-verification done: {early_checked} links")
+    except Exception as eb_err:
+        logger.error(f"[Referral] Early backoff re-verification error: {eb_err}")
+
+    try:
+        # 정기 90일 재검증
+        checked = reverify_approved_links()
+        if checked:
+            logger.info(f"[Referral] Periodic re-verification done: {checked} links")
+    except Exception as rv_err:
+        logger.error(f"[Referral] Re-verification error: {rv_err}")
+
+
+def sync_memberships():
+    """SQLite 멤버십 → PostgreSQL 증분 동기화 (투표 가중치 트리거용)
+
+    멤버십 쓰기 시점에 바로 push되므로 이 주기 작업은 놓친 변경을 보정하는 역할.
+    """
+    get_membership_sync_service().run_sync()
+
+
+def forward_payments():
+    """주기적으로 자금 전송 시도 (설정에 따라)"""
+    if FORWARD_PAYMENTS:
+        electron_cash.forward_to_payout_wallet()
 
 def check_expired_memberships():
     """만료된 멤버십 확인 및 비활성화"""
@@ -256,24 +243,195 @@ def reset_expired_upload_quotas():
     except Exception as e:
         logger.error(f"❌ 업로드 쿼터 리셋 중 오류: {str(e)}")
 
-def start_background_tasks():
-    """백그라운드 작업 시작"""
-    global membership_sync_service
-    
-    # Initialize membership sync service
+# ==================== Leader-elected Scheduler ====================
+# gunicorn 워커마다 이 모듈이 로드되지만, 작업은 SQLite lease를 가진 리더 워커 하나만 실행.
+# 리더가 죽으면 lease가 만료되고 다른 워커가 이어받음.
+
+LEADER_LEASE_NAME = "background_tasks"
+LEADER_LEASE_TTL = int(os.environ.get('BACKGROUND_LEASE_TTL', 45))  # 초
+LEADER_HEARTBEAT_INTERVAL = max(1, LEADER_LEASE_TTL // 3)
+
+# (작업 이름, 실행 간격(초), 함수, 마지막 실행 시각을 DB에 저장할지 여부)
+# DB 저장 작업은 컨테이너 재시작에도 간격이 유지됨
+SCHEDULED_TASKS = [
+    ("check_pending_invoices", 15, check_pending_invoices, False),
+    ("cleanup_expired_invoices", 60, cleanup_expired_invoices, False),
+    ("update_paid_invoices", 60, update_paid_invoices, False),
+    ("zero_conf_monitor", 30, monitor_zero_conf_transactions, False),
+    ("mempool_index_refresh", MEMPOOL_INDEX_REFRESH_SECONDS, refresh_mempool_index, False),
+    ("expire_memberships", 300, check_expired_memberships, False),
+    ("membership_sync", 60, sync_memberships, False),
+    ("upload_quota_reset", 3600, reset_expired_upload_quotas, False),
+    ("cp_background", 60, run_cp_background_tasks, False),
+    (REFERRAL_REVERIFY_TASK_NAME, REFERRAL_REVERIFY_INTERVAL, reverify_referral_links, True),
+    ("forward_payments", 300, forward_payments, False),
+]
+
+
+def _try_acquire_lease(name: str, holder: str, ttl: int) -> bool:
+    """lease를 획득하거나 갱신. 다른 holder가 유효한 lease를 갖고 있으면 False."""
+    now = int(time.time())
+    conn = models.get_db_connection()
     try:
-        membership_sync_service = setup_membership_sync()
-        # Start periodic sync every 60 seconds
-        membership_sync_service.start_periodic_sync(interval_seconds=60)
-        logger.info("멤버십 동기화 서비스 시작됨 (PostgreSQL ↔ SQLite)")
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT holder, expires_at FROM background_task_leases WHERE name = ?",
+            (name,)
+        )
+        row = cursor.fetchone()
+        if row and row[0] != holder and row[1] > now:
+            conn.rollback()
+            return False
+        cursor.execute('''
+            INSERT INTO background_task_leases (name, holder, expires_at, acquired_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                holder = excluded.holder,
+                expires_at = excluded.expires_at,
+                acquired_at = CASE WHEN background_task_leases.holder = excluded.holder
+                                   THEN background_task_leases.acquired_at ELSE excluded.acquired_at END
+        ''', (name, holder, now + ttl, now))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def _release_lease(name: str, holder: str):
+    try:
+        conn = models.get_db_connection()
+        conn.execute(
+            "DELETE FROM background_task_leases WHERE name = ? AND holder = ?",
+            (name, holder)
+        )
+        conn.commit()
+        conn.close()
     except Exception as e:
-        logger.error(f"멤버십 동기화 서비스 시작 실패: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.error(f"[TaskScheduler] Failed to release lease {name}: {e}")
+
+
+class BackgroundScheduler:
+    """리더 워커에서만 작업을 실행하는 스케줄러 (작업별 독립 간격)"""
+
+    def __init__(self, tasks):
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._tasks = tasks
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            name: {
+                'interval': interval,
+                'last_run_at': 0,
+                'last_duration': None,
+                'runs': 0,
+                'errors': 0,
+                'last_error': None,
+            }
+            for name, interval, _, _ in tasks
+        }
+        self._next_run = {}
+
+    # ── leader election ──
+    def _heartbeat_loop(self):
+        while not self._stop.is_set():
+            try:
+                leader = _try_acquire_lease(LEADER_LEASE_NAME, self.holder, LEADER_LEASE_TTL)
+            except Exception as e:
+                logger.error(f"[TaskScheduler] Lease heartbeat failed: {e}")
+                leader = False
+            if leader != self.is_leader:
+                logger.info(f"[TaskScheduler] {self.holder} "
+                            f"{'became leader' if leader else 'is no longer leader'}")
+                if leader:
+                    self._schedule_from_state()
+                self.is_leader = leader
+            self._stop.wait(LEADER_HEARTBEAT_INTERVAL)
+        if self.is_leader:
+            _release_lease(LEADER_LEASE_NAME, self.holder)
+            self.is_leader = False
+
+    def _schedule_from_state(self):
+        """리더가 된 시점에 각 작업의 다음 실행 시각 계산"""
+        now = time.time()
+        for name, interval, _, persisted in self._tasks:
+            if persisted:
+                self._next_run[name] = _get_last_task_run(name) + interval
+            else:
+                self._next_run[name] = now
+
+    # ── task runner ──
+    def _run_task(self, name, fn, persisted):
+        started = time.time()
+        if persisted:
+            _set_last_task_run(name, int(started))
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"[TaskScheduler] Task {name} failed: {error}")
+            logger.error(traceback.format_exc())
+        duration = time.time() - started
+        with self._stats_lock:
+            stats = self._stats[name]
+            stats['last_run_at'] = int(started)
+            stats['last_duration'] = round(duration, 3)
+            stats['runs'] += 1
+            if error:
+                stats['errors'] += 1
+                stats['last_error'] = error
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            if not self.is_leader:
+                self._stop.wait(1)
+                continue
+            now = time.time()
+            for name, interval, fn, persisted in self._tasks:
+                if self._stop.is_set() or not self.is_leader:
+                    break
+                if now >= self._next_run.get(name, now):
+                    self._run_task(name, fn, persisted)
+                    self._next_run[name] = time.time() + interval
+            next_due = min(self._next_run.values()) if self._next_run else time.time() + 1
+            self._stop.wait(min(max(next_due - time.time(), 0.5), 5))
+
+    def start(self):
+        threading.Thread(target=self._heartbeat_loop, daemon=True, name="bg-lease").start()
+        thread = threading.Thread(target=self._run_loop, daemon=True, name="bg-tasks")
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """작업별 마지막 실행 시각, 소요 시간, 에러 횟수"""
+        with self._stats_lock:
+            tasks = {name: dict(stats) for name, stats in self._stats.items()}
+        return {'holder': self.holder, 'is_leader': self.is_leader, 'tasks': tasks}
+
+
+scheduler = None
+
+
+def get_background_status():
+    """/health 등에서 사용할 스케줄러 상태"""
+    if scheduler is None:
+        return {'started': False}
+    return scheduler.status()
+
+
+def start_background_tasks():
+    """백그라운드 작업 시작 (모든 워커에서 호출되지만 리더 하나만 작업 실행)"""
+    global scheduler
+    if scheduler is not None:
+        return None
     
-    # 백그라운드 스레드 시작
-    background_thread = threading.Thread(target=run_background_tasks)
-    background_thread.daemon = True
-    background_thread.start()
+    scheduler = BackgroundScheduler(SCHEDULED_TASKS)
+    background_thread = scheduler.start()
     
-    logger.info("백그라운드 작업 시작됨")
+    logger.info(f"백그라운드 작업 스케줄러 시작됨 ({scheduler.holder}, 리더 선출 대기)")
     return background_thread
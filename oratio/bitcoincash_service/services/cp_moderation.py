@@ -9,8 +9,11 @@ import time
 import uuid
 import json
 import logging
+import os
 from typing import Optional, Dict, List, Tuple
 from config import DB_PATH, logger
+from db_pool import get_sqlite_connection, get_pg_connection
+from change_counter import read_counter, bump_counter
 
 
 # ==========================================
@@ -45,17 +48,18 @@ NOTIFICATION_BAN_NOTICE = 'ban_notice'
 NOTIFICATION_PERMISSION_REVOKED = 'permission_revoked'
 NOTIFICATION_APPEAL_REVIEWED = 'appeal_reviewed'
 
+# Change counter for the nginx auth_request blocklist snapshot (middleware/cp_post_blocker.py).
+# Kept in a tiny sidecar file so every gunicorn worker can check it without a DB round-trip.
+CP_BLOCKLIST_VERSION_PATH = os.environ.get('CP_BLOCKLIST_VERSION_PATH', DB_PATH + '.cp_blocklist_version')
+
 
 # ==========================================
 # Database Helpers
 # ==========================================
 
 def get_db():
-    """Get database connection with proper settings"""
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA busy_timeout=30000")
-    conn.execute("PRAGMA foreign_keys = ON")
+    """Get pooled database connection with proper settings"""
+    conn = get_sqlite_connection(DB_PATH, foreign_keys=True)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -76,6 +80,23 @@ def execute_query(query: str, params: tuple = (), commit: bool = False):
         raise
 
 
+def get_cp_blocklist_version() -> int:
+    """Read the current CP blocklist change counter (0 if it was never bumped)"""
+    return read_counter(CP_BLOCKLIST_VERSION_PATH)
+
+
+def bump_cp_blocklist_version() -> Optional[int]:
+    """Increment the CP blocklist change counter.
+    
+    Must be called after any commit that changes which posts are hidden,
+    their escalation level or status, so cp_post_blocker rebuilds its snapshot.
+    """
+    version = bump_counter(CP_BLOCKLIST_VERSION_PATH)
+    if version is None:
+        logger.error("❌ [CP MODERATION] Failed to bump blocklist version")
+    return version
+
+
 def log_audit(action_type: str, actor_person_id: Optional[int], actor_username: Optional[str],
               target_user_id: Optional[str] = None, target_person_id: Optional[int] = None,
               target_username: Optional[str] = None, related_report_id: Optional[str] = None,
@@ -471,6 +492,7 @@ def _restore_reported_content(user_id: str, admin_username: str):
             logger.info(f"📝 [APPEAL RESTORE] CP report {report_id} marked as approved/unhidden")
         
         conn.commit()
+        bump_cp_blocklist_version()
     except Exception as e:
         logger.error(f"❌ [APPEAL RESTORE] Error in content restoration: {e}")
     finally:
@@ -545,6 +567,7 @@ def _purge_reported_content(user_id: str, admin_username: str):
             ''', (REPORT_STATUS_AUTO_DELETED, report_id))
         
         conn.commit()
+        bump_cp_blocklist_version()
     except Exception as e:
         logger.error(f"❌ [APPEAL REJECT PURGE] Error in content purge: {e}")
     finally:
@@ -614,6 +637,7 @@ def create_cp_report(content_type: str, content_id: int, community_id: int,
           previous_report_id, now, auto_delete_at))
     conn.commit()
     conn.close()
+    bump_cp_blocklist_version()
     
     # Log audit
     log_audit('report_created', reporter_person_id, reporter_username, creator_user_id,
@@ -783,6 +807,7 @@ def review_cp_report(report_id: str, reviewer_person_id: int, reviewer_username:
     
     conn.commit()
     conn.close()
+    bump_cp_blocklist_version()
     
     # Handle consequences based on decision
     if decision == REVIEW_DECISION_CP_CONFIRMED:
@@ -895,6 +920,7 @@ def review_cp_report(report_id: str, reviewer_person_id: int, reviewer_username:
                             ''', (REPORT_STATUS_AUTO_DELETED, report_id))
                             conn2.commit()
                             conn2.close()
+                            bump_cp_blocklist_version()
                         except Exception as e:
                             logger.error(f"❌ [CP REVIEW] Failed to update cp_reports after purge: {e}")
                     else:
@@ -911,21 +937,8 @@ def review_cp_report(report_id: str, reviewer_person_id: int, reviewer_username:
         logger.info(f"✅ [CP REVIEW] Not CP - unhiding content in Lemmy DB directly")
         
         try:
-            import psycopg2
-            import os
-            
             # Connect to Lemmy's PostgreSQL database
-            lemmy_db_host = os.environ.get('POSTGRES_HOST', 'postgres')
-            lemmy_db_name = os.environ.get('POSTGRES_DB', 'lemmy')
-            lemmy_db_user = os.environ.get('POSTGRES_USER', 'lemmy')
-            lemmy_db_password = os.environ.get('POSTGRES_PASSWORD', '')
-            
-            pg_conn = psycopg2.connect(
-                host=lemmy_db_host,
-                database=lemmy_db_name,
-                user=lemmy_db_user,
-                password=lemmy_db_password
-            )
+            pg_conn = get_pg_connection()
             pg_cursor = pg_conn.cursor()
             
             if report['content_type'] == 'post':
@@ -1408,6 +1421,7 @@ def check_auto_delete_reports():
     
     conn.commit()
     conn.close()
+    bump_cp_blocklist_version()
     # DB lock released here
     
     # Phase 2: Purge content from Lemmy via API (slow, no DB lock held)
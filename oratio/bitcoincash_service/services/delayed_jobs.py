@@ -0,0 +1,86 @@
+"""
+Delayed Job Queue
+=================
+Runs a callable after a delay without parking a thread on time.sleep().
+
+One timer thread waits on a heap of due times; due jobs are handed to a small
+worker pool, so many jobs can run concurrently and a slow job never delays
+the others. Jobs are scheduled with a key, and a key that is already queued is
+not scheduled twice.
+
+Jobs live in process memory only. Callers that need the work to survive a
+restart must keep their own durable state (see zero_conf_checks) and let a
+periodic poll pick up anything that was lost.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import logger
+
+
+class DelayedJobQueue:
+    def __init__(self, max_workers=4, name="delayed-job"):
+        self._name = name
+        self._heap = []  # (due_at, seq, key, fn, args)
+        self._keys = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._thread = None
+        self.stats = {'scheduled': 0, 'run': 0, 'errors': 0}
+
+    def _ensure_thread(self):
+        # Started lazily so gunicorn workers forked after import get their own thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"{self._name}-timer", daemon=True)
+            self._thread.start()
+
+    def schedule(self, delay, fn, *args, key=None) -> bool:
+        """Run fn(*args) after `delay` seconds.
+
+        Returns:
+            False if a job with the same key is already queued
+        """
+        with self._cond:
+            if key is not None:
+                if key in self._keys:
+                    return False
+                self._keys.add(key)
+            heapq.heappush(self._heap, (time.monotonic() + max(0, delay), next(self._seq), key, fn, args))
+            self.stats['scheduled'] += 1
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _run_job(self, fn, args):
+        try:
+            fn(*args)
+            self.stats['run'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"[{self._name}] 지연 작업 오류 ({getattr(fn, '__name__', fn)}): {str(e)}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due_at, _, key, fn, args = self._heap[0]
+                wait = due_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._heap)
+                self._keys.discard(key)
+            self._executor.submit(self._run_job, fn, args)
+
+
+delayed_jobs = DelayedJobQueue()
@@ -1,92 +1,352 @@
 import json
 import time
 import logging
+import random
+import itertools
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
 import traceback
 import os
 from config import (
     ELECTRON_CASH_URL, ELECTRON_CASH_USER, ELECTRON_CASH_PASSWORD,
     PAYOUT_WALLET, MOCK_MODE, DIRECT_MODE, logger, EC_AVAILABLE,
-    FORWARD_PAYMENTS, MIN_PAYOUT_AMOUNT
+    FORWARD_PAYMENTS, MIN_PAYOUT_AMOUNT,
+    EC_RPC_TIMEOUT, EC_RPC_POOL_SIZE, EC_RPC_MAX_RETRIES, EC_RPC_BACKOFF_BASE,
+    EC_RPC_BACKOFF_MAX, EC_BREAKER_THRESHOLD, EC_BREAKER_COOLDOWN
 )
 import models
 
+JSONRPC_METHOD_NOT_FOUND = -32601
+
+
+def _is_method_not_found(error):
+    """JSON-RPC 오류가 '지원하지 않는 메서드'인지 확인"""
+    if isinstance(error, dict):
+        if error.get("code") == JSONRPC_METHOD_NOT_FOUND:
+            return True
+        error = error.get("message", "")
+    text = str(error).lower()
+    return "method not found" in text or "unknown method" in text or "unknown command" in text
+
+
+class CircuitOpenError(Exception):
+    """ElectronCash 회로 차단 상태 (연속 실패 후 쿨다운 중)"""
+
+
+class CircuitBreaker:
+    """연속 실패 시 일정 시간 동안 RPC 호출을 즉시 실패시키는 회로 차단기
+
+    closed → (연속 실패 threshold회) → open → (cooldown 경과) → half-open (시험 호출 1회)
+    시험 호출이 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, threshold=EC_BREAKER_THRESHOLD, cooldown=EC_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.recoveries = 0  # open → closed 전환 횟수 (ElectronCash 재시작 감지용)
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("🔌 ElectronCash 회로 복구 (closed)")
+                self.recoveries += 1
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logger.warning(f"🔌 ElectronCash 회로 차단 (연속 실패 {self._failures}회, {self.cooldown}초 대기)")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
 class ElectronCashClient:
     def __init__(self, url=ELECTRON_CASH_URL):
         self.url = url
         self.headers = {'content-type': 'application/json'}
         self.auth = (ELECTRON_CASH_USER, ELECTRON_CASH_PASSWORD)
-        self.rpc_id = 0
+        self._rpc_ids = itertools.count(1)
         self.auth_retries = 0
         self.max_retries = 3
-        
-    def call_method(self, method, params=None):
-        if params is None:
-            params = []
-            
-        self.rpc_id += 1
-        payload = {
+        self.batch_supported = True
+        self.unsupported_methods = set()  # method-not-found를 반환한 메서드 (성공하면 제거)
+        self.breaker = CircuitBreaker()
+
+        # keep-alive 연결을 재사용하는 세션 (요청마다 TCP 연결을 새로 맺지 않음)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=EC_RPC_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+
+    @property
+    def rpc_id(self):
+        return next(self._rpc_ids)
+
+    def _make_request(self, method, params=None):
+        return {
             "method": method,
-            "params": params,
+            "params": params if params is not None else [],
             "jsonrpc": "2.0",
             "id": self.rpc_id,
         }
+
+    def _backoff(self, attempt):
+        """지수 백오프 + full jitter"""
+        delay = min(EC_RPC_BACKOFF_MAX, EC_RPC_BACKOFF_BASE * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))
+
+    def _refresh_auth(self):
+        # Re-setup authentication and update credentials
+        rpc_user, rpc_password = setup_electron_cash_auth()
+        self.auth = (rpc_user, rpc_password)
+
+    def _post(self, payload):
+        """JSON-RPC 페이로드 전송 (단일 요청 dict 또는 배치 list)
+
+        연결 오류/타임아웃/5xx는 지수 백오프로 재시도하고, 401은 자격 증명을 재설정한 뒤 재시도.
+        최종 실패는 회로 차단기에 기록됨.
+
+        Returns:
+            파싱된 JSON 응답 (dict 또는 list)
+
+        Raises:
+            CircuitOpenError: 회로 차단 중
+            requests.exceptions.RequestException / ValueError: 재시도 후에도 실패
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("ElectronCash circuit is open")
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    self.url,
+                    data=json.dumps(payload),
+                    auth=self.auth,
+                    timeout=EC_RPC_TIMEOUT
+                )
+
+                # Check for authentication errors
+                if response.status_code == 401 and self.auth_retries < self.max_retries:
+                    logger.warning(f"RPC 인증 실패 (시도 {self.auth_retries + 1}/{self.max_retries}). 자격 증명 재설정 중...")
+                    self.auth_retries += 1
+                    self._refresh_auth()
+                    self._backoff(attempt)
+                    continue
+
+                if response.status_code >= 500 and attempt < EC_RPC_MAX_RETRIES:
+                    # JSON-RPC 오류도 500으로 올 수 있으므로 본문이 JSON이면 그대로 반환
+                    try:
+                        body = response.json()
+                        self.breaker.record_success()
+                        return body
+                    except ValueError:
+                        raise requests.exceptions.HTTPError(f"{response.status_code} Server Error", response=response)
+
+                # Reset retry counter on success
+                if response.status_code == 200:
+                    self.auth_retries = 0
+
+                try:
+                    body = response.json()
+                except ValueError:
+                    logger.error(f"RPC 응답이 유효한 JSON이 아닙니다: {response.text}")
+                    self.breaker.record_failure()
+                    raise
+                self.breaker.record_success()
+                return body
+
+            except requests.exceptions.RequestException as e:
+                if attempt < EC_RPC_MAX_RETRIES:
+                    logger.debug(f"RPC 요청 실패, 재시도 ({attempt + 1}/{EC_RPC_MAX_RETRIES}): {str(e)}")
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+
+    def call_method(self, method, params=None):
+        if params is None:
+            params = []
+            
+        payload = self._make_request(method, params)
         
         try:
             logger.debug(f"RPC 호출: {method} {params}")
-            response = requests.post(
-                self.url, 
-                data=json.dumps(payload), 
-                headers=self.headers,
-                auth=self.auth,
-                timeout=10
-            )
-            
-            # Check for authentication errors
-            if response.status_code == 401 and self.auth_retries < self.max_retries:
-                logger.warning(f"RPC 인증 실패 (시도 {self.auth_retries + 1}/{self.max_retries}). 자격 증명 재설정 중...")
-                self.auth_retries += 1
-                
-                # Re-setup authentication and update credentials
-                rpc_user, rpc_password = setup_electron_cash_auth()
-                self.auth = (rpc_user, rpc_password)
-                
-                # Retry the call
-                time.sleep(1)  # Small delay before retry
-                return self.call_method(method, params)
-                
-            # Reset retry counter on success
-            if response.status_code == 200:
-                self.auth_retries = 0
-            
-            try:
-                json_response = response.json()
-                if "result" in json_response:
-                    return json_response["result"]
-                elif "error" in json_response:
-                    logger.error(f"RPC 오류: {json_response['error']}")
-                    return None
-            except ValueError:
-                logger.error(f"RPC 응답이 유효한 JSON이 아닙니다: {response.text}")
-                return None
-                
+            json_response = self._post(payload)
+        except CircuitOpenError:
+            logger.debug(f"ElectronCash 회로 차단 중 - 호출 생략: {method}")
+            return None
+        except ValueError:
+            return None
         except requests.exceptions.RequestException as e:
-            if "401" in str(e) and self.auth_retries < self.max_retries:
-                logger.warning(f"RPC 인증 실패 예외 (시도 {self.auth_retries + 1}/{self.max_retries}). 자격 증명 재설정 중...")
-                self.auth_retries += 1
-                
-                # Re-setup authentication and update credentials
-                rpc_user, rpc_password = setup_electron_cash_auth()
-                self.auth = (rpc_user, rpc_password)
-                
-                # Retry the call
-                time.sleep(1)  # Small delay before retry
-                return self.call_method(method, params)
-            
             logger.error(f"Electron Cash 호출 오류: {str(e)}")
             return None
         
+        if isinstance(json_response, dict):
+            if "result" in json_response:
+                self.unsupported_methods.discard(method)
+                return json_response["result"]
+            elif "error" in json_response:
+                self._log_rpc_error(method, json_response["error"])
+        return None
+
+    def _log_rpc_error(self, method, error):
+        """RPC 오류 로그. 지원하지 않는 메서드는 처음 한 번만 경고하고 unsupported_methods에 기록"""
+        if _is_method_not_found(error):
+            if method not in self.unsupported_methods:
+                self.unsupported_methods.add(method)
+                logger.warning(f"ElectronCash가 {method} 메서드를 지원하지 않습니다: {error}")
+            return
+        logger.error(f"RPC 오류 ({method}): {error}")
+
+    def _call_each(self, calls):
+        """배치 대신 개별 호출. 도중에 지원하지 않는 것으로 확인된 메서드는 나머지 호출을 건너뜀"""
+        results = []
+        skipped = set()
+        for method, params in calls:
+            if method in skipped:
+                results.append(None)
+                continue
+            result = self.call_method(method, params)
+            if result is None and method in self.unsupported_methods:
+                skipped.add(method)
+            results.append(result)
+        return results
+
+    def call_batch(self, calls):
+        """여러 RPC 호출을 하나의 JSON-RPC 배치 요청(HTTP 1회)으로 실행
+
+        Args:
+            calls: [(method, params), ...]
+
+        Returns:
+            list: 호출 순서대로의 결과 (오류인 항목은 None)
+        """
+        if not calls:
+            return []
+        if not self.batch_supported:
+            return self._call_each(calls)
+
+        requests_payload = [self._make_request(method, params) for method, params in calls]
+        
+        try:
+            logger.debug(f"RPC 배치 호출: {len(calls)}개 ({', '.join(sorted({m for m, _ in calls}))})")
+            json_response = self._post(requests_payload)
+        except CircuitOpenError:
+            logger.debug(f"ElectronCash 회로 차단 중 - 배치 호출 생략 ({len(calls)}개)")
+            return [None] * len(calls)
+        except ValueError:
+            return [None] * len(calls)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Electron Cash 배치 호출 오류: {str(e)}")
+            return [None] * len(calls)
+        
+        if not isinstance(json_response, list):
+            # 배치를 지원하지 않는 서버 - 이후 개별 호출로 대체
+            logger.warning("ElectronCash가 JSON-RPC 배치를 지원하지 않습니다. 개별 호출로 전환합니다.")
+            self.batch_supported = False
+            return self._call_each(calls)
+        
+        # 배치 응답은 순서가 보장되지 않으므로 id로 매칭
+        by_id = {item.get("id"): item for item in json_response if isinstance(item, dict)}
+        results = []
+        for request_item in requests_payload:
+            item = by_id.get(request_item["id"])
+            if item is None:
+                results.append(None)
+            elif item.get("error") is not None:
+                self._log_rpc_error(request_item["method"], item["error"])
+                results.append(None)
+            else:
+                self.unsupported_methods.discard(request_item["method"])
+                results.append(item.get("result"))
+        return results
+
+    def status(self):
+        """RPC 클라이언트 상태 (헬스 체크용)"""
+        return {
+            "circuit": self.breaker.state,
+            "batch_supported": self.batch_supported,
+            "unsupported_methods": sorted(self.unsupported_methods),
+        }
+
+    @staticmethod
+    def _parse_balance(result):
+        """getaddressbalance 응답을 BCH 단위 합계로 변환 (문자열은 BCH, 정수는 satoshi)"""
+        total = 0.0
+        for key in ("confirmed", "unconfirmed"):
+            value = result.get(key, 0)
+            total += float(value) if isinstance(value, str) else float(value) / 100000000.0
+        return total
+
+    def get_address_states(self, addresses):
+        """여러 주소의 트랜잭션 내역과 잔액을 배치 요청 1회로 조회
+
+        Args:
+            addresses: 주소 목록 (bitcoincash: 접두사 유무 무관)
+
+        Returns:
+            dict: {접두사 없는 주소: {"history": list|None, "balance": float|None}}
+        """
+        clean_addresses = list(dict.fromkeys(a.replace('bitcoincash:', '') for a in addresses))
+        calls = []
+        for clean_address in clean_addresses:
+            calls.append(("getaddresshistory", [clean_address]))
+            calls.append(("getaddressbalance", [f"bitcoincash:{clean_address}"]))
+        results = self.call_batch(calls)
+        
+        states = {}
+        for index, clean_address in enumerate(clean_addresses):
+            history, balance_result = results[2 * index], results[2 * index + 1]
+            balance = None
+            if isinstance(balance_result, dict):
+                try:
+                    balance = self._parse_balance(balance_result)
+                except (ValueError, TypeError) as e:
+                    logger.error(f"Balance conversion error: {str(e)}")
+            states[clean_address] = {"history": history, "balance": balance}
+        return states
+
+    def get_transactions(self, tx_hashes):
+        """여러 트랜잭션 정보를 배치 요청 1회로 조회
+
+        Returns:
+            dict: {tx_hash: gettransaction 결과 또는 None}
+        """
+        tx_hashes = list(dict.fromkeys(tx_hashes))
+        results = self.call_batch([("gettransaction", [tx_hash]) for tx_hash in tx_hashes])
+        return dict(zip(tx_hashes, results))
+
     def get_new_address(self):
         """새 BCH 주소 생성"""
         # 직접 결제 모드에서는 Coinomi 주소를 사용
@@ -998,8 +1258,6 @@ electron_cash = ElectronCashClient()
 setup_electron_cash_auth()
 
 # ElectronCash 모듈 초기화 (백그라운드에서 실행하여 gunicorn 워커 타임아웃 방지)
-import threading
-
 _ec_initialized = False
 _ec_init_lock = threading.Lock()
 
@@ -2,39 +2,70 @@
 Membership Posts Service
 Queries PostgreSQL directly to fetch posts from membership users
 in Lemmy API-compatible format with full sorting and pagination support.
+
+Pages are addressed with an opaque keyset cursor (the sort key values and id
+of the last row), so page 50 costs the same index range scan as page 1.
+The legacy numeric `page` parameter still works through OFFSET.
 """
 
 import psycopg2
 import psycopg2.extras
 import os
+import json
+import time
+import base64
 import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple
 
+from db_pool import get_pg_connection
+
 logger = logging.getLogger('membership_posts')
 
-# Sorting map: Lemmy SortType → SQL ORDER BY
-SORT_MAP = {
-    'Active': 'pa.hot_rank_active DESC, pa.published DESC',
-    'Hot': 'pa.hot_rank DESC, pa.published DESC',
-    'Scaled': 'pa.scaled_rank DESC, pa.published DESC',
-    'Controversial': 'pa.controversy_rank DESC, pa.published DESC',
-    'New': 'pa.published DESC',
-    'Old': 'pa.published ASC',
-    'MostComments': 'pa.comments DESC, pa.published DESC',
-    'NewComments': 'pa.newest_comment_time DESC, pa.published DESC',
-    'TopDay': 'pa.score DESC, pa.published DESC',
-    'TopWeek': 'pa.score DESC, pa.published DESC',
-    'TopMonth': 'pa.score DESC, pa.published DESC',
-    'TopYear': 'pa.score DESC, pa.published DESC',
-    'TopAll': 'pa.score DESC, pa.published DESC',
-    'TopHour': 'pa.score DESC, pa.published DESC',
-    'TopSixHour': 'pa.score DESC, pa.published DESC',
-    'TopTwelveHour': 'pa.score DESC, pa.published DESC',
-    'TopThreeMonths': 'pa.score DESC, pa.published DESC',
-    'TopSixMonths': 'pa.score DESC, pa.published DESC',
-    'TopNineMonths': 'pa.score DESC, pa.published DESC',
+# Sorting map: Lemmy SortType → (sort key columns, direction).
+# p.id is appended as the final tie-breaker, so (keys..., p.id) is a total order
+# and the last row of a page is enough to resume from (keyset pagination).
+_TOP_KEYS = ('pa.score', 'pa.published')
+SORT_KEYS = {
+    'Active': (('pa.hot_rank_active', 'pa.published'), 'DESC'),
+    'Hot': (('pa.hot_rank', 'pa.published'), 'DESC'),
+    'Scaled': (('pa.scaled_rank', 'pa.published'), 'DESC'),
+    'Controversial': (('pa.controversy_rank', 'pa.published'), 'DESC'),
+    'New': (('pa.published',), 'DESC'),
+    'Old': (('pa.published',), 'ASC'),
+    'MostComments': (('pa.comments', 'pa.published'), 'DESC'),
+    'NewComments': (('pa.newest_comment_time', 'pa.published'), 'DESC'),
+    'TopDay': (_TOP_KEYS, 'DESC'),
+    'TopWeek': (_TOP_KEYS, 'DESC'),
+    'TopMonth': (_TOP_KEYS, 'DESC'),
+    'TopYear': (_TOP_KEYS, 'DESC'),
+    'TopAll': (_TOP_KEYS, 'DESC'),
+    'TopHour': (_TOP_KEYS, 'DESC'),
+    'TopSixHour': (_TOP_KEYS, 'DESC'),
+    'TopTwelveHour': (_TOP_KEYS, 'DESC'),
+    'TopThreeMonths': (_TOP_KEYS, 'DESC'),
+    'TopSixMonths': (_TOP_KEYS, 'DESC'),
+    'TopNineMonths': (_TOP_KEYS, 'DESC'),
 }
 
+# Sort key columns holding timestamps (sent through the cursor as ISO strings)
+_TIMESTAMP_KEYS = {'pa.published', 'pa.newest_comment_time'}
+
+# Short-lived result cache: the first pages of each sort are requested by every
+# visitor with the Members filter on, and a few seconds of staleness is fine.
+RESULT_CACHE_TTL = float(os.environ.get('MEMBERSHIP_POSTS_CACHE_TTL', 15))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('MEMBERSHIP_POSTS_CACHE_MAX_ENTRIES', 256))
+
+_result_cache: "OrderedDict[tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+class InvalidCursorError(ValueError):
+    """page_cursor could not be decoded or belongs to a different sort"""
+
+
 # Time window for "Top" sorts
 TOP_TIME_WINDOWS = {
     'TopHour': "NOW() - INTERVAL '1 hour'",
@@ -52,14 +83,8 @@ TOP_TIME_WINDOWS = {
 
 
 def get_postgres_connection():
-    """Get a PostgreSQL connection using environment variables."""
-    return psycopg2.connect(
-        host=os.environ.get('POSTGRES_HOST', 'postgres'),
-        port=int(os.environ.get('POSTGRES_PORT', 5432)),
-        user=os.environ.get('POSTGRES_USER', 'lemmy'),
-        password=os.environ.get('POSTGRES_PASSWORD', ''),
-        database=os.environ.get('POSTGRES_DB', 'lemmy'),
-    )
+    """Get a pooled PostgreSQL connection using environment variables."""
+    return get_pg_connection()
 
 
 def get_membership_user_ids(conn) -> List[int]:
@@ -80,11 +105,68 @@ def get_membership_user_ids(conn) -> List[int]:
     return ids
 
 
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Encode the sort key values of the last row into an opaque page cursor."""
+    payload = {
+        "s": sort,
+        "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(sort: str, token: str) -> List[Any]:
+    """Decode a page cursor back into sort key values (the last one is p.id)."""
+    keys, _ = SORT_KEYS[sort]
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = payload['k']
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError(f"Malformed page_cursor: {e}")
+
+    if payload.get('s') != sort or not isinstance(values, list) or len(values) != len(keys) + 1:
+        raise InvalidCursorError("page_cursor does not match the requested sort")
+
+    decoded = []
+    for column, value in zip(keys + ('p.id',), values):
+        if column in _TIMESTAMP_KEYS and value is not None:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise InvalidCursorError(f"Bad timestamp in page_cursor: {value!r}")
+        elif value is not None and not isinstance(value, (int, float)):
+            raise InvalidCursorError(f"Bad value in page_cursor: {value!r}")
+        decoded.append(value)
+    return decoded
+
+
+def _cache_get(key: tuple) -> Optional[Dict[str, Any]]:
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _result_cache[key]
+            return None
+        _result_cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key: tuple, result: Dict[str, Any]):
+    with _result_cache_lock:
+        _result_cache[key] = (time.monotonic() + RESULT_CACHE_TTL, result)
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_MAX_ENTRIES:
+            _result_cache.popitem(last=False)
+
+
 def fetch_membership_posts(
     sort: str = 'Active',
     page: int = 1,
     limit: int = 20,
     listing_type: str = 'Local',
+    page_cursor: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Fetch posts from membership users with sorting and pagination.
@@ -92,38 +174,71 @@ def fetch_membership_posts(
     
     Args:
         sort: SortType string (Active, Hot, New, etc.)
-        page: Page number (1-indexed)
+        page: Page number (1-indexed); only used when no page_cursor is given
         limit: Posts per page (default 20)
         listing_type: ListingType (Local, All) — mostly Local for this use case
+        page_cursor: next_page value from the previous response
     
     Returns:
         Dict matching Lemmy's GetPostsResponse: { posts: [...], next_page: "..." }
+
+    Raises:
+        InvalidCursorError: page_cursor is malformed or was issued for another sort
     """
+    if sort not in SORT_KEYS:
+        sort = 'Active'
+
+    after = decode_cursor(sort, page_cursor) if page_cursor else None
+    cache_key = (sort, page_cursor or page, limit)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     conn = None
     try:
         conn = get_postgres_connection()
-        
-        # Get membership user IDs
-        member_ids = get_membership_user_ids(conn)
-        if not member_ids:
-            return {"posts": [], "next_page": None}
-        
-        # Build ORDER BY clause
-        order_by = SORT_MAP.get(sort, SORT_MAP['Active'])
-        
-        # Build time window filter for "Top" sorts
-        time_filter = ""
-        if sort in TOP_TIME_WINDOWS and TOP_TIME_WINDOWS[sort] is not None:
-            time_filter = f"AND p.published > {TOP_TIME_WINDOWS[sort]}"
-        
-        # Calculate offset
-        offset = (page - 1) * limit
-        
-        # Placeholders for member IDs
-        id_placeholders = ','.join(['%s'] * len(member_ids))
-        
-        # Main query: fetch posts with all related data in Lemmy API format
-        query = f"""
+        result = _query_membership_posts(conn, sort, limit, after, 0 if after else (page - 1) * limit)
+        conn.close()
+    except Exception as e:
+        logger.error(f"Error fetching membership posts: {str(e)}")
+        if conn:
+            conn.close()
+        return {"posts": [], "next_page": None}
+
+    _cache_put(cache_key, result)
+    return result
+
+
+def _query_membership_posts(conn, sort: str, limit: int, after: Optional[List[Any]], offset: int) -> Dict[str, Any]:
+    keys, direction = SORT_KEYS[sort]
+    key_columns = keys + ('p.id',)
+
+    # Build ORDER BY clause
+    order_by = ', '.join(f"{column} {direction}" for column in key_columns)
+
+    # Build time window filter for "Top" sorts
+    time_filter = ""
+    if sort in TOP_TIME_WINDOWS and TOP_TIME_WINDOWS[sort] is not None:
+        time_filter = f"AND p.published > {TOP_TIME_WINDOWS[sort]}"
+
+    # Keyset filter: rows strictly after the last row of the previous page.
+    # All key columns share one direction, so a row comparison does it.
+    keyset_filter = ""
+    params: List[Any] = []
+    if after is not None:
+        comparison = '<' if direction == 'DESC' else '>'
+        placeholders = ', '.join(['%s'] * len(key_columns))
+        keyset_filter = f"AND ({', '.join(key_columns)}) {comparison} ({placeholders})"
+        params.extend(after)
+
+    sort_key_columns = ',\n                '.join(
+        f"{column} AS sort_key_{i}" for i, column in enumerate(key_columns)
+    )
+
+    # Main query: fetch posts with all related data in Lemmy API format.
+    # Membership is checked in the join instead of shipping an IN (...) list
+    # of every member id with each request.
+    query = f"""
             SELECT 
                 -- Post fields
                 p.id AS post_id,
@@ -200,55 +315,53 @@ def fetch_membership_posts(
                 pa.upvotes,
                 pa.downvotes,
                 TO_CHAR(pa.published AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS counts_published,
-                TO_CHAR(pa.newest_comment_time AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS newest_comment_time
+                TO_CHAR(pa.newest_comment_time AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"') AS newest_comment_time,
+
+                -- Raw sort key values (for the next_page cursor)
+                {sort_key_columns}
                 
             FROM post p
             JOIN person pe ON p.creator_id = pe.id
+            JOIN user_memberships um ON um.user_id = pe.name
             JOIN community c ON p.community_id = c.id
             JOIN post_aggregates pa ON p.id = pa.post_id
-            WHERE p.creator_id IN ({id_placeholders})
+            WHERE um.is_active = TRUE
+              AND um.expires_at > EXTRACT(EPOCH FROM NOW())
               AND p.deleted = false
               AND p.removed = false
               AND c.deleted = false
               AND c.removed = false
               {time_filter}
-            ORDER BY {order_by}, p.id DESC
+              {keyset_filter}
+            ORDER BY {order_by}
             LIMIT %s OFFSET %s
         """
-        
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        params = member_ids + [limit + 1, offset]  # limit+1 to check if next page exists
-        cursor.execute(query, params)
-        
-        rows = cursor.fetchall()
-        
-        # Determine if there's a next page
-        has_next_page = len(rows) > limit
-        if has_next_page:
-            rows = rows[:limit]  # Trim to actual limit
-        
-        # Build response in Lemmy API format
-        posts = []
-        for row in rows:
-            post_view = build_post_view(row)
-            posts.append(post_view)
-        
-        # next_page cursor (simple page-based, encoded as string)
-        next_page = f"MemberP{page + 1}" if has_next_page else None
-        
-        cursor.close()
-        conn.close()
-        
-        return {
-            "posts": posts,
-            "next_page": next_page,
-        }
-        
-    except Exception as e:
-        logger.error(f"Error fetching membership posts: {str(e)}")
-        if conn:
-            conn.close()
-        return {"posts": [], "next_page": None}
+
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    params.extend([limit + 1, offset])  # limit+1 to check if next page exists
+    cursor.execute(query, params)
+
+    rows = cursor.fetchall()
+    cursor.close()
+
+    # Determine if there's a next page
+    has_next_page = len(rows) > limit
+    if has_next_page:
+        rows = rows[:limit]  # Trim to actual limit
+
+    # Build response in Lemmy API format
+    posts = [build_post_view(row) for row in rows]
+
+    # next_page cursor encodes the sort key of the last row on this page
+    next_page = None
+    if has_next_page:
+        last = rows[-1]
+        next_page = encode_cursor(sort, [last[f"sort_key_{i}"] for i in range(len(key_columns))])
+
+    return {
+        "posts": posts,
+        "next_page": next_page,
+    }
 
 
 def build_post_view(row) -> Dict[str, Any]:
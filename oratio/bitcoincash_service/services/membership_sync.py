@@ -2,17 +2,32 @@
 Membership Sync Service
 Syncs membership data from bitcoincash service SQLite DB to Lemmy PostgreSQL DB
 This enables the vote multiplier triggers to work correctly
+
+Only changed rows are pushed: every write to user_memberships stamps
+updated_at, the periodic cycle reads rows changed since its last read, and
+writers call notify_membership_changed() so a new member's row reaches
+PostgreSQL within seconds instead of waiting for the next cycle.
 """
 
 import sqlite3
-import psycopg2
 import time
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterable, Optional
 import os
 
+import psycopg2.extras
+
+from db_pool import get_sqlite_connection, get_pg_connection
+
 logger = logging.getLogger('membership_sync')
 
+# Delay before a write-triggered push, so a burst of writes goes out in one round trip
+MEMBERSHIP_SYNC_DEBOUNCE = float(os.environ.get('MEMBERSHIP_SYNC_DEBOUNCE', 1.0))
+
+_MEMBERSHIP_COLUMNS = "user_id, membership_type, purchased_at, expires_at, amount_paid, is_active, updated_at"
+
+
 class MembershipSyncService:
     """Service to sync membership data between databases"""
     
@@ -29,129 +44,156 @@ class MembershipSyncService:
         self.sqlite_db_path = sqlite_db_path
         self.postgres_config = postgres_config
         self.last_sync_time = 0
+        # updated_at watermark of the last periodic read (None → next cycle is a full sync)
+        self.watermark: Optional[int] = None
+        self._schema_ready = False
+        self._lock = threading.Lock()
         
-    def get_active_memberships(self) -> List[Dict[str, Any]]:
+    def get_changed_memberships(self, since: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Get all active memberships from bitcoincash service database
+        Get memberships changed since a watermark from bitcoincash service database
+        
+        Args:
+            since: updated_at watermark; None returns every membership (full sync)
         
         Returns:
-            List of membership records
+            List of membership records (active and inactive)
         """
         try:
-            conn = sqlite3.connect(self.sqlite_db_path)
+            conn = get_sqlite_connection(self.sqlite_db_path)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT 
-                    user_id,
-                    membership_type,
-                    purchased_at,
-                    expires_at,
-                    amount_paid,
-                    is_active
-                FROM user_memberships
-                WHERE is_active = 1
-            """)
+            if since is None:
+                cursor.execute(f"SELECT {_MEMBERSHIP_COLUMNS} FROM user_memberships")
+            else:
+                # >= so rows written later in the same second as the last read are not missed
+                cursor.execute(
+                    f"SELECT {_MEMBERSHIP_COLUMNS} FROM user_memberships WHERE updated_at >= ?",
+                    (since,)
+                )
             
             memberships = [dict(row) for row in cursor.fetchall()]
             conn.close()
             
-            logger.info(f"Retrieved {len(memberships)} active memberships from SQLite")
+            if memberships:
+                logger.info(f"Retrieved {len(memberships)} changed memberships from SQLite")
             return memberships
             
         except Exception as e:
             logger.error(f"Error reading from SQLite database: {str(e)}")
             return []
     
+    def get_memberships_for_users(self, user_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Get the current membership rows of specific users"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        conn = get_sqlite_connection(self.sqlite_db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            placeholders = ','.join('?' * len(user_ids))
+            cursor = conn.execute(
+                f"SELECT {_MEMBERSHIP_COLUMNS} FROM user_memberships WHERE user_id IN ({placeholders})",
+                user_ids
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def ensure_schema(self, cursor):
+        """Create the PostgreSQL table and index (once per process)"""
+        if self._schema_ready:
+            return
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_memberships (
+                user_id TEXT PRIMARY KEY,
+                membership_type TEXT DEFAULT 'annual',
+                purchased_at INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL,
+                amount_paid REAL NOT NULL,
+                is_active BOOLEAN DEFAULT TRUE,
+                synced_at TIMESTAMP DEFAULT NOW()
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_memberships_active 
+                ON user_memberships(user_id, is_active, expires_at)
+        """)
+        self._schema_ready = True
+    
     def sync_to_postgres(self, memberships: List[Dict[str, Any]]) -> int:
         """
-        Sync membership data to PostgreSQL
+        Upsert membership rows into PostgreSQL in a single statement
         
         Args:
             memberships: List of membership records to sync
             
         Returns:
-            Number of records synced
+            Number of records synced, or -1 if the push failed
         """
         if not memberships:
-            logger.info("No memberships to sync")
             return 0
         
+        conn = None
         try:
-            conn = psycopg2.connect(**self.postgres_config)
+            conn = get_pg_connection(self.postgres_config)
             cursor = conn.cursor()
+            self.ensure_schema(cursor)
             
-            # First, create the table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_memberships (
-                    user_id TEXT PRIMARY KEY,
-                    membership_type TEXT DEFAULT 'annual',
-                    purchased_at INTEGER NOT NULL,
-                    expires_at INTEGER NOT NULL,
-                    amount_paid REAL NOT NULL,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                )
-            """)
-            
-            # Create index if not exists
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_user_memberships_active 
-                    ON user_memberships(user_id, is_active, expires_at)
-            """)
+            rows = [(
+                m['user_id'],
+                m['membership_type'],
+                m['purchased_at'],
+                m['expires_at'],
+                m['amount_paid'],
+                # Convert SQLite integer (0/1) to PostgreSQL boolean (True/False)
+                bool(m['is_active']),
+            ) for m in memberships]
             
-            # Sync each membership
-            synced_count = 0
-            for membership in memberships:
-                try:
-                    # Convert SQLite integer (0/1) to PostgreSQL boolean (True/False)
-                    is_active_bool = bool(membership['is_active'])
-                    
-                    cursor.execute("""
-                        INSERT INTO user_memberships 
-                            (user_id, membership_type, purchased_at, expires_at, amount_paid, is_active, synced_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                        ON CONFLICT (user_id) 
-                        DO UPDATE SET
-                            membership_type = EXCLUDED.membership_type,
-                            purchased_at = EXCLUDED.purchased_at,
-                            expires_at = EXCLUDED.expires_at,
-                            amount_paid = EXCLUDED.amount_paid,
-                            is_active = EXCLUDED.is_active,
-                            synced_at = NOW()
-                    """, (
-                        membership['user_id'],
-                        membership['membership_type'],
-                        membership['purchased_at'],
-                        membership['expires_at'],
-                        membership['amount_paid'],
-                        is_active_bool
-                    ))
-                    synced_count += 1
-                except Exception as e:
-                    logger.error(f"Error syncing membership for user {membership['user_id']}: {str(e)}")
+            psycopg2.extras.execute_values(cursor, """
+                INSERT INTO user_memberships 
+                    (user_id, membership_type, purchased_at, expires_at, amount_paid, is_active, synced_at)
+                VALUES %s
+                ON CONFLICT (user_id) 
+                DO UPDATE SET
+                    membership_type = EXCLUDED.membership_type,
+                    purchased_at = EXCLUDED.purchased_at,
+                    expires_at = EXCLUDED.expires_at,
+                    amount_paid = EXCLUDED.amount_paid,
+                    is_active = EXCLUDED.is_active,
+                    synced_at = NOW()
+            """, rows, template="(%s, %s, %s, %s, %s, %s, NOW())", page_size=max(len(rows), 1))
             
             conn.commit()
             cursor.close()
             conn.close()
             
-            logger.info(f"Successfully synced {synced_count} memberships to PostgreSQL")
-            return synced_count
+            logger.info(f"Successfully synced {len(rows)} memberships to PostgreSQL")
+            return len(rows)
             
         except Exception as e:
             logger.error(f"Error syncing to PostgreSQL: {str(e)}")
-            return 0
+            if conn:
+                conn.close()
+            # Schema may have been dropped or the statement failed half-way; re-check next time
+            self._schema_ready = False
+            return -1
     
     def cleanup_expired_memberships(self) -> int:
         """
-        Remove expired memberships from PostgreSQL
+        Mark expired memberships inactive in PostgreSQL
+        
+        Expiry normally arrives as a delta (check_and_expire_memberships stamps
+        updated_at); this catch-all only runs with a full sync.
         
         Returns:
             Number of records cleaned up
         """
         try:
-            conn = psycopg2.connect(**self.postgres_config)
+            conn = get_pg_connection(self.postgres_config)
             cursor = conn.cursor()
             
             current_time = int(time.time())
@@ -179,33 +221,46 @@ class MembershipSyncService:
             logger.error(f"Error cleaning up expired memberships: {str(e)}")
             return 0
     
-    def run_sync(self) -> Dict[str, int]:
+    def sync_users(self, user_ids: Iterable[str]) -> int:
+        """Push the current rows of specific users right away (write-triggered sync)"""
+        memberships = self.get_memberships_for_users(user_ids)
+        with self._lock:
+            return self.sync_to_postgres(memberships)
+    
+    def run_sync(self, full: bool = False) -> Dict[str, int]:
         """
-        Run a full sync cycle
+        Run a sync cycle: push rows changed since the last cycle
+        
+        Args:
+            full: Push every row regardless of the watermark
         
         Returns:
             Dictionary with sync statistics
         """
-        logger.info("Starting membership sync cycle...")
-        
-        # Get active memberships from SQLite
-        memberships = self.get_active_memberships()
-        
-        # Sync to PostgreSQL
-        synced_count = self.sync_to_postgres(memberships)
-        
-        # Cleanup expired memberships
-        expired_count = self.cleanup_expired_memberships()
-        
-        self.last_sync_time = time.time()
+        with self._lock:
+            since = None if full else self.watermark
+            read_started = int(time.time())
+            
+            memberships = self.get_changed_memberships(since)
+            synced_count = self.sync_to_postgres(memberships)
+            
+            expired_count = 0
+            if since is None:
+                expired_count = self.cleanup_expired_memberships()
+            
+            # Only move the watermark once the rows made it to PostgreSQL
+            if synced_count >= 0:
+                self.watermark = read_started
+            self.last_sync_time = time.time()
         
         stats = {
-            'synced': synced_count,
+            'synced': max(synced_count, 0),
             'expired': expired_count,
-            'total_active': len(memberships)
+            'full': since is None,
         }
         
-        logger.info(f"Sync cycle completed: {stats}")
+        if synced_count or expired_count:
+            logger.info(f"Sync cycle completed: {stats}")
         return stats
     
     def start_periodic_sync(self, interval_seconds: int = 60):
@@ -215,8 +270,6 @@ class MembershipSyncService:
         Args:
             interval_seconds: Sync interval in seconds (default: 60)
         """
-        import threading
-        
         def sync_loop():
             while True:
                 try:
@@ -257,6 +310,43 @@ def setup_membership_sync() -> MembershipSyncService:
     return sync_service
 
 
+_sync_service: Optional[MembershipSyncService] = None
+_sync_service_lock = threading.Lock()
+_pending_user_ids = set()
+_pending_lock = threading.Lock()
+
+
+def get_membership_sync_service() -> MembershipSyncService:
+    """Process-wide MembershipSyncService instance"""
+    global _sync_service
+    with _sync_service_lock:
+        if _sync_service is None:
+            _sync_service = setup_membership_sync()
+        return _sync_service
+
+
+def notify_membership_changed(user_ids: Iterable[str]):
+    """
+    Queue a push of these users' rows to PostgreSQL (called after a membership write)
+    
+    Pushes are debounced by MEMBERSHIP_SYNC_DEBOUNCE seconds and batched; the
+    periodic delta sync still picks up anything lost if this process dies first.
+    """
+    from services.delayed_jobs import delayed_jobs
+    
+    with _pending_lock:
+        _pending_user_ids.update(user_ids)
+    delayed_jobs.schedule(MEMBERSHIP_SYNC_DEBOUNCE, _flush_pending_users, key='membership_sync_push')
+
+
+def _flush_pending_users():
+    with _pending_lock:
+        user_ids = list(_pending_user_ids)
+        _pending_user_ids.clear()
+    if user_ids:
+        get_membership_sync_service().sync_users(user_ids)
+
+
 if __name__ == "__main__":
     # Setup logging
     logging.basicConfig(
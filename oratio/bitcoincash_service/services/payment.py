@@ -9,12 +9,40 @@ from config import (
 )
 import models
 from services.electron_cash import electron_cash
+from services.delayed_jobs import delayed_jobs
 from zero_conf_validator import get_validator
 
-def process_payment(invoice_id):
-    """결제 상태 확인 및 처리 - ElectronCash 트랜잭션 정보 우선 활용"""
+def process_payments(invoice_ids):
+    """여러 인보이스를 한 번에 처리 - 대기 중 주소의 내역/잔액을 배치 RPC 1회로 미리 조회"""
+    invoices = [models.get_invoice(invoice_id) for invoice_id in invoice_ids]
+    pending_addresses = [inv["payment_address"] for inv in invoices if inv and inv["status"] == "pending"]
+    
+    address_states = {}
+    if pending_addresses:
+        try:
+            address_states = electron_cash.get_address_states(pending_addresses)
+        except Exception as e:
+            logger.error(f"주소 상태 배치 조회 오류: {str(e)}")
+    
+    results = []
+    for invoice_id, invoice in zip(invoice_ids, invoices):
+        address_state = None
+        if invoice:
+            address_state = address_states.get(invoice["payment_address"].replace('bitcoincash:', ''))
+        results.append(process_payment(invoice_id, address_state=address_state, invoice=invoice))
+    return results
+
+def process_payment(invoice_id, address_state=None, invoice=None):
+    """결제 상태 확인 및 처리 - ElectronCash 트랜잭션 정보 우선 활용
+    
+    Args:
+        invoice_id: 인보이스 ID
+        address_state: get_address_states()로 미리 조회한 {"history", "balance"} (없으면 직접 조회)
+        invoice: 이미 조회한 인보이스 정보 (없으면 DB에서 조회)
+    """
     # 인보이스 정보 조회
-    invoice = models.get_invoice(invoice_id)
+    if invoice is None:
+        invoice = models.get_invoice(invoice_id)
     if not invoice:
         logger.error(f"인보이스 {invoice_id}를 찾을 수 없습니다.")
         return None
@@ -71,8 +99,12 @@ def process_payment(invoice_id):
     # ElectronCash를 통한 확인 먼저 시도
     try:
         # ElectronCash를 통한 주소 내역 조회
-        logger.info(f"ElectronCash를 통해 주소 {payment_address}의 트랜잭션 내역 조회 중...")
-        tx_history = electron_cash.call_method("getaddresshistory", [payment_address.replace('bitcoincash:', '')])
+        # 내역과 잔액을 배치 요청 1회로 조회 (미리 조회된 상태가 있으면 재사용)
+        clean_address = payment_address.replace('bitcoincash:', '')
+        if address_state is None:
+            logger.info(f"ElectronCash를 통해 주소 {payment_address}의 트랜잭션 내역 조회 중...")
+            address_state = electron_cash.get_address_states([clean_address])[clean_address]
+        tx_history = address_state["history"]
         
         if tx_history and isinstance(tx_history, list) and len(tx_history) > 0:
             # 트랜잭션이 발견됨
@@ -93,31 +125,43 @@ def process_payment(invoice_id):
                 if ZERO_CONF_ENABLED and confirmations < MIN_CONFIRMATIONS:
                     logger.info(f"🔍 Zero-Conf 검증 시작 (딜레이: {ZERO_CONF_DELAY_SECONDS}초)")
                     
-                    # 선택적 딜레이 (이중지불 초기 체크)
+                    # 선택적 딜레이 (이중지불 초기 체크) - 스레드를 재우지 않는 상태 머신
+                    # first_seen → recheck_at 경과 후 재확인 → validated
+                    zero_conf_check = None
                     if ZERO_CONF_DELAY_SECONDS > 0:
-                        logger.info(f"이중지불 초기 체크를 위해 {ZERO_CONF_DELAY_SECONDS}초 대기 중...")
-                        time.sleep(ZERO_CONF_DELAY_SECONDS)
+                        zero_conf_check, created = models.get_or_create_zero_conf_check(
+                            invoice_id, tx_hash, ZERO_CONF_DELAY_SECONDS
+                        )
+                        remaining = zero_conf_check["recheck_at"] - time.time()
+                        if zero_conf_check["state"] != "validated" and remaining > 0:
+                            if created:
+                                logger.info(f"이중지불 초기 체크: {ZERO_CONF_DELAY_SECONDS}초 후 재확인 예약 ({tx_hash})")
+                            # 딜레이 후 재확인 예약 (작업이 유실되어도 다음 폴링이 recheck_at 이후 이어서 처리)
+                            delayed_jobs.schedule(remaining, process_payment, invoice_id, key=f"zero-conf:{invoice_id}")
+                            return {**invoice, "status": "validating"}
                         
-                        # 딜레이 후 다시 확인 (이중지불 시도가 있었는지)
-                        tx_history_recheck = electron_cash.call_method("getaddresshistory", [payment_address.replace('bitcoincash:', '')])
-                        if not tx_history_recheck or len(tx_history_recheck) == 0:
-                            logger.error(f"딜레이 후 트랜잭션을 찾을 수 없음: {tx_hash}")
-                            return invoice
-                        # 트랜잭션이 여전히 존재하는지 확인
-                        found = any(tx.get('tx_hash') == tx_hash for tx in tx_history_recheck)
-                        if not found:
-                            logger.error(f"딜레이 후 트랜잭션이 사라짐 (이중지불 가능성): {tx_hash}")
-                            return invoice
+                        # 딜레이 후 다시 확인 (처음 본 트랜잭션이 여전히 존재하는지 - 이중지불 시도 여부)
+                        tx_hash = zero_conf_check["tx_hash"]
+                        if zero_conf_check["state"] != "validated":
+                            found = any(tx.get('tx_hash') == tx_hash for tx in tx_history)
+                            if not found:
+                                logger.error(f"딜레이 후 트랜잭션이 사라짐 (이중지불 가능성): {tx_hash}")
+                                models.delete_zero_conf_check(invoice_id)
+                                return invoice
                     
                     # Zero-Conf Validator로 검증 (단순화된 버전 - ElectronCash 한계로 인해)
                     # ElectronCash가 getrawtransaction을 지원하지 않으므로 기본 체크만 수행
                     try:
-                        # 주소 잔액 확인으로 대체
-                        balance = electron_cash.check_address_balance(payment_address)
+                        # 주소 잔액 확인으로 대체 (배치로 받은 잔액이 부족/누락이면 기존 경로로 재확인)
+                        balance = address_state["balance"]
+                        if balance is None or balance < invoice['amount'] * 0.99999:
+                            balance = electron_cash.check_address_balance(payment_address)
                         logger.info(f"주소 잔액 확인: {balance} BCH (예상: {invoice['amount']} BCH)")
                         
                         if balance >= invoice['amount'] * 0.99999:  # 0.001% 오차 허용
                             logger.info(f"✅ Zero-Conf 기본 검증 성공: 충분한 잔액")
+                            if zero_conf_check and zero_conf_check["state"] != "validated":
+                                models.set_zero_conf_check_state(invoice_id, "validated")
                         else:
                             logger.error(f"❌ Zero-Conf 검증 실패: 잔액 부족 ({balance} < {invoice['amount']})")
                             return invoice
@@ -0,0 +1,199 @@
+"""
+Payment Address Watcher
+=======================
+Event-driven payment detection for pending invoices.
+
+Each invoice address is registered once with ElectronCash's `notify` command.
+When the address status changes (tx seen in mempool or confirmed),
+ElectronCash POSTs {"address": ..., "status": ...} to our callback route and the
+matching invoices are processed right away on a small worker pool.
+
+A fallback poll still runs (PAYMENT_FALLBACK_POLL_INTERVAL) in case a
+notification is lost. When the ElectronCash circuit breaker recovers (EC was
+down, likely restarted and lost its in-memory watch list) every pending
+address is registered again.
+
+If ElectronCash rejects `notify`, registration is suspended for
+PAYMENT_NOTIFY_RETRY_INTERVAL (doubling per consecutive rejection, up to an
+hour) and every pending invoice is polled on each tick as before. One address
+is tried again after each wait; a success resumes registration.
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    logger, FLASK_SECRET_KEY, MOCK_MODE, DIRECT_MODE,
+    PAYMENT_NOTIFY_ENABLED, PAYMENT_NOTIFY_CALLBACK_URL, PAYMENT_FALLBACK_POLL_INTERVAL,
+    PAYMENT_NOTIFY_RETRY_INTERVAL
+)
+import models
+from services.electron_cash import electron_cash
+from services.payment import process_payment, process_payments
+
+# ElectronCash can't send custom headers, so the callback URL carries a token
+NOTIFY_TOKEN = hmac.new(FLASK_SECRET_KEY.encode(), b'address-notify', hashlib.sha256).hexdigest()[:32]
+NOTIFY_MAX_RETRY_INTERVAL = 3600
+
+
+class PaymentWatcher:
+    """Registers invoice addresses with ElectronCash and reacts to status pushes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watched = set()  # addresses registered in this process
+        self._in_flight = set()  # invoice ids currently being processed
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="payment-watch")
+        self.notify_available = PAYMENT_NOTIFY_ENABLED and not MOCK_MODE and not DIRECT_MODE
+        self._last_fallback_poll = 0
+        self._notify_suspended_until = 0  # notify 거부 후 재시도 전까지 등록 중단
+        self._notify_retry_interval = PAYMENT_NOTIFY_RETRY_INTERVAL
+        self._ec_recoveries = electron_cash.breaker.recoveries
+        self.stats = {'notifications': 0, 'subscribed': 0, 'subscribe_errors': 0,
+                      'fallback_polls': 0, 'processed': 0}
+
+    def _callback_url(self):
+        separator = '&' if '?' in PAYMENT_NOTIFY_CALLBACK_URL else '?'
+        return f"{PAYMENT_NOTIFY_CALLBACK_URL}{separator}token={NOTIFY_TOKEN}"
+
+    def watch(self, address) -> bool:
+        """Register an address with ElectronCash (no-op if already registered here)"""
+        if not self.notify_available:
+            return False
+        clean_address = address.replace('bitcoincash:', '')
+        with self._lock:
+            if clean_address in self._watched:
+                return True
+            if time.time() < self._notify_suspended_until:
+                return False
+
+        result = electron_cash.call_method("notify", [clean_address, self._callback_url()])
+        if result is None:
+            with self._lock:
+                retry_in = self._notify_retry_interval
+                self._notify_suspended_until = time.time() + retry_in
+                self._notify_retry_interval = min(retry_in * 2, NOTIFY_MAX_RETRY_INTERVAL)
+            self.stats['subscribe_errors'] += 1
+            logger.warning(f"⚠️ 주소 알림 등록 실패: {clean_address} ({retry_in}초 동안 폴링으로 대체)")
+            return False
+
+        with self._lock:
+            self._watched.add(clean_address)
+            self._notify_retry_interval = PAYMENT_NOTIFY_RETRY_INTERVAL
+        self.stats['subscribed'] += 1
+        logger.info(f"👀 결제 주소 알림 등록: {clean_address}")
+        return True
+
+    def forget(self, address):
+        """Stop tracking an address locally (paid or expired invoice)"""
+        with self._lock:
+            self._watched.discard(address.replace('bitcoincash:', ''))
+
+    def reset(self):
+        """Forget all registrations so the next sync re-registers every pending address.
+
+        Called from sync_pending() when the ElectronCash circuit breaker has
+        recovered, since EC's watch list lives in memory.
+        """
+        with self._lock:
+            self._watched.clear()
+            self._notify_suspended_until = 0
+            self._notify_retry_interval = PAYMENT_NOTIFY_RETRY_INTERVAL
+
+    def _process(self, invoice_id):
+        try:
+            invoice = process_payment(invoice_id)
+            self.stats['processed'] += 1
+            if invoice and invoice.get('status') not in ('pending', 'validating'):
+                self.forget(invoice['payment_address'])
+        except Exception as e:
+            logger.error(f"결제 처리 오류 (인보이스 {invoice_id}): {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(invoice_id)
+
+    def _process_batch(self, invoice_ids):
+        try:
+            for invoice in process_payments(invoice_ids):
+                self.stats['processed'] += 1
+                if invoice and invoice.get('status') not in ('pending', 'validating'):
+                    self.forget(invoice['payment_address'])
+        except Exception as e:
+            logger.error(f"결제 배치 처리 오류 ({len(invoice_ids)}개): {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(invoice_ids)
+
+    def submit_batch(self, invoice_ids):
+        """Queue several invoices as one job so their address lookups share one batch RPC"""
+        with self._lock:
+            invoice_ids = [i for i in invoice_ids if i not in self._in_flight]
+            self._in_flight.update(invoice_ids)
+        if invoice_ids:
+            self._executor.submit(self._process_batch, invoice_ids)
+
+    def submit(self, invoice_id):
+        """Queue an invoice for processing unless it is already being processed"""
+        with self._lock:
+            if invoice_id in self._in_flight:
+                return
+            self._in_flight.add(invoice_id)
+        self._executor.submit(self._process, invoice_id)
+
+    def on_address_notification(self, address, status=None):
+        """Handle an ElectronCash status push for an address"""
+        self.stats['notifications'] += 1
+        invoice_ids = models.get_pending_invoice_ids_by_address(address)
+        logger.info(f"🔔 주소 상태 변경 알림: {address} (status={status}, 대기 인보이스 {len(invoice_ids)}개)")
+        for invoice_id in invoice_ids:
+            self.submit(invoice_id)
+        return len(invoice_ids)
+
+    def sync_pending(self):
+        """Scheduler tick: register new pending addresses, poll what can't be watched.
+
+        With notifications working, each pending invoice is only polled every
+        PAYMENT_FALLBACK_POLL_INTERVAL seconds as a safety net.
+        """
+        recoveries = electron_cash.breaker.recoveries
+        if recoveries != self._ec_recoveries:
+            self._ec_recoveries = recoveries
+            if self.notify_available:
+                logger.info("🔄 ElectronCash 복구 감지 - 대기 중인 주소 알림 재등록")
+                self.reset()
+
+        pending = models.get_pending_invoice_addresses()
+        now = time.time()
+        fallback_due = now - self._last_fallback_poll >= PAYMENT_FALLBACK_POLL_INTERVAL
+        if fallback_due:
+            self._last_fallback_poll = now
+            self.stats['fallback_polls'] += 1
+
+        pending_addresses = set()
+        to_poll = []
+        for invoice_id, address in pending:
+            pending_addresses.add(address.replace('bitcoincash:', ''))
+            watched = self.watch(address)
+            if not watched or fallback_due:
+                to_poll.append(invoice_id)
+        self.submit_batch(to_poll)
+
+        # Drop addresses whose invoices are no longer pending
+        with self._lock:
+            self._watched &= pending_addresses
+        return len(pending)
+
+    def status(self):
+        with self._lock:
+            watched = len(self._watched)
+            in_flight = len(self._in_flight)
+        return {'notify_available': self.notify_available, 'watched': watched,
+                'in_flight': in_flight,
+                'notify_suspended_seconds': max(0, round(self._notify_suspended_until - time.time())),
+                **self.stats}
+
+
+payment_watcher = PaymentWatcher()
@@ -13,6 +13,8 @@ import uuid
 from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
+from db_pool import get_sqlite_connection
+
 logger = logging.getLogger(__name__)
 
 class UploadQuotaService:
@@ -35,11 +37,8 @@ class UploadQuotaService:
         self._init_database()
     
     def _get_conn(self):
-        """Get a SQLite connection with WAL mode and busy timeout"""
-        conn = sqlite3.connect(self.db_path, timeout=30)
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA busy_timeout=30000")
-        return conn
+        """Get a pooled SQLite connection (WAL mode and busy timeout set by the pool)"""
+        return get_sqlite_connection(self.db_path)
     
     def _init_database(self):
         """Initialize database tables if they don't exist"""
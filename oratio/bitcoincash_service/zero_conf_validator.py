@@ -25,9 +25,11 @@ BCH는 RBF(Replace-By-Fee)가 없으므로 zero-confirmation이 비교적 안전
 """
 
 import logging
+import os
+import threading
 import time
 import traceback
-from typing import Dict, Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Set
 from datetime import datetime
 
 logger = logging.getLogger('zero_conf_validator')
@@ -37,6 +39,249 @@ SATOSHIS_PER_BCH = 100000000
 TYPICAL_TX_SIZE_BYTES = 250  # 평균 트랜잭션 크기
 MIN_RELAY_FEE_RATE = 1.0  # satoshi per byte (BCH 기본 최소 릴레이 수수료)
 
+# Mempool 색인 설정
+MEMPOOL_INDEX_REFRESH_SECONDS = float(os.environ.get('MEMPOOL_INDEX_REFRESH_SECONDS', 10))
+MEMPOOL_INDEX_MAX_FETCH = int(os.environ.get('MEMPOOL_INDEX_MAX_FETCH', 500))
+# 조회 실패한 txid는 이 시간(초) 동안 다시 조회하지 않음
+MEMPOOL_INDEX_FAILED_TTL_SECONDS = float(os.environ.get('MEMPOOL_INDEX_FAILED_TTL_SECONDS', 300))
+# ElectronCash가 필요한 메서드를 지원하지 않으면 색인 비활성화 (재시도마다 2배, 최대 MAX까지)
+MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_SECONDS = float(os.environ.get('MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_SECONDS', 600))
+MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_MAX = float(os.environ.get('MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_MAX', 21600))
+
+MEMPOOL_LIST_METHOD = "getmempooltransactions"
+RAW_TX_METHOD = "getrawtransaction"
+
+class MempoolSpendIndex:
+    """
+    Mempool input 색인 (outpoint "txid:vout" → 해당 outpoint를 사용하는 txid)
+    
+    매 검증마다 mempool 전체를 다시 조회하지 않고, 주기적인 delta poll로
+    새로 들어온 트랜잭션만 조회해 색인에 추가하고 빠진 트랜잭션은 제거합니다.
+    이중지불 체크는 검증 대상 트랜잭션의 input마다 dict 조회 한 번으로 끝납니다.
+    
+    조회에 실패한 txid는 MEMPOOL_INDEX_FAILED_TTL_SECONDS 동안 다시 조회하지 않고,
+    ElectronCash가 메서드를 지원하지 않으면(method-not-found) 지수 백오프로 색인을 비활성화합니다.
+    """
+    
+    def __init__(self, electron_cash, refresh_interval: float = MEMPOOL_INDEX_REFRESH_SECONDS,
+                 max_fetch_per_refresh: int = MEMPOOL_INDEX_MAX_FETCH):
+        """
+        Args:
+            electron_cash: ElectronCash 인스턴스
+            refresh_interval: 색인이 이 시간(초)보다 오래되면 조회 시 delta poll 실행
+            max_fetch_per_refresh: delta poll 한 번에 조회할 신규 트랜잭션 최대 수
+                                   (mempool이 클 때 초기 색인을 여러 번에 나눠 구축)
+        """
+        self.electron_cash = electron_cash
+        self.refresh_interval = refresh_interval
+        self.max_fetch_per_refresh = max_fetch_per_refresh
+        self._lock = threading.RLock()
+        self._spends: Dict[str, str] = {}  # outpoint → txid
+        self._tx_inputs: Dict[str, Tuple[str, ...]] = {}  # txid → outpoints
+        self._conflicts: Dict[str, Set[str]] = {}  # outpoint → 같은 outpoint를 쓰는 다른 txid들
+        self._failed: Dict[str, float] = {}  # txid → 재조회 가능 시각 (monotonic)
+        self._last_refresh = 0.0
+        self._disabled_until = 0.0
+        self._disable_backoff = MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_SECONDS
+        self.ready = False  # mempool 목록을 한 번이라도 성공적으로 반영했는지
+        self.stats = {'refreshes': 0, 'fetched': 0, 'failed': 0, 'evicted': 0, 'conflicts': 0, 'disabled': 0}
+    
+    @staticmethod
+    def _inputs_from_raw(raw_tx: Dict) -> Tuple[str, ...]:
+        return tuple(
+            f"{vin['txid']}:{vin['vout']}"
+            for vin in (raw_tx or {}).get('vin', [])
+            if 'txid' in vin and 'vout' in vin
+        )
+    
+    @staticmethod
+    def _mempool_txids(mempool) -> Set[str]:
+        if isinstance(mempool, dict):
+            return set(mempool.keys())
+        txids = set()
+        for item in mempool:
+            if isinstance(item, str):
+                txids.add(item)
+            elif isinstance(item, dict):
+                txid = item.get('tx_hash') or item.get('txid')
+                if txid:
+                    txids.add(txid)
+        return txids
+    
+    def add_transaction(self, txid: str, inputs) -> List[str]:
+        """
+        트랜잭션의 input을 색인에 추가 (새 트랜잭션 알림/검증 시 이미 받은 정보 재사용)
+        
+        Returns:
+            같은 outpoint를 이미 사용 중인 다른 txid 목록
+        """
+        inputs = tuple(inputs)
+        conflicting = []
+        with self._lock:
+            if txid in self._tx_inputs:
+                return self._conflicting_txids(txid, inputs)
+            self._tx_inputs[txid] = inputs
+            for outpoint in inputs:
+                existing = self._spends.get(outpoint)
+                if existing is None:
+                    self._spends[outpoint] = txid
+                elif existing != txid:
+                    self._conflicts.setdefault(outpoint, {existing}).add(txid)
+                    self.stats['conflicts'] += 1
+                    conflicting.append(existing)
+        return conflicting
+    
+    def remove_transaction(self, txid: str):
+        """색인에서 트랜잭션 제거 (mempool에서 빠짐 - 채굴 또는 폐기)"""
+        with self._lock:
+            for outpoint in self._tx_inputs.pop(txid, ()):
+                others = self._conflicts.get(outpoint)
+                if others is not None:
+                    others.discard(txid)
+                    if self._spends.get(outpoint) == txid:
+                        replacement = next(iter(others), None)
+                        if replacement is not None:
+                            self._spends[outpoint] = replacement
+                    if len(others) <= 1:
+                        del self._conflicts[outpoint]
+                if self._spends.get(outpoint) == txid:
+                    del self._spends[outpoint]
+    
+    @property
+    def disabled(self) -> bool:
+        return time.monotonic() < self._disabled_until
+    
+    def _unsupported(self, method: str) -> bool:
+        return method in getattr(self.electron_cash, 'unsupported_methods', ())
+    
+    def _disable(self, method: str):
+        """필요한 메서드를 지원하지 않음 - 백오프 동안 색인 비활성화 (이중지불 체크는 건너뜀)"""
+        with self._lock:
+            self._disabled_until = time.monotonic() + self._disable_backoff
+            self.ready = False
+            logger.warning(f"ElectronCash가 {method}를 지원하지 않아 mempool 색인을 "
+                           f"{self._disable_backoff:.0f}초 동안 비활성화합니다")
+            self._disable_backoff = min(self._disable_backoff * 2, MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_MAX)
+        self.stats['disabled'] += 1
+    
+    def refresh(self) -> bool:
+        """
+        Delta poll: mempool txid 목록과 색인을 비교해 신규만 조회하고 빠진 항목은 제거
+        
+        Returns:
+            mempool 목록 조회 성공 여부 (색인이 비활성화된 동안에는 False)
+        """
+        if self.disabled:
+            return False
+        
+        mempool = self.electron_cash.call_method(MEMPOOL_LIST_METHOD, [])
+        if mempool is None or not isinstance(mempool, (list, dict)):
+            if self._unsupported(MEMPOOL_LIST_METHOD):
+                self._disable(MEMPOOL_LIST_METHOD)
+            else:
+                logger.warning("Mempool 조회 실패, 색인 갱신 건너뜀")
+            return False
+        
+        current = self._mempool_txids(mempool)
+        now = time.monotonic()
+        with self._lock:
+            removed = [txid for txid in self._tx_inputs if txid not in current]
+            # mempool에서 빠졌거나 TTL이 지난 실패 기록 정리
+            self._failed = {txid: retry_at for txid, retry_at in self._failed.items()
+                            if txid in current and retry_at > now}
+            new_txids = [txid for txid in current
+                         if txid not in self._tx_inputs and txid not in self._failed]
+        
+        for txid in removed:
+            self.remove_transaction(txid)
+        self.stats['evicted'] += len(removed)
+        
+        # 신규 트랜잭션만 조회 (남은 항목은 다음 갱신 때 이어서 조회)
+        to_fetch = new_txids[:self.max_fetch_per_refresh]
+        if to_fetch:
+            calls = [(RAW_TX_METHOD, [txid, True]) for txid in to_fetch]
+            if hasattr(self.electron_cash, 'call_batch'):
+                raw_txs = self.electron_cash.call_batch(calls)
+            else:
+                raw_txs = [self.electron_cash.call_method(method, params) for method, params in calls]
+            if not any(raw_txs) and self._unsupported(RAW_TX_METHOD):
+                self._disable(RAW_TX_METHOD)
+                return False
+            if any(raw_txs):
+                with self._lock:
+                    self._disable_backoff = MEMPOOL_INDEX_UNSUPPORTED_BACKOFF_SECONDS
+            
+            retry_at = time.monotonic() + MEMPOOL_INDEX_FAILED_TTL_SECONDS
+            failed = 0
+            for txid, raw_tx in zip(to_fetch, raw_txs):
+                if raw_tx:
+                    self.add_transaction(txid, self._inputs_from_raw(raw_tx))
+                    self.stats['fetched'] += 1
+                else:
+                    failed += 1
+                    with self._lock:
+                        self._failed[txid] = retry_at
+            self.stats['failed'] += failed
+            if failed:
+                logger.info(f"Mempool 색인: {failed}개 트랜잭션 조회 실패, "
+                            f"{MEMPOOL_INDEX_FAILED_TTL_SECONDS:.0f}초 후 재조회")
+        
+        if len(new_txids) > len(to_fetch):
+            logger.info(f"Mempool 색인 구축 중: {len(new_txids) - len(to_fetch)}개 트랜잭션은 다음 갱신 때 조회")
+        
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            self.ready = True
+        self.stats['refreshes'] += 1
+        return True
+    
+    def ensure_fresh(self) -> bool:
+        """색인이 refresh_interval보다 오래되었으면 갱신. 사용 가능한 색인이 있으면 True"""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+        return self.ready
+    
+    def _conflicting_txids(self, txid: str, inputs) -> List[str]:
+        conflicting = set()
+        with self._lock:
+            for outpoint in inputs:
+                spender = self._spends.get(outpoint)
+                if spender is not None and spender != txid:
+                    conflicting.add(spender)
+                for other in self._conflicts.get(outpoint, ()):
+                    if other != txid:
+                        conflicting.add(other)
+        return sorted(conflicting)
+    
+    def find_conflicts(self, txid: str, inputs) -> List[str]:
+        """
+        주어진 트랜잭션과 같은 outpoint를 사용하는 mempool 트랜잭션 조회 (input당 O(1))
+        
+        Args:
+            txid: 검사할 트랜잭션 해시
+            inputs: 검사할 트랜잭션의 input 리스트 (txid:vout 형식)
+            
+        Returns:
+            충돌하는 txid 목록 (없으면 빈 리스트)
+        """
+        conflicting = set(self._conflicting_txids(txid, inputs))
+        # 검사한 트랜잭션도 색인에 추가 (이후 들어오는 충돌 트랜잭션 감지용)
+        conflicting.update(self.add_transaction(txid, inputs))
+        return sorted(conflicting)
+    
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'transactions': len(self._tx_inputs),
+                'outpoints': len(self._spends),
+                'conflicted_outpoints': len(self._conflicts),
+                'failed_txids': len(self._failed),
+                'disabled_for_seconds': round(max(0.0, self._disabled_until - time.monotonic()), 1) or None,
+                'age_seconds': round(time.monotonic() - self._last_refresh, 1) if self._last_refresh else None,
+                **self.stats,
+            }
+
 class ZeroConfValidator:
     """Zero-Confirmation 트랜잭션 검증기"""
     
@@ -51,6 +296,7 @@ class ZeroConfValidator:
         self.electron_cash = electron_cash
         self.min_fee_rate_percent = min_fee_rate_percent
         self.min_acceptable_fee_rate = MIN_RELAY_FEE_RATE * (min_fee_rate_percent / 100.0)
+        self.mempool_index = MempoolSpendIndex(electron_cash)
         
         logger.info(f"ZeroConfValidator 초기화: 최소 수수료율 {self.min_acceptable_fee_rate} sat/byte "
                    f"({min_fee_rate_percent}% of {MIN_RELAY_FEE_RATE} sat/byte)")
@@ -234,36 +480,23 @@ class ZeroConfValidator:
             Tuple[bool, str]: (성공여부, 메시지)
         """
         try:
-            # ElectronCash의 mempool 조회
-            mempool = self.electron_cash.call_method("getmempooltransactions", [])
-            
-            if not mempool or not isinstance(mempool, list):
-                # mempool 조회 실패 시 일단 통과
-                logger.warning("Mempool 조회 실패, 이중지불 체크 건너뜀")
-                return True, "이중지불 체크 건너뜀 (mempool 조회 실패)"
-            
             # 현재 트랜잭션의 input 추출
             current_inputs = self._extract_inputs(tx_info)
             if not current_inputs:
                 logger.warning("트랜잭션 input 정보를 추출할 수 없습니다")
                 return True, "이중지불 체크 건너뜀 (input 정보 없음)"
             
-            # mempool의 다른 트랜잭션과 비교
-            for mempool_tx_hash in mempool:
-                if mempool_tx_hash == tx_hash:
-                    continue  # 자기 자신은 건너뛰기
-                
-                # 다른 트랜잭션의 input 확인
-                other_tx_info = self._get_transaction_details(mempool_tx_hash)
-                if not other_tx_info:
-                    continue
-                
-                other_inputs = self._extract_inputs(other_tx_info)
-                
-                # input이 겹치는지 확인
-                if self._has_overlapping_inputs(current_inputs, other_inputs):
-                    logger.error(f"이중지불 감지! {tx_hash}와 {mempool_tx_hash}가 같은 input 사용")
-                    return False, f"이중지불 감지: {mempool_tx_hash}와 충돌"
+            # mempool 색인 갱신 (오래된 경우에만 delta poll)
+            if not self.mempool_index.ensure_fresh():
+                # mempool 조회 실패 시 일단 통과
+                logger.warning("Mempool 조회 실패, 이중지불 체크 건너뜀")
+                return True, "이중지불 체크 건너뜀 (mempool 조회 실패)"
+            
+            # 같은 input을 사용하는 다른 트랜잭션 조회 (input당 dict 조회 1회)
+            conflicts = self.mempool_index.find_conflicts(tx_hash, current_inputs)
+            if conflicts:
+                logger.error(f"이중지불 감지! {tx_hash}와 {conflicts[0]}가 같은 input 사용")
+                return False, f"이중지불 감지: {conflicts[0]}와 충돌"
             
             return True, "이중지불 없음"
             
@@ -1,15 +1,21 @@
 """
 AI-based post selector.
 
-v3 architecture — single AI call per cycle:
-  select_posts_batch() receives ALL posts from ALL sources in one call,
-  with per-source quotas. This cuts API calls from N to 1.
+v3 architecture — one batched selection per cycle:
+  select_posts_batch() receives ALL posts from ALL sources, with
+  per-source quotas. The model rates candidates; the top-rated posts per
+  source (up to its quota) are selected.
 
 Token optimisation:
   - Send title + score per post (no body — saves ~60% tokens)
   - Compact JSON format (short keys)
   - No "reason" field requested — saves output tokens
   - Gemini 2.5-flash with dynamic thinking (default)
+  - Each source pre-filtered to its top AI_MAX_CANDIDATES_PER_SOURCE by score
+  - Ratings cached per post fingerprint in SQLite — posts seen in an
+    earlier cycle are not re-sent
+  - Prompts capped at AI_PROMPT_TOKEN_BUDGET tokens (extra sources go into
+    further prompts, at most AI_MAX_CALLS_PER_CYCLE per cycle)
 
 When AI is disabled or fails, falls back to score-based ranking.
 """
@@ -18,22 +24,30 @@ from __future__ import annotations
 
 import json
 import logging
+import re
+import sqlite3
 from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from models import NormalizedPost
 
 import config
+import llm_client
 
 logger = logging.getLogger("content_importer.ai_selector")
 
+# Stay under SQLite's default host-parameter limit (999) per IN (...) query
+_LOOKUP_CHUNK = 500
+
 
 def select_posts_batch(
     tagged_posts: list[tuple[str, NormalizedPost]],
     quotas: dict[str, int],
 ) -> dict[str, list[NormalizedPost]]:
     """
-    Single-call batch selection across all sources (v3).
+    Batched selection across all sources (v3): cached ratings plus at most
+    ``AI_MAX_CALLS_PER_CYCLE`` token-budgeted prompts, see _ai_batch_select().
 
     Args:
         tagged_posts: list of (source_name, post) tuples
@@ -50,7 +64,7 @@ def select_posts_batch(
     for src_name, post in tagged_posts:
         by_source[src_name].append(post)
 
-    # If AI enabled, try single batch call
+    # If AI enabled, try batched selection (falls back to score on failure)
     if config.AI_ENABLED and (config.OPENAI_API_KEY or config.ANTHROPIC_API_KEY or config.GEMINI_API_KEY):
         try:
             return _ai_batch_select(tagged_posts, by_source, quotas)
@@ -106,41 +120,78 @@ def _score_select(posts: list[NormalizedPost], n: int) -> list[NormalizedPost]:
     return selected
 
 
-# ── AI batch selection (single call) ──────────────────────────────────
+# ── AI batch selection (token-budgeted, cached) ──────────────────────
 
-# Ultra-compact prompt to minimise tokens
-_BATCH_SYSTEM_PROMPT = """You are a content curator for a community forum. Pick the most interesting, \
-diverse, and discussion-worthy posts from each source according to quotas.
-Respond ONLY with JSON: {{"picks":[{{"i":0}},{{"i":5}},...]}}.
+# Ultra-compact prompt to minimise tokens.  The model rates every item rather
+# than picking per quota, so ratings from separate chunks (and cycles) are
+# comparable and can be merged / cached per post.
+_BATCH_SYSTEM_PROMPT = """You are a content curator for a community forum. Rate how interesting, \
+novel and discussion-worthy each post is, 0 (skip) to 9 (must post). Penalise clickbait.
+Respond ONLY with JSON: {"r":[[0,7],[1,3],...]} — one [i, rating] pair per input item.
 "i" = 0-based index from the input array. No extra fields needed."""
 
+# Bumped whenever the prompt / rating scale changes so cached ratings are not reused
+_PROMPT_VERSION = 2
 
-def _ai_batch_select(
-    tagged_posts: list[tuple[str, NormalizedPost]],
-    by_source: dict[str, list[NormalizedPost]],
-    quotas: dict[str, int],
-) -> dict[str, list[NormalizedPost]]:
-    """Single AI call selecting from all sources at once."""
 
-    # Build payload — title + score only (no body, saves tokens)
-    items = []
-    post_index: list[tuple[str, NormalizedPost]] = []  # parallel index
-    for src_name, post in tagged_posts:
-        item = {
-            "i": len(items),
-            "s": src_name,
-            "t": post.title[:120],
-        }
-        if post.score:
-            item["sc"] = post.score
-        items.append(item)
-        post_index.append((src_name, post))
-
-    quota_str = ", ".join(f"{s}={n}" for s, n in quotas.items())
-    user_msg = f"Quotas: {quota_str}\n\n{json.dumps(items, ensure_ascii=False)}"
+def _estimate_tokens(text: str) -> int:
+    """Cheap upper-ish estimate (~3 chars/token; titles are mixed English/Korean)."""
+    return len(text) // 3 + 1
+
+
+def _prompt_item(src_name: str, post: NormalizedPost) -> dict:
+    # Title + score only (no body, saves tokens)
+    item = {"s": src_name, "t": post.title[:120]}
+    if post.score:
+        item["sc"] = post.score
+    return item
+
+
+def _chunk_candidates(
+    by_source: dict[str, list[NormalizedPost]],
+) -> list[list[tuple[str, NormalizedPost]]]:
+    """
+    Pack candidates into prompts of at most ``AI_PROMPT_TOKEN_BUDGET`` tokens,
+    keeping each source's posts together where they fit (a source larger than
+    one prompt spills into the next).  At most ``AI_MAX_CALLS_PER_CYCLE``
+    chunks are returned; whatever doesn't fit is left to score ranking.
+    """
+    budget = config.AI_PROMPT_TOKEN_BUDGET - _estimate_tokens(_BATCH_SYSTEM_PROMPT)
+    chunks: list[list[tuple[str, NormalizedPost]]] = []
+    current: list[tuple[str, NormalizedPost]] = []
+    used = 0
+    for src_name, posts in by_source.items():
+        cost = [_estimate_tokens(json.dumps(_prompt_item(src_name, p), ensure_ascii=False)) + 4
+                for p in posts]
+        # Start a fresh chunk rather than split a source that would fit in one
+        if current and used + sum(cost) > budget and sum(cost) <= budget:
+            chunks.append(current)
+            current, used = [], 0
+        for post, c in zip(posts, cost):
+            if current and used + c > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append((src_name, post))
+            used += c
+    if current:
+        chunks.append(current)
+
+    if len(chunks) > config.AI_MAX_CALLS_PER_CYCLE:
+        dropped = sum(len(c) for c in chunks[config.AI_MAX_CALLS_PER_CYCLE:])
+        logger.warning(
+            "AI selection: %d prompts needed, capped at %d (%d posts ranked by score only)",
+            len(chunks), config.AI_MAX_CALLS_PER_CYCLE, dropped,
+        )
+        chunks = chunks[:config.AI_MAX_CALLS_PER_CYCLE]
+    return chunks
+
+
+def _rate_chunk(chunk: list[tuple[str, NormalizedPost]]) -> dict[str, int]:
+    """One API call; returns ``{fingerprint: rating}`` for the posts it rated."""
+    items = [{"i": i, **_prompt_item(src_name, post)} for i, (src_name, post) in enumerate(chunk)]
+    user_msg = json.dumps(items, ensure_ascii=False)
     system_msg = _BATCH_SYSTEM_PROMPT
 
-    # Single API call
     if config.AI_PROVIDER == "openai":
         result = _call_openai(system_msg, user_msg)
     elif config.AI_PROVIDER == "anthropic":
@@ -150,51 +201,187 @@ def _ai_batch_select(
     else:
         raise ValueError(f"Unknown AI provider: {config.AI_PROVIDER}")
 
-    # Parse picks
-    picks = result.get("picks", [])
-    result_map: dict[str, list[NormalizedPost]] = defaultdict(list)
-    source_counts: dict[str, int] = defaultdict(int)
-
-    for pick in picks:
-        idx = pick.get("i", -1)
-        if not (0 <= idx < len(post_index)):
+    ratings: dict[str, int] = {}
+    for pair in result.get("r", []):
+        try:
+            idx, rating = int(pair[0]), int(pair[1])
+        except (TypeError, ValueError, IndexError):
             continue
-        src_name, post = post_index[idx]
-        quota = quotas.get(src_name, config.AI_PICKS_PER_SOURCE)
-        if source_counts[src_name] >= quota:
-            continue  # already hit quota for this source
-        post.ai_rank = source_counts[src_name] + 1
-        post.ai_reason = "ai-selected"
-        result_map[src_name].append(post)
-        source_counts[src_name] += 1
-
-    # Fill any sources that AI missed with score fallback
+        if 0 <= idx < len(chunk):
+            ratings[chunk[idx][1].fingerprint] = max(0, min(9, rating))
+    return ratings
+
+
+def _ai_batch_select(
+    tagged_posts: list[tuple[str, NormalizedPost]],
+    by_source: dict[str, list[NormalizedPost]],
+    quotas: dict[str, int],
+) -> dict[str, list[NormalizedPost]]:
+    """
+    Token-budgeted AI selection across all sources.
+
+      1. Pre-filter each source to its top ``AI_MAX_CANDIDATES_PER_SOURCE``
+         posts by score (never fewer than its quota).
+      2. Reuse cached ratings for posts rated in earlier cycles.
+      3. Rate the rest in prompts bounded by ``AI_PROMPT_TOKEN_BUDGET``.
+      4. Per source, take the top ``quota`` by (rating, score); posts without
+         a rating (failed / capped chunk) rank after rated ones, by score.
+    """
+    candidates: dict[str, list[NormalizedPost]] = {}
     for src_name, posts in by_source.items():
         quota = quotas.get(src_name, config.AI_PICKS_PER_SOURCE)
-        current = len(result_map.get(src_name, []))
-        if current < quota:
-            already = {id(p) for p in result_map.get(src_name, [])}
-            remaining = [p for p in posts if id(p) not in already]
-            fill = _score_select(remaining, quota - current)
-            result_map[src_name].extend(fill)
+        cap = max(quota, config.AI_MAX_CANDIDATES_PER_SOURCE)
+        candidates[src_name] = sorted(posts, key=lambda p: p.score, reverse=True)[:cap]
+
+    ratings = _cached_ratings([p.fingerprint for posts in candidates.values() for p in posts])
+    cached = set(ratings)
+    to_rate = {
+        src_name: [p for p in posts if p.fingerprint not in cached]
+        for src_name, posts in candidates.items()
+    }
+    to_rate = {k: v for k, v in to_rate.items() if v}
+
+    calls = 0
+    for chunk in _chunk_candidates(to_rate) if to_rate else []:
+        calls += 1
+        try:
+            fresh = _rate_chunk(chunk)
+        except Exception as e:
+            logger.warning("AI rating chunk %d failed (%d posts ranked by score): %s", calls, len(chunk), e)
+            continue
+        ratings.update(fresh)
+        _store_ratings(fresh)
+
+    result_map: dict[str, list[NormalizedPost]] = {}
+    for src_name, posts in candidates.items():
+        quota = quotas.get(src_name, config.AI_PICKS_PER_SOURCE)
+        ranked = sorted(
+            posts,
+            key=lambda p: (p.fingerprint in ratings, ratings.get(p.fingerprint, 0), p.score),
+            reverse=True,
+        )[:quota]
+        for i, p in enumerate(ranked):
+            p.ai_rank = i + 1
+            if p.fingerprint in ratings:
+                p.ai_reason = f"ai-rating={ratings[p.fingerprint]}" + (
+                    " (cached)" if p.fingerprint in cached else ""
+                )
+            else:
+                p.ai_reason = f"score={p.score}"
+        result_map[src_name] = ranked
 
     total = sum(len(v) for v in result_map.values())
-    logger.info("AI batch selection: picked %d posts (1 API call, %d sources)", total, len(by_source))
-    return dict(result_map)
+    sent = sum(len(v) for v in to_rate.values())
+    logger.info(
+        "AI batch selection: picked %d posts from %d candidates (%d cached, %d sent, %d API calls, %d sources)",
+        total, len(tagged_posts), len(cached), sent, calls, len(by_source),
+    )
+    return result_map
+
+
+# ── Rating cache (SQLite) ─────────────────────────────────────────────
+
+_schema_ready = False
+
+
+def _cache_model() -> str:
+    model = {
+        "openai": config.OPENAI_MODEL,
+        "anthropic": config.ANTHROPIC_MODEL,
+        "gemini": config.GEMINI_MODEL,
+    }.get(config.AI_PROVIDER, "")
+    return f"{config.AI_PROVIDER}:{model}:v{_PROMPT_VERSION}"
+
+
+def _conn() -> sqlite3.Connection:
+    global _schema_ready
+    conn = sqlite3.connect(config.DB_PATH, timeout=30)
+    if not _schema_ready:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_ratings (
+                fingerprint TEXT NOT NULL,
+                model       TEXT NOT NULL,
+                rating      INTEGER NOT NULL,
+                rated_at    TEXT NOT NULL,
+                PRIMARY KEY (fingerprint, model)
+            )
+        """)
+        conn.commit()
+        _schema_ready = True
+    return conn
+
+
+def _cached_ratings(fingerprints: list[str]) -> dict[str, int]:
+    """Ratings from the current model younger than ``AI_RATING_CACHE_HOURS``."""
+    if not fingerprints or config.AI_RATING_CACHE_HOURS <= 0:
+        return {}
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=config.AI_RATING_CACHE_HOURS)).isoformat()
+    unique = list(dict.fromkeys(fingerprints))
+    found: dict[str, int] = {}
+    try:
+        with _conn() as conn:
+            for i in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[i:i + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    "SELECT fingerprint, rating FROM ai_ratings"
+                    " WHERE model = ? AND rated_at >= ? AND fingerprint IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    [_cache_model(), cutoff, *chunk],
+                ).fetchall()
+                found.update(rows)
+    except sqlite3.Error as e:
+        logger.warning("AI rating cache lookup failed: %s", e)
+    return found
+
+
+def _store_ratings(ratings: dict[str, int]) -> None:
+    if not ratings or config.AI_RATING_CACHE_HOURS <= 0:
+        return
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(hours=config.AI_RATING_CACHE_HOURS)).isoformat()
+    try:
+        with _conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ai_ratings (fingerprint, model, rating, rated_at) VALUES (?, ?, ?, ?)",
+                [(fp, _cache_model(), rating, now.isoformat()) for fp, rating in ratings.items()],
+            )
+            conn.execute("DELETE FROM ai_ratings WHERE rated_at < ?", (cutoff,))
+    except sqlite3.Error as e:
+        logger.warning("AI rating cache save failed: %s", e)
 
 
 # ── LLM API callers ──────────────────────────────────────────────────
+# Requests go through llm_client (pooled connection, retries, streaming,
+# metrics); these only build provider payloads and decode stream events.
+
+
+def _extract_json(content: str) -> dict:
+    if "```" in content:
+        match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
+        if match:
+            content = match.group(1)
+    return json.loads(content)
+
+
+def _openai_event(event: dict) -> tuple[str, dict]:
+    choices = event.get("choices") or []
+    delta = choices[0].get("delta", {}).get("content") if choices else None
+    usage = event.get("usage") or {}  # final chunk (stream_options.include_usage)
+    return delta or "", {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }
 
 
 def _call_openai(system_msg: str, user_msg: str) -> dict:
-    import httpx
-    resp = httpx.post(
-        "https://api.openai.com/v1/chat/completions",
+    content = llm_client.stream_text(
+        "openai",
+        f"{config.OPENAI_BASE_URL}/chat/completions",
         headers={
             "Authorization": f"Bearer {config.OPENAI_API_KEY}",
             "Content-Type": "application/json",
         },
-        json={
+        payload={
             "model": config.OPENAI_MODEL,
             "messages": [
                 {"role": "system", "content": system_msg},
@@ -202,70 +389,79 @@ def _call_openai(system_msg: str, user_msg: str) -> dict:
             ],
             "temperature": 0.3,
             "response_format": {"type": "json_object"},
+            "stream": True,
+            "stream_options": {"include_usage": True},
         },
-        timeout=60,
+        parse_event=_openai_event,
     )
-    resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
     return json.loads(content)
 
 
+def _anthropic_event(event: dict) -> tuple[str, dict]:
+    kind = event.get("type")
+    if kind == "content_block_delta":
+        return event.get("delta", {}).get("text", ""), {}
+    if kind == "message_start":
+        usage = event.get("message", {}).get("usage", {})
+        return "", {"prompt_tokens": usage.get("input_tokens")}
+    if kind == "message_delta":
+        return "", {"completion_tokens": event.get("usage", {}).get("output_tokens")}
+    if kind == "error":
+        raise RuntimeError(f"Anthropic stream error: {event.get('error')}")
+    return "", {}
+
+
 def _call_anthropic(system_msg: str, user_msg: str) -> dict:
-    import httpx
-    resp = httpx.post(
-        "https://api.anthropic.com/v1/messages",
+    content = llm_client.stream_text(
+        "anthropic",
+        f"{config.ANTHROPIC_BASE_URL}/v1/messages",
         headers={
             "x-api-key": config.ANTHROPIC_API_KEY,
             "anthropic-version": "2023-06-01",
             "Content-Type": "application/json",
         },
-        json={
+        payload={
             "model": config.ANTHROPIC_MODEL,
             "max_tokens": 1024,
             "system": system_msg,
             "messages": [{"role": "user", "content": user_msg}],
+            "stream": True,
         },
-        timeout=60,
+        parse_event=_anthropic_event,
     )
-    resp.raise_for_status()
-    content = resp.json()["content"][0]["text"]
-    if "```" in content:
-        import re
-        match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
-        if match:
-            content = match.group(1)
-    return json.loads(content)
+    return _extract_json(content)
 
 
-def _call_gemini(system_msg: str, user_msg: str) -> dict:
-    """Call Gemini — NO retry on 429, fail fast."""
-    import httpx
-
-    url = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/"
-        f"{config.GEMINI_MODEL}:generateContent?key={config.GEMINI_API_KEY}"
-    )
-    payload = {
-        "system_instruction": {"parts": [{"text": system_msg}]},
-        "contents": [{"parts": [{"text": user_msg}]}],
-        "generationConfig": {
-            "temperature": 0.3,
-            "responseMimeType": "application/json",
-        },
+def _gemini_event(event: dict) -> tuple[str, dict]:
+    candidates = event.get("candidates") or []
+    parts = candidates[0].get("content", {}).get("parts", []) if candidates else []
+    usage = event.get("usageMetadata") or {}
+    return "".join(p.get("text", "") for p in parts if not p.get("thought")), {
+        "prompt_tokens": usage.get("promptTokenCount"),
+        "completion_tokens": usage.get("candidatesTokenCount"),
     }
 
-    resp = httpx.post(
-        url,
-        headers={"Content-Type": "application/json"},
-        json=payload,
-        timeout=60,
-    )
-    resp.raise_for_status()
 
-    content = resp.json()["candidates"][0]["content"]["parts"][0]["text"]
-    if "```" in content:
-        import re
-        match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
-        if match:
-            content = match.group(1)
-    return json.loads(content)
+def _call_gemini(system_msg: str, user_msg: str) -> dict:
+    """Call Gemini — 429 is only retried when the server sends Retry-After
+    (free-tier quota exhaustion otherwise; fail fast to score fallback)."""
+    content = llm_client.stream_text(
+        "gemini",
+        f"{config.GEMINI_BASE_URL}/models/{config.GEMINI_MODEL}:streamGenerateContent?alt=sse",
+        headers={
+            # Header rather than ?key= so the key never shows up in error messages
+            "x-goog-api-key": config.GEMINI_API_KEY,
+            "Content-Type": "application/json",
+        },
+        payload={
+            "system_instruction": {"parts": [{"text": system_msg}]},
+            "contents": [{"parts": [{"text": user_msg}]}],
+            "generationConfig": {
+                "temperature": 0.3,
+                "responseMimeType": "application/json",
+            },
+        },
+        parse_event=_gemini_event,
+        retry_429_without_hint=False,
+    )
+    return _extract_json(content)
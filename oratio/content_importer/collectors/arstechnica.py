@@ -17,9 +17,8 @@ import logging
 import re
 from typing import Optional
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .rss_news import RSSCollector
 
 logger = logging.getLogger("content_importer.arstechnica")
@@ -61,7 +60,7 @@ class ArsTechnicaCollector(RSSCollector):
 
         # Step 2: Scrape the Civis thread
         try:
-            resp = requests.get(civis_url, headers=headers, timeout=20)
+            resp = http_client.get(civis_url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -149,7 +148,7 @@ class ArsTechnicaCollector(RSSCollector):
     def _find_civis_url(article_url: str, headers: dict) -> Optional[str]:
         """Extract the Civis forum thread URL from an ArsTechnica article page."""
         try:
-            resp = requests.get(article_url, headers=headers, timeout=15)
+            resp = http_client.get(article_url, headers=headers, timeout=15)
             resp.raise_for_status()
         except Exception:
             return None
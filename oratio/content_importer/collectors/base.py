@@ -5,6 +5,12 @@ To add a new source site, subclass BaseCollector and implement `fetch()`.
 The rest of the pipeline (AI selection, dedup, posting) is automatic.
 
 Optionally implement `fetch_comments()` to import top comments alongside posts.
+
+Collectors over chronological feeds can also keep a per-source high-water
+mark: the scheduler loads the stored value into ``self.cursor`` before
+``fetch()``; the collector skips entries at or below it before building
+posts and sets ``self.next_cursor``, which is persisted once the cycle
+finishes.
 """
 
 from __future__ import annotations
@@ -25,9 +31,22 @@ class BaseCollector(ABC):
     Optionally implement ``fetch_comments()`` to support comment importing.
     """
 
+    #: Default for the per-source ``"incremental"`` flag.  Only chronological
+    #: feeds should enable it — ranked feeds resurface older items.
+    incremental_default = False
+
     def __init__(self, source_config: dict):
         self.config = source_config
         self.name: str = source_config.get("name", self.__class__.__name__)
+        # High-water mark from the previous cycle (None = first run / full fetch)
+        self.cursor: str | None = None
+        # New high-water mark, set by fetch() when incremental
+        self.next_cursor: str | None = None
+
+    @property
+    def incremental(self) -> bool:
+        """Whether this source skips entries at or below its stored cursor."""
+        return bool(self.config.get("incremental", self.incremental_default))
 
     @abstractmethod
     def fetch(self) -> list[NormalizedPost]:
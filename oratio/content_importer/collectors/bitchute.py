@@ -18,9 +18,8 @@ import re
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -80,7 +79,7 @@ class BitchuteCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(
+            resp = http_client.get(
                 f"{OLD_BITCHUTE_BASE}/", headers=headers, timeout=20
             )
             resp.raise_for_status()
@@ -281,7 +280,7 @@ class BitchuteCollector(BaseCollector):
 
         # Step 1 — load the video page to extract the cf_auth token
         try:
-            page_resp = requests.get(old_url, headers=headers, timeout=20)
+            page_resp = http_client.get(old_url, headers=headers, timeout=20)
             page_resp.raise_for_status()
         except Exception as e:
             logger.warning("Bitchute comment page fetch failed for %s: %s", old_url, e)
@@ -300,7 +299,7 @@ class BitchuteCollector(BaseCollector):
 
         # Step 2 — call the CommentFreely JSON API
         try:
-            api_resp = requests.post(
+            api_resp = http_client.post(
                 f"{cf_base_url}/api/get_comments/",
                 data={
                     "cf_auth": cf_auth,
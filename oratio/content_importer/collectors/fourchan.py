@@ -22,6 +22,7 @@ Supports pre-post liveness verification (404 check).
 
 from __future__ import annotations
 
+import json
 import logging
 import math
 import re
@@ -29,9 +30,8 @@ import time
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -87,7 +87,12 @@ POPULAR_BOARDS = [
 
 
 class FourChanCollector(BaseCollector):
-    """Collect top threads from 4chan board(s) via the JSON API."""
+    """Collect top threads from 4chan board(s) via the JSON API.
+
+    Set ``"incremental": True`` to only consider threads newer than the
+    last seen thread number per board.  Off by default: threads are ranked
+    by activity, so a thread seen last cycle can still climb into the picks.
+    """
 
     def fetch(self) -> list[NormalizedPost]:
         board = self.config.get("board", "pol")
@@ -230,7 +235,10 @@ class FourChanCollector(BaseCollector):
         headers = {"User-Agent": USER_AGENT}
 
         try:
-            resp = requests.get(catalog_url, headers=headers, timeout=15)
+            resp = http_client.get(catalog_url, headers=headers, timeout=15, conditional=True)
+            if resp is None:
+                logger.debug("4chan /%s/: catalog unchanged since last fetch", board)
+                return []
             resp.raise_for_status()
             pages = resp.json()
         except Exception as e:
@@ -241,7 +249,25 @@ class FourChanCollector(BaseCollector):
         for page in pages:
             for thread in page.get("threads", []):
                 threads.append(thread)
-        return threads
+        return self._skip_seen_threads(board, threads)
+
+    def _skip_seen_threads(self, board: str, threads: list[dict]) -> list[dict]:
+        """Drop threads at/below the board's stored high-water mark (incremental only)."""
+        if not self.incremental:
+            return threads
+        try:
+            cursors = {k: int(v) for k, v in json.loads(self.cursor or "{}").items()}
+        except (ValueError, TypeError, AttributeError):
+            cursors = {}
+        pending = json.loads(self.next_cursor) if self.next_cursor else dict(cursors)
+        newest = max((t.get("no", 0) for t in threads), default=0)
+        pending[board] = max(newest, pending.get(board, 0))
+        self.next_cursor = json.dumps(pending, sort_keys=True)
+
+        hwm = cursors.get(board)
+        if hwm is None:
+            return threads
+        return [t for t in threads if t.get("no", 0) > hwm]
 
     def _thread_to_post(self, thread: dict, board: str) -> NormalizedPost | None:
         """Convert a single 4chan thread dict to NormalizedPost."""
@@ -329,7 +355,7 @@ class FourChanCollector(BaseCollector):
         headers = {"User-Agent": USER_AGENT}
 
         try:
-            resp = requests.get(thread_url, headers=headers, timeout=15)
+            resp = http_client.get(thread_url, headers=headers, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
@@ -440,7 +466,7 @@ class FourChanCollector(BaseCollector):
         check_url = f"{FOURCHAN_CDN}/{board}/thread/{thread_no}.json"
 
         try:
-            resp = requests.head(
+            resp = http_client.head(
                 check_url,
                 headers={"User-Agent": USER_AGENT},
                 timeout=10,
@@ -0,0 +1,182 @@
+"""
+Shared HTTP layer for collectors.
+
+  - One pooled ``requests.Session`` per host, reused across requests and
+    import cycles (keep-alive instead of a new TCP/TLS handshake per call).
+  - Conditional GET for feeds/catalogs: ETag, Last-Modified and a body
+    hash are kept in the importer SQLite DB (``http_validators``).
+    ``get(url, conditional=True)`` returns ``None`` when the resource is
+    unchanged — either a 304 or a 200 with an identical body — so the
+    caller can skip parsing entirely.
+  - Inside ``defer_validators()`` new validators are collected instead of
+    saved; the scheduler commits them (``save_validators``) only once the
+    source's posts have been processed, so a failed/discarded fetch or a
+    crashed cycle doesn't mark the feed as seen.
+
+Usage in a collector::
+
+    from . import http_client
+
+    resp = http_client.get(url, headers=headers, timeout=15, conditional=True)
+    if resp is None:
+        return []            # unchanged since last cycle
+    resp.raise_for_status()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+logger = logging.getLogger("content_importer.http")
+
+_sessions: dict[str, requests.Session] = {}
+_lock = threading.Lock()
+_schema_ready = False
+_deferred = threading.local()  # .pending: validators held back on this thread
+
+stats = {"requests": 0, "not_modified": 0, "unchanged_body": 0, "bytes": 0}
+
+
+def session_for(url: str) -> requests.Session:
+    host = urlsplit(url).netloc.lower()
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+# ── Validator store ───────────────────────────────────────────────────
+
+def _conn() -> sqlite3.Connection:
+    global _schema_ready
+    conn = sqlite3.connect(config.DB_PATH, timeout=30)
+    if not _schema_ready:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_validators (
+                url           TEXT PRIMARY KEY,
+                etag          TEXT,
+                last_modified TEXT,
+                body_hash     TEXT,
+                updated_at    TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+        _schema_ready = True
+    return conn
+
+
+def _load_validators(url: str) -> tuple[str | None, str | None, str | None]:
+    try:
+        with _conn() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, body_hash FROM http_validators WHERE url = ?",
+                (url,),
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("HTTP validator lookup failed for %s: %s", url, e)
+        return None, None, None
+    return row if row else (None, None, None)
+
+
+def save_validators(validators: list[tuple[str, str | None, str | None, str]]) -> None:
+    """Persist ``(url, etag, last_modified, body_hash)`` rows."""
+    if not validators:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        with _conn() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO http_validators
+                   (url, etag, last_modified, body_hash, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(*row, now) for row in validators],
+            )
+    except sqlite3.Error as e:
+        logger.warning("HTTP validator save failed for %d URLs: %s", len(validators), e)
+
+
+@contextmanager
+def defer_validators() -> Iterator[list]:
+    """Collect validators from conditional GETs on this thread instead of saving them."""
+    _deferred.pending = pending = []
+    try:
+        yield pending
+    finally:
+        _deferred.pending = None
+
+
+# ── Requests ──────────────────────────────────────────────────────────
+
+def get(url: str, *, conditional: bool = False, **kwargs) -> requests.Response | None:
+    """
+    GET through the host's pooled session.
+
+    With ``conditional=True`` the stored validators are sent and ``None``
+    is returned if the resource hasn't changed since the last successful
+    fetch.  Validators are only updated from 200 responses (held back
+    inside ``defer_validators()``).
+    """
+    if not conditional:
+        resp = session_for(url).get(url, **kwargs)
+        stats["requests"] += 1
+        stats["bytes"] += len(resp.content)
+        return resp
+
+    cache_key = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+    etag, last_modified, old_hash = _load_validators(cache_key)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    resp = session_for(url).get(url, headers=headers, **kwargs)
+    stats["requests"] += 1
+    if resp.status_code == 304:
+        stats["not_modified"] += 1
+        logger.debug("HTTP 304 Not Modified: %s", url)
+        return None
+
+    stats["bytes"] += len(resp.content)
+    if resp.status_code != 200:
+        return resp
+
+    body_hash = hashlib.sha256(resp.content).hexdigest()
+    row = (cache_key, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), body_hash)
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending.append(row)
+    else:
+        save_validators([row])
+    if body_hash == old_hash:
+        stats["unchanged_body"] += 1
+        logger.debug("HTTP body unchanged: %s", url)
+        return None
+    return resp
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    stats["requests"] += 1
+    return session_for(url).head(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    stats["requests"] += 1
+    return session_for(url).post(url, **kwargs)
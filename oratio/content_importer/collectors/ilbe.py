@@ -17,6 +17,7 @@ from typing import Optional
 import requests
 
 from models import NormalizedPost
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -110,7 +111,7 @@ class IlbeCollector(BaseCollector):
         last_exc: Exception | None = None
         for attempt in range(1, max_retries + 1):
             try:
-                resp = requests.get(
+                resp = http_client.get(
                     url, params=params, headers=headers, timeout=timeout
                 )
                 resp.raise_for_status()
@@ -188,7 +189,7 @@ class IlbeCollector(BaseCollector):
         filled = 0
         for post in posts:
             try:
-                resp = requests.get(
+                resp = http_client.get(
                     post.url, headers=headers, timeout=10, allow_redirects=True
                 )
                 if resp.status_code != 200:
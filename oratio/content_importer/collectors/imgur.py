@@ -22,9 +22,8 @@ import os
 import re
 from datetime import datetime, timezone
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -62,6 +61,8 @@ class ImgurCollector(BaseCollector):
         else:
             logger.info("Imgur: no IMGUR_CLIENT_ID set — trying RSS feed fallback")
             posts = self._fetch_rss(limit)
+            if posts is None:
+                return []  # feed unchanged since last fetch — nothing new to parse
 
         if not posts:
             logger.info("Imgur: primary method failed — trying HTML scrape fallback")
@@ -71,8 +72,11 @@ class ImgurCollector(BaseCollector):
 
     # ── RSS-based fetch (no API key needed) ──────────────────────
 
-    def _fetch_rss(self, limit: int) -> list[NormalizedPost]:
-        """Fetch from Imgur's public RSS feed (no auth required)."""
+    def _fetch_rss(self, limit: int) -> list[NormalizedPost] | None:
+        """Fetch from Imgur's public RSS feed (no auth required).
+
+        Returns None if the feed is unchanged since the last fetch.
+        """
         tag = self.config.get("tag", "")
         if tag:
             rss_url = f"{IMGUR_WEB_BASE}/t/{tag}.rss"
@@ -82,7 +86,10 @@ class ImgurCollector(BaseCollector):
         headers = {"User-Agent": USER_AGENT}
 
         try:
-            resp = requests.get(rss_url, headers=headers, timeout=30)
+            resp = http_client.get(rss_url, headers=headers, timeout=30, conditional=True)
+            if resp is None:
+                logger.info("Imgur RSS: unchanged since last fetch")
+                return None
             resp.raise_for_status()
         except Exception as e:
             logger.warning("Imgur RSS fetch failed: %s", e)
@@ -167,7 +174,7 @@ class ImgurCollector(BaseCollector):
             url = f"{IMGUR_API_BASE}/3/gallery/{section}/{sort}/{window}/0"
 
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp = http_client.get(url, headers=headers, timeout=20)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
@@ -264,7 +271,7 @@ class ImgurCollector(BaseCollector):
         headers = {"User-Agent": USER_AGENT, "Accept": "text/html"}
 
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp = http_client.get(url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -368,7 +375,7 @@ class ImgurCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=15)
+            resp = http_client.get(url, headers=headers, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
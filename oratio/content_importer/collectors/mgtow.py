@@ -17,9 +17,8 @@ import re
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 
 logger = logging.getLogger("content_importer.mgtow")
@@ -54,7 +53,7 @@ class MGTOWCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp = http_client.get(url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -199,7 +198,7 @@ class MGTOWCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(watch_url, headers=headers, timeout=20)
+            resp = http_client.get(watch_url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -17,9 +17,8 @@ import re
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 
 logger = logging.getLogger("content_importer.ninegag")
@@ -87,7 +86,7 @@ class NineGagCollector(BaseCollector):
                 params["after"] = cursor
 
             try:
-                resp = requests.get(url, headers=headers, params=params, timeout=20)
+                resp = http_client.get(url, headers=headers, params=params, timeout=20)
                 resp.raise_for_status()
                 data = resp.json()
             except Exception as e:
@@ -210,7 +209,7 @@ class NineGagCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp = http_client.get(url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -337,7 +336,7 @@ class NineGagCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(comment_api, headers=headers, params=params, timeout=15)
+            resp = http_client.get(comment_api, headers=headers, params=params, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
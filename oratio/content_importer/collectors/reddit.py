@@ -12,10 +12,10 @@ import re
 from datetime import datetime, timezone
 
 import feedparser
-import requests
 
 from models import NormalizedPost, NormalizedComment
 
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -29,6 +29,32 @@ REDDIT_USER_AGENT = (
 class RedditCollector(BaseCollector):
     """Collect top/hot posts from a subreddit via RSS feed."""
 
+    @property
+    def incremental(self) -> bool:
+        # Only the "new" listing is chronological — hot/top resurface older posts
+        return bool(self.config.get("incremental", self.config.get("sort", "hot") == "new"))
+
+    @staticmethod
+    def _fullname_key(fullname: str) -> int:
+        """t3_abc123 → base36 int (post ids are sequential); -1 if unparseable."""
+        try:
+            return int(fullname.rsplit("_", 1)[-1], 36)
+        except ValueError:
+            return -1
+
+    def _cursor_key(self) -> int | None:
+        if self.incremental and self.cursor:
+            return self._fullname_key(self.cursor)
+        return None
+
+    def _advance_cursor(self, fullnames: list[str]) -> None:
+        keyed = [(self._fullname_key(f), f) for f in fullnames if f]
+        keyed = [k for k in keyed if k[0] >= 0]
+        if self.incremental and keyed:
+            newest = max(keyed)
+            if self._cursor_key() is None or newest[0] > self._cursor_key():
+                self.next_cursor = newest[1]
+
     def fetch(self) -> list[NormalizedPost]:
         subreddit = self.config.get("subreddit", "all")
         sort = self.config.get("sort", "hot")
@@ -36,6 +62,8 @@ class RedditCollector(BaseCollector):
 
         # Primary: RSS feed from old.reddit.com (most reliable)
         posts = self._fetch_rss(subreddit, sort, limit)
+        if posts is None:
+            return []  # feed unchanged / nothing past the cursor — nothing new to parse
         if posts:
             return posts
 
@@ -44,22 +72,38 @@ class RedditCollector(BaseCollector):
 
     def _fetch_rss(
         self, subreddit: str, sort: str, limit: int
-    ) -> list[NormalizedPost]:
-        """Fetch via RSS — avoids Reddit API rate limits and blocks."""
+    ) -> list[NormalizedPost] | None:
+        """Fetch via RSS — avoids Reddit API rate limits and blocks.
+
+        Returns None if there is nothing new: the feed is unchanged since
+        the last fetch, or (incremental) every entry is at/below the cursor.
+        """
         # old.reddit.com RSS works from most IPs
         url = f"https://old.reddit.com/r/{subreddit}/{sort}/.rss"
         headers = {"User-Agent": REDDIT_USER_AGENT}
 
         try:
-            resp = requests.get(url, headers=headers, timeout=15)
+            resp = http_client.get(url, headers=headers, timeout=15, conditional=True)
+            if resp is None:
+                logger.info("Reddit r/%s (RSS): unchanged since last fetch", subreddit)
+                return None
             resp.raise_for_status()
             feed = feedparser.parse(resp.text)
         except Exception as e:
             logger.warning("Reddit RSS failed for r/%s: %s", subreddit, e)
             return []
 
+        cursor_key = self._cursor_key()
+        entries = feed.entries[:limit]
+        self._advance_cursor([entry.get("id", "") for entry in entries])
+        if cursor_key is not None:
+            entries = [e for e in entries if self._fullname_key(e.get("id", "")) > cursor_key]
+            if not entries and feed.entries:
+                logger.info("Reddit r/%s (RSS): nothing newer than %s", subreddit, self.cursor)
+                return None
+
         posts: list[NormalizedPost] = []
-        for entry in feed.entries[:limit]:
+        for entry in entries:
             title = entry.get("title", "").strip()
             reddit_link = entry.get("link", "").strip()
             if not title or not reddit_link:
@@ -171,7 +215,7 @@ class RedditCollector(BaseCollector):
         headers = {"User-Agent": REDDIT_USER_AGENT}
 
         try:
-            resp = requests.get(
+            resp = http_client.get(
                 json_url,
                 headers=headers,
                 params={"limit": 50, "sort": "top", "raw_json": 1},
@@ -246,7 +290,7 @@ class RedditCollector(BaseCollector):
         rss_url = rss_url.replace("old.reddit.com", "www.reddit.com")
 
         try:
-            resp = requests.get(
+            resp = http_client.get(
                 rss_url,
                 headers={"User-Agent": REDDIT_USER_AGENT},
                 timeout=15,
@@ -344,20 +388,28 @@ class RedditCollector(BaseCollector):
         url = f"https://www.reddit.com/r/{subreddit}/{sort}.json"
         params = {"limit": limit, "raw_json": 1}
         headers = {"User-Agent": REDDIT_USER_AGENT}
+        cursor_key = self._cursor_key()
+        if cursor_key is not None:
+            params["before"] = self.cursor  # only listing items newer than the cursor
 
         try:
-            resp = requests.get(url, params=params, headers=headers, timeout=15)
+            resp = http_client.get(url, params=params, headers=headers, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
             logger.error("Reddit fetch failed for r/%s: %s", subreddit, e)
             return []
 
+        children = data.get("data", {}).get("children", [])
+        self._advance_cursor([child.get("data", {}).get("name", "") for child in children])
+
         posts: list[NormalizedPost] = []
-        for child in data.get("data", {}).get("children", []):
+        for child in children:
             d = child.get("data", {})
             if d.get("stickied") or d.get("is_self") and not d.get("selftext"):
                 continue
+            if cursor_key is not None and self._fullname_key(d.get("name", "")) <= cursor_key:
+                continue
 
             # Build body: self-text or a short link-description
             body = d.get("selftext", "") or ""
@@ -11,10 +11,10 @@ import logging
 from datetime import datetime, timezone
 
 import feedparser
-import requests
 
 from models import NormalizedPost
 
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -22,7 +22,24 @@ logger = logging.getLogger("content_importer.rss")
 
 
 class RSSCollector(BaseCollector):
-    """Collect posts from any RSS / Atom feed URL."""
+    """Collect posts from any RSS / Atom feed URL.
+
+    Incremental by default: the cursor is the newest entry's published
+    time, and entries not newer than it are skipped before normalisation.
+    """
+
+    incremental_default = True
+
+    @staticmethod
+    def _entry_time(entry) -> datetime | None:
+        for key in ("published_parsed", "updated_parsed"):
+            parsed = entry.get(key)
+            if parsed:
+                try:
+                    return datetime(*parsed[:6], tzinfo=timezone.utc)
+                except Exception:
+                    pass
+        return None
 
     def fetch(self) -> list[NormalizedPost]:
         url = self.config.get("url", "")
@@ -36,15 +53,37 @@ class RSSCollector(BaseCollector):
 
         try:
             # feedparser can parse from URL directly, but we want timeout control
-            resp = requests.get(url, timeout=15, headers={"User-Agent": "OratioContentImporter/1.0"})
+            resp = http_client.get(
+                url, timeout=15, headers={"User-Agent": "OratioContentImporter/1.0"}, conditional=True
+            )
+            if resp is None:
+                logger.info("RSS %s: feed unchanged since last fetch", self.name)
+                return []
             resp.raise_for_status()
             feed = feedparser.parse(resp.text)
         except Exception as e:
             logger.error("RSS fetch failed for %s (%s): %s", self.name, url, e)
             return []
 
+        cursor = None
+        if self.incremental and self.cursor:
+            try:
+                cursor = datetime.fromisoformat(self.cursor)
+            except ValueError:
+                pass
+        newest = cursor
+        skipped = 0
+
         posts: list[NormalizedPost] = []
         for entry in feed.entries[:limit]:
+            entry_time = self._entry_time(entry)
+            if entry_time is not None:
+                if cursor is not None and entry_time <= cursor:
+                    skipped += 1
+                    continue
+                if newest is None or entry_time > newest:
+                    newest = entry_time
+
             title = entry.get("title", "").strip()
             link = entry.get("link", "").strip()
             if not title or not link:
@@ -62,17 +101,7 @@ class RSSCollector(BaseCollector):
                 body = body[:2000] + "…"
 
             # Published date
-            published = datetime.now(timezone.utc)
-            if hasattr(entry, "published_parsed") and entry.published_parsed:
-                try:
-                    published = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
-                except Exception:
-                    pass
-            elif hasattr(entry, "updated_parsed") and entry.updated_parsed:
-                try:
-                    published = datetime(*entry.updated_parsed[:6], tzinfo=timezone.utc)
-                except Exception:
-                    pass
+            published = entry_time or datetime.now(timezone.utc)
 
             # Thumbnail / media
             thumbnail = None
@@ -104,5 +133,10 @@ class RSSCollector(BaseCollector):
                 )
             )
 
-        logger.info("RSS %s: fetched %d posts", self.name, len(posts))
+        if self.incremental and newest is not None:
+            self.next_cursor = newest.isoformat()
+        logger.info(
+            "RSS %s: fetched %d posts%s", self.name, len(posts),
+            f" ({skipped} older than cursor skipped)" if skipped else "",
+        )
         return posts
@@ -16,9 +16,8 @@ import logging
 import re
 from datetime import datetime, timezone
 
-import requests
-
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -167,7 +166,7 @@ class UpgoatCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp = http_client.get(url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
@@ -398,7 +397,7 @@ class UpgoatCollector(BaseCollector):
         }
 
         try:
-            resp = requests.get(viewpost_url, headers=headers, timeout=20)
+            resp = http_client.get(viewpost_url, headers=headers, timeout=20)
             resp.raise_for_status()
             html = resp.text
         except Exception as e:
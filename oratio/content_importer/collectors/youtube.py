@@ -20,10 +20,9 @@ import re
 from datetime import datetime, timezone
 from typing import Optional
 
-import requests
-
 import config
 from models import NormalizedPost, NormalizedComment
+from . import http_client
 from .base import BaseCollector
 from .html_utils import clean_html_to_text
 
@@ -113,7 +112,7 @@ class YouTubeCollector(BaseCollector):
         url = f"{YOUTUBE_API_BASE}/videos"
 
         try:
-            resp = requests.get(url, params=params, timeout=15)
+            resp = http_client.get(url, params=params, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
@@ -291,7 +290,7 @@ class YouTubeCollector(BaseCollector):
         url = f"{YOUTUBE_API_BASE}/commentThreads"
 
         try:
-            resp = requests.get(url, params=params, timeout=15)
+            resp = http_client.get(url, params=params, timeout=15)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
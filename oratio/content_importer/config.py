@@ -26,10 +26,29 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Provider endpoints — override to point at a proxy or a local stand-in server
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
+GEMINI_BASE_URL = os.getenv(
+    "GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta"
+).rstrip("/")
+# LLM HTTP: read timeout is per streamed chunk, not the whole response.
+# 429/5xx are retried, honouring Retry-After up to LLM_RETRY_MAX_WAIT_SECONDS.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_WAIT_SECONDS = float(os.getenv("LLM_RETRY_MAX_WAIT_SECONDS", "30"))
 # Legacy global max — now each source has its own "ai_picks"
 AI_MAX_PICKS = int(os.getenv("AI_MAX_PICKS", "10"))
 # Default per-source picks (fallback if source doesn't specify ai_picks)
 AI_PICKS_PER_SOURCE = int(os.getenv("AI_PICKS_PER_SOURCE", "3"))
+# Bounded prompt size: each source's pool is pre-filtered by score, candidates
+# are packed into prompts of at most AI_PROMPT_TOKEN_BUDGET (estimated) tokens,
+# and ratings are cached per post so re-fetched posts aren't re-sent.
+AI_MAX_CANDIDATES_PER_SOURCE = int(os.getenv("AI_MAX_CANDIDATES_PER_SOURCE", "30"))
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "4000"))
+AI_MAX_CALLS_PER_CYCLE = int(os.getenv("AI_MAX_CALLS_PER_CYCLE", "4"))
+AI_RATING_CACHE_HOURS = int(os.getenv("AI_RATING_CACHE_HOURS", "72"))  # 0 = no cache
 
 # ─── Comments ──────────────────────────────────────────────────────────
 # How many top comments to import per post (score-based, no AI)
@@ -54,6 +73,35 @@ IMGUR_CLIENT_ID = os.getenv("IMGUR_CLIENT_ID", "")
 IMPORT_INTERVAL_MINUTES = int(os.getenv("IMPORT_INTERVAL_MINUTES", "360"))  # 6 hours
 IMPORT_ON_STARTUP = os.getenv("IMPORT_ON_STARTUP", "true").lower() == "true"
 
+# ─── Fetch stage ───────────────────────────────────────────────────────
+# Sources are fetched in parallel; cycle time ≈ slowest source, not the sum.
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+# Concurrent fetches against the same host (sources sharing a site, e.g. two subreddits)
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "1"))
+# Per-source time budget once its fetch starts — override per source with "fetch_timeout"
+FETCH_TIMEOUT_SECONDS = int(os.getenv("FETCH_TIMEOUT_SECONDS", "180"))
+# Hard cap for the whole fetch stage (includes time spent waiting for a host slot)
+FETCH_STAGE_TIMEOUT_SECONDS = int(os.getenv("FETCH_STAGE_TIMEOUT_SECONDS", "600"))
+
+# ─── Posting stage ─────────────────────────────────────────────────────
+# Lemmy writes (posts + comments) share one token bucket instead of fixed sleeps
+LEMMY_WRITES_PER_SECOND = float(os.getenv("LEMMY_WRITES_PER_SECOND", "2"))
+LEMMY_WRITE_BURST = int(os.getenv("LEMMY_WRITE_BURST", "4"))
+# Workers that fetch comments (+ 4chan liveness) for selected posts ahead of posting
+COMMENT_FETCH_WORKERS = int(os.getenv("COMMENT_FETCH_WORKERS", "8"))
+# Limit for requests to a source's host while posting — override per source
+# with "rate_limit": {"per_second": …, "burst": …, "concurrency": …}.
+# Sources on the same host share one limiter (first source's settings win).
+DEFAULT_HOST_RATE_LIMIT = {"per_second": 2.0, "burst": 2, "concurrency": 1}
+
+# ─── Near-duplicate detection ─────────────────────────────────────────
+# Same story from different sources (URL variants / reworded titles).
+# Titles whose SimHash differs by ≤ NEAR_DUP_MAX_DISTANCE bits (of 64) are duplicates.
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_MAX_DISTANCE = min(3, int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3")))  # ≤ bands-1 for exact LSH recall
+# Shorter titles ("lol", "Monday mood") are too generic to compare
+NEAR_DUP_MIN_TOKENS = int(os.getenv("NEAR_DUP_MIN_TOKENS", "5"))
+
 # ─── Database (SQLite for dedup state) ─────────────────────────────────
 DB_PATH = os.getenv("IMPORTER_DB_PATH", "/data/importer.db")
 
@@ -78,6 +126,7 @@ DEFAULT_SOURCES = [
         "limit": 25,
         "community": "reddit",
         "ai_picks": 5,
+        "rate_limit": {"per_second": 0.5, "burst": 2, "concurrency": 1},
         "fallback_thumbnail": "https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png",
         "enabled": True,
     },
@@ -89,6 +138,7 @@ DEFAULT_SOURCES = [
         "limit": 25,
         "community": "reddit",
         "ai_picks": 5,
+        "rate_limit": {"per_second": 0.5, "burst": 2, "concurrency": 1},
         "fallback_thumbnail": "https://www.redditstatic.com/desktop2x/img/favicon/android-icon-192x192.png",
         "enabled": True,
     },
@@ -144,6 +194,7 @@ DEFAULT_SOURCES = [
         "type": "fourchan",
         "board": "all",             # "all" = scan popular boards globally
         "per_board_fetch": 10,      # Top N threads per board before global sort
+        "rate_limit": {"per_second": 1.0, "burst": 1, "concurrency": 1},  # 4chan API: ≤1 req/s
         "community": "fourchan",
         "ai_picks": 10,
         "limit": 20,
@@ -263,12 +314,19 @@ DEFAULT_SOURCES = [
 ]
 
 
+def _with_defaults(source: dict) -> dict:
+    return {
+        **source,
+        "rate_limit": {**DEFAULT_HOST_RATE_LIMIT, **source.get("rate_limit", {})},
+    }
+
+
 def get_sources() -> list[dict]:
     """Return the active source configs, preferring env override."""
     if _SOURCES_JSON:
         try:
             sources = json.loads(_SOURCES_JSON)
-            return [s for s in sources if s.get("enabled", True)]
+            return [_with_defaults(s) for s in sources if s.get("enabled", True)]
         except json.JSONDecodeError:
             pass
-    return [s for s in DEFAULT_SOURCES if s.get("enabled", True)]
+    return [_with_defaults(s) for s in DEFAULT_SOURCES if s.get("enabled", True)]
@@ -1,8 +1,10 @@
 """
 Deduplication engine backed by SQLite.
 
-Stores fingerprints (URL hashes) of all previously imported posts
-so we never post the same content twice.
+Stores fingerprints (canonical URL hashes) of all previously imported
+posts so we never post the same content twice, plus a banded title SimHash
+index so the same story under a different URL / reworded title is caught
+as a near-duplicate (see near_dup.py).
 """
 
 from __future__ import annotations
@@ -13,9 +15,22 @@ from datetime import datetime, timezone
 
 import config
 from models import NormalizedPost
+from near_dup import (
+    SIMHASH_BANDS,
+    from_sqlite_int,
+    hamming,
+    simhash_bands,
+    title_simhash,
+    to_sqlite_int,
+    url_fingerprint,
+)
 
 logger = logging.getLogger("content_importer.dedup")
 
+# Stay under SQLite's default host-parameter limit (999) per IN (...) query
+_LOOKUP_CHUNK = 500
+_BAND_COLUMNS = [f"sh_b{i}" for i in range(SIMHASH_BANDS)]
+
 
 class DedupStore:
     """SQLite-backed dedup + import history store."""
@@ -26,6 +41,8 @@ class DedupStore:
 
     def _init_db(self) -> None:
         with self._conn() as conn:
+            # journal_mode is persistent in the DB file — set once, not per connection
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS imported_posts (
                     fingerprint TEXT PRIMARY KEY,
@@ -49,49 +66,231 @@ class DedupStore:
                     status      TEXT DEFAULT 'running'
                 )
             """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_cursors (
+                    source     TEXT PRIMARY KEY,
+                    cursor     TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_imported_source
                 ON imported_posts(source)
             """)
 
+            # Near-dup columns (added after the original schema)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(imported_posts)")}
+            for column in ["canonical_fp TEXT", "simhash INTEGER", *(f"{c} INTEGER" for c in _BAND_COLUMNS)]:
+                if column.split()[0] not in existing:
+                    conn.execute(f"ALTER TABLE imported_posts ADD COLUMN {column}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_imported_canonical ON imported_posts(canonical_fp)"
+            )
+            for c in _BAND_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_imported_{c} ON imported_posts({c})")
+            self._backfill_near_dup(conn)
+
+    def _backfill_near_dup(self, conn: sqlite3.Connection) -> None:
+        """Compute canonical_fp / simhash for rows imported before those columns existed."""
+        rows = conn.execute(
+            "SELECT fingerprint, url, title FROM imported_posts WHERE canonical_fp IS NULL"
+        ).fetchall()
+        if not rows:
+            return
+        conn.executemany(
+            f"""UPDATE imported_posts
+                SET canonical_fp=?, simhash=?, {", ".join(f"{c}=?" for c in _BAND_COLUMNS)}
+                WHERE fingerprint=?""",
+            [(url_fingerprint(url), *self._simhash_columns(title), fp) for fp, url, title in rows],
+        )
+        logger.info("Dedup: backfilled canonical URL / SimHash for %d rows", len(rows))
+
+    @staticmethod
+    def _simhash_columns(title: str | None) -> tuple:
+        value = title_simhash(title or "")
+        if value is None:
+            return (None,) * (1 + SIMHASH_BANDS)
+        return (to_sqlite_int(value), *simhash_bands(value))
+
     def _conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, timeout=30)
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA busy_timeout=30000")
-        return conn
+        # timeout=30 doubles as the busy timeout
+        return sqlite3.connect(self.db_path, timeout=30)
 
     def is_duplicate(self, post: NormalizedPost) -> bool:
         with self._conn() as conn:
             row = conn.execute(
-                "SELECT 1 FROM imported_posts WHERE fingerprint = ?",
+                "SELECT 1 FROM imported_posts WHERE canonical_fp = ?",
                 (post.fingerprint,),
             ).fetchone()
             return row is not None
 
+    def imported_fingerprints(self, fingerprints: list[str]) -> set[str]:
+        """Return the subset of ``fingerprints`` already imported (one query per 500)."""
+        unique = list(dict.fromkeys(fingerprints))
+        found: set[str] = set()
+        with self._conn() as conn:
+            for i in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[i:i + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    "SELECT canonical_fp FROM imported_posts WHERE canonical_fp IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    chunk,
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def near_duplicates(self, hashes: list[int]) -> dict[int, tuple[int, str]]:
+        """
+        For each SimHash, the closest imported title within
+        ``NEAR_DUP_MAX_DISTANCE`` bits: ``{simhash: (distance, title)}``.
+
+        Candidates come from the band indexes (any equal band), so only
+        rows sharing a 16-bit band are ever compared.
+        """
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
+        bands_per_column: list[set[int]] = [set() for _ in _BAND_COLUMNS]
+        for value in unique:
+            for i, band in enumerate(simhash_bands(value)):
+                bands_per_column[i].add(band)
+
+        candidates: dict[int, str] = {}
+        with self._conn() as conn:
+            for column, bands in zip(_BAND_COLUMNS, bands_per_column):
+                bands = list(bands)
+                for i in range(0, len(bands), _LOOKUP_CHUNK):
+                    chunk = bands[i:i + _LOOKUP_CHUNK]
+                    rows = conn.execute(
+                        f"SELECT simhash, title FROM imported_posts WHERE {column} IN (%s)"
+                        % ",".join("?" * len(chunk)),
+                        chunk,
+                    ).fetchall()
+                    for value, title in rows:
+                        candidates[from_sqlite_int(value)] = title
+
+        return self._closest(unique, candidates)
+
+    @staticmethod
+    def _closest(hashes: list[int], candidates: dict[int, str]) -> dict[int, tuple[int, str]]:
+        index: dict[tuple[int, int], list[int]] = {}
+        for value in candidates:
+            for i, band in enumerate(simhash_bands(value)):
+                index.setdefault((i, band), []).append(value)
+
+        matches: dict[int, tuple[int, str]] = {}
+        for value in hashes:
+            best: tuple[int, str] | None = None
+            for i, band in enumerate(simhash_bands(value)):
+                for other in index.get((i, band), ()):
+                    distance = hamming(value, other)
+                    if distance <= config.NEAR_DUP_MAX_DISTANCE and (best is None or distance < best[0]):
+                        best = (distance, candidates[other])
+            if best is not None:
+                matches[value] = best
+        return matches
+
     def filter_new(self, posts: list[NormalizedPost]) -> list[NormalizedPost]:
-        """Return only posts that haven't been imported before."""
-        new = [p for p in posts if not self.is_duplicate(p)]
-        logger.info("Dedup: %d / %d are new", len(new), len(posts))
+        """Return only posts that haven't been imported before.
+
+        A post is a duplicate if its canonical URL was imported, or (with
+        NEAR_DUP_ENABLED) its title SimHash is within NEAR_DUP_MAX_DISTANCE
+        bits of an imported title.  Repeats within ``posts`` itself are
+        dropped the same way (first occurrence wins), so pass every source's
+        posts in one call to catch the same story from two sources.
+        """
+        fingerprints = [p.fingerprint for p in posts]
+        seen = self.imported_fingerprints(fingerprints)
+        exact_new = []
+        for post, fp in zip(posts, fingerprints):
+            if fp not in seen:
+                seen.add(fp)
+                exact_new.append(post)
+
+        if not config.NEAR_DUP_ENABLED:
+            logger.info("Dedup: %d / %d are new", len(exact_new), len(posts))
+            return exact_new
+
+        hashes = [title_simhash(p.title) for p in exact_new]
+        history = self.near_duplicates([h for h in hashes if h is not None])
+
+        new = []
+        accepted: dict[int, str] = {}
+        for post, value in zip(exact_new, hashes):
+            if value is not None:
+                match = history.get(value) or self._closest([value], accepted).get(value)
+                if match:
+                    logger.info(
+                        "Dedup: near-duplicate (d=%d) '%s' ~ '%s'",
+                        match[0], post.title[:60], (match[1] or "")[:60],
+                    )
+                    continue
+                accepted[value] = post.title
+            new.append(post)
+
+        logger.info(
+            "Dedup: %d / %d are new (%d exact, %d near duplicates)",
+            len(new), len(posts), len(posts) - len(exact_new), len(exact_new) - len(new),
+        )
         return new
 
     def mark_imported(
         self, post: NormalizedPost, lemmy_post_id: int | None = None
     ) -> None:
+        self.mark_imported_many([(post, lemmy_post_id)])
+
+    def mark_imported_many(
+        self, items: list[tuple[NormalizedPost, int | None]]
+    ) -> None:
+        """Record several imports in a single transaction."""
+        if not items:
+            return
+        now = datetime.now(timezone.utc).isoformat()
         with self._conn() as conn:
-            conn.execute(
-                """INSERT OR IGNORE INTO imported_posts
-                   (fingerprint, url, title, source, lemmy_post_id, imported_at, ai_rank, ai_reason)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    post.fingerprint,
-                    post.url,
-                    post.title,
-                    post.source,
-                    lemmy_post_id,
-                    datetime.now(timezone.utc).isoformat(),
-                    post.ai_rank,
-                    post.ai_reason,
-                ),
+            conn.executemany(
+                f"""INSERT OR IGNORE INTO imported_posts
+                   (fingerprint, url, title, source, lemmy_post_id, imported_at, ai_rank, ai_reason,
+                    canonical_fp, simhash, {", ".join(_BAND_COLUMNS)})
+                   VALUES ({", ".join("?" * (10 + SIMHASH_BANDS))})""",
+                [
+                    (
+                        post.fingerprint,
+                        post.url,
+                        post.title,
+                        post.source,
+                        lemmy_post_id,
+                        now,
+                        post.ai_rank,
+                        post.ai_reason,
+                        post.fingerprint,
+                        *self._simhash_columns(post.title),
+                    )
+                    for post, lemmy_post_id in items
+                ],
+            )
+
+    # ── Incremental fetch cursors ─────────────────────────────────
+
+    def get_cursors(self, sources: list[str]) -> dict[str, str]:
+        """Stored high-water-mark cursor per source (sources without one are omitted)."""
+        if not sources:
+            return {}
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT source, cursor FROM source_cursors WHERE source IN (%s)"
+                % ",".join("?" * len(sources)),
+                sources,
+            ).fetchall()
+        return dict(rows)
+
+    def set_cursors(self, cursors: dict[str, str]) -> None:
+        if not cursors:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO source_cursors (source, cursor, updated_at) VALUES (?, ?, ?)",
+                [(source, cursor, now) for source, cursor in cursors.items()],
             )
 
     # ── Run tracking ──────────────────────────────────────────────
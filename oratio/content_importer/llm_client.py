@@ -0,0 +1,211 @@
+"""
+Shared HTTP client for the LLM providers used by ai_selector.
+
+  - One pooled ``httpx.Client`` for every provider call (keep-alive instead
+    of a new TCP/TLS handshake per request).
+  - Retries on 429 / 5xx / timeouts and network errors.  ``Retry-After`` is honoured
+    when present (capped by ``LLM_RETRY_MAX_WAIT_SECONDS``; a longer wait —
+    e.g. an exhausted daily quota — fails fast), otherwise exponential
+    backoff with jitter.
+  - Responses are streamed (SSE) and the text deltas assembled as they
+    arrive, so the read timeout applies between chunks rather than to the
+    whole generation.
+  - Per-provider latency / token / retry counters, see ``metrics()``.
+
+Base URLs come from config (``OPENAI_BASE_URL`` etc.), so the selector can
+be pointed at a local stand-in server.
+
+Usage::
+
+    text = llm_client.stream_text(
+        "openai", url, headers=headers, payload=payload, parse_event=_openai_event,
+    )
+
+``parse_event(event)`` receives each decoded SSE ``data:`` JSON object and
+returns ``(text_delta, usage)`` where ``usage`` may contain
+``prompt_tokens`` / ``completion_tokens``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+import httpx
+
+import config
+
+logger = logging.getLogger("content_importer.llm")
+
+# 529 = Anthropic "overloaded"
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504, 529})
+# Transient transport failures (not e.g. a malformed local request)
+RETRY_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+EventParser = Callable[[dict], tuple[str, dict]]
+
+_client: httpx.Client | None = None
+_lock = threading.Lock()
+_metrics: dict[str, dict] = defaultdict(lambda: {
+    "calls": 0, "errors": 0, "retries": 0,
+    "latency_seconds": 0.0, "last_latency_seconds": 0.0,
+    "prompt_tokens": 0, "completion_tokens": 0,
+})
+
+
+def client() -> httpx.Client:
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(
+                timeout=httpx.Timeout(config.LLM_TIMEOUT_SECONDS, connect=10.0),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+            )
+        return _client
+
+
+def metrics() -> dict[str, dict]:
+    """Cumulative per-provider counters since startup."""
+    with _lock:
+        out = {}
+        for provider, m in _metrics.items():
+            done = m["calls"] - m["errors"]
+            out[provider] = {
+                **m,
+                "latency_seconds": round(m["latency_seconds"], 2),
+                "last_latency_seconds": round(m["last_latency_seconds"], 2),
+                "avg_latency_seconds": round(m["latency_seconds"] / done, 2) if done else None,
+            }
+        return out
+
+
+# ── Retry policy ──────────────────────────────────────────────────────
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Retry-After as seconds — delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _backoff(attempt: int) -> float:
+    delay = min(config.LLM_RETRY_MAX_WAIT_SECONDS, config.LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+    return delay * (0.5 + random.random() / 2)
+
+
+def _retry_delay(resp: httpx.Response, attempt: int, retry_429_without_hint: bool) -> float | None:
+    """Seconds to wait before retrying ``resp``, or None to give up."""
+    if resp.status_code not in RETRY_STATUSES or attempt >= config.LLM_MAX_RETRIES:
+        return None
+    retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+    if retry_after is not None:
+        # A long wait means a quota window, not a blip — fall back now
+        return retry_after if retry_after <= config.LLM_RETRY_MAX_WAIT_SECONDS else None
+    if resp.status_code == 429 and not retry_429_without_hint:
+        return None
+    return _backoff(attempt)
+
+
+# ── Streaming ─────────────────────────────────────────────────────────
+
+def _read_stream(resp: httpx.Response, parse_event: EventParser) -> tuple[str, dict]:
+    parts: list[str] = []
+    usage: dict = {}
+    for line in resp.iter_lines():
+        if not line.startswith("data:"):
+            continue  # "event:" names, comments, keep-alives
+        data = line[5:].strip()
+        if not data:
+            continue
+        if data == "[DONE]":
+            break
+        delta, event_usage = parse_event(json.loads(data))
+        if delta:
+            parts.append(delta)
+        usage.update({k: v for k, v in event_usage.items() if v is not None})
+    return "".join(parts), usage
+
+
+def stream_text(
+    provider: str,
+    url: str,
+    *,
+    headers: dict,
+    payload: dict,
+    parse_event: EventParser,
+    retry_429_without_hint: bool = True,
+) -> str:
+    """
+    POST ``payload`` as a streaming request and return the assembled text.
+
+    Raises ``httpx.HTTPStatusError`` / ``httpx.TransportError`` once retries
+    are exhausted (or for non-retryable statuses).
+    """
+    http = client()
+    for attempt in range(config.LLM_MAX_RETRIES + 1):
+        started = time.monotonic()
+        try:
+            with http.stream("POST", url, headers=headers, json=payload) as resp:
+                if resp.status_code >= 400:
+                    resp.read()  # error body for the exception / log
+                    delay = _retry_delay(resp, attempt, retry_429_without_hint)
+                    if delay is None:
+                        _record_error(provider)
+                        resp.raise_for_status()
+                    reason = f"HTTP {resp.status_code}"
+                else:
+                    text, usage = _read_stream(resp, parse_event)
+                    _record_success(provider, time.monotonic() - started, usage)
+                    return text
+        except RETRY_ERRORS as e:
+            if attempt >= config.LLM_MAX_RETRIES:
+                _record_error(provider)
+                raise
+            delay = _backoff(attempt)
+            reason = f"{type(e).__name__}: {e}"
+
+        with _lock:
+            _metrics[provider]["retries"] += 1
+        logger.warning(
+            "LLM %s: %s — retry %d/%d in %.1fs",
+            provider, reason, attempt + 1, config.LLM_MAX_RETRIES, delay,
+        )
+        time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _record_success(provider: str, seconds: float, usage: dict) -> None:
+    with _lock:
+        m = _metrics[provider]
+        m["calls"] += 1
+        m["latency_seconds"] += seconds
+        m["last_latency_seconds"] = seconds
+        m["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+        m["completion_tokens"] += int(usage.get("completion_tokens") or 0)
+    logger.info(
+        "LLM %s: %.1fs, tokens in=%s out=%s",
+        provider, seconds, usage.get("prompt_tokens", "?"), usage.get("completion_tokens", "?"),
+    )
+
+
+def _record_error(provider: str) -> None:
+    with _lock:
+        _metrics[provider]["calls"] += 1
+        _metrics[provider]["errors"] += 1
@@ -7,11 +7,12 @@ so the rest of the pipeline (AI selector, dedup, poster) is source-agnostic.
 
 from __future__ import annotations
 
-import hashlib
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
+from near_dup import url_fingerprint
+
 
 @dataclass
 class NormalizedPost:
@@ -47,7 +48,7 @@ class NormalizedPost:
     @property
     def fingerprint(self) -> str:
         """Deterministic hash for dedup — based on canonical URL."""
-        return hashlib.sha256(self.url.encode()).hexdigest()[:32]
+        return url_fingerprint(self.url)
 
     def to_dict(self) -> dict:
         return {
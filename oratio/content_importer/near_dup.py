@@ -0,0 +1,166 @@
+"""
+URL canonicalisation + title SimHash for near-duplicate detection.
+
+The same story reaches us from several sources under different URLs
+(tracking params, mobile/AMP variants, youtu.be vs youtube.com, x.com vs
+xcancel.com) and with slightly different titles.  DedupStore uses:
+
+  - ``canonical_url``  → exact dedup key (``NormalizedPost.fingerprint``)
+  - ``title_simhash``  → 64-bit SimHash, split into ``SIMHASH_BANDS`` bands
+                         for LSH lookup.  Two hashes within
+                         ``config.NEAR_DUP_MAX_DISTANCE`` bits always share
+                         at least one band (pigeonhole), so an indexed
+                         band match + Hamming check finds every near
+                         duplicate without scanning history.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import config
+
+# ─── URL canonicalisation ─────────────────────────────────────────────
+
+_TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "cmpid", "ocid", "smid", "smtyp",
+    "feature", "si", "share_id", "spm", "_ga", "guccounter", "taid", "CMP", "mbid",
+})
+_TRACKING_PREFIXES = ("utm_", "__", "pk_", "mtm_", "hmb_", "at_", "_hs")
+
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.", "old.", "np.")
+_HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "twitter.com": "x.com",
+    "xcancel.com": "x.com",
+    "nitter.net": "x.com",
+}
+# Hosts where only some query params identify the content — keep just those
+_QUERY_KEYS_KEEP = {
+    "youtube.com": {"v"},
+    "x.com": set(),
+}
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a URL so trivial variants of one page compare equal."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    if not parts.netloc:
+        return url.strip()
+
+    host = (parts.hostname or "").lower().rstrip(".")
+    changed = True
+    while changed:
+        changed = False
+        for prefix in _HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                changed = True
+    host = _HOST_ALIASES.get(host, host)
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    query = parse_qsl(parts.query, keep_blank_values=False)
+
+    if host == "youtube.com":
+        if parts.hostname and parts.hostname.lower().endswith("youtu.be"):
+            query = [("v", path.strip("/"))]
+            path = "/watch"
+        elif path.startswith(("/shorts/", "/embed/", "/live/")):
+            query = [("v", path.split("/")[2])]
+            path = "/watch"
+    elif host == "x.com":
+        path = re.sub(r"/i/web/status/", "/i/status/", path)
+
+    # AMP variants: /amp, /amp/, /article.amp.html, ?outputType=amp
+    path = re.sub(r"/amp/?$", "/", path)
+    path = re.sub(r"\.amp(\.html?)$", r"\1", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    keep = _QUERY_KEYS_KEEP.get(host)
+    if keep is not None:
+        query = [(k, v) for k, v in query if k in keep]
+    else:
+        query = [
+            (k, v) for k, v in query
+            if k not in _TRACKING_PARAMS
+            and not k.lower().startswith(_TRACKING_PREFIXES)
+            and not (k == "outputType" and v == "amp")
+        ]
+
+    netloc = host
+    if parts.port and parts.port not in (80, 443):
+        netloc = f"{host}:{parts.port}"
+    return urlunsplit(("https", netloc, path, urlencode(sorted(query)), ""))
+
+
+def url_fingerprint(url: str) -> str:
+    return hashlib.sha256(canonical_url(url).encode()).hexdigest()[:32]
+
+
+# ─── Title SimHash ────────────────────────────────────────────────────
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Publisher suffixes that differ between sources for the same headline
+_TITLE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,40}$")
+_STOPWORDS = frozenset({
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are",
+    "was", "with", "at", "by", "as", "from", "it", "its", "this", "that",
+})
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def title_simhash(title: str) -> int | None:
+    """
+    64-bit SimHash of a title (unigrams + bigrams), or None if the title is
+    too short for a meaningful near-duplicate comparison.
+    """
+    title = _TITLE_SUFFIX_RE.sub("", title or "").lower()
+    tokens = [t for t in _TOKEN_RE.findall(title) if t not in _STOPWORDS]
+    if len(tokens) < config.NEAR_DUP_MIN_TOKENS:
+        return None
+
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def simhash_bands(value: int) -> list[int]:
+    return [(value >> (i * _BAND_BITS)) & _BAND_MASK for i in range(SIMHASH_BANDS)]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_sqlite_int(value: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_sqlite_int(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
@@ -0,0 +1,70 @@
+"""
+Thread-safe rate limiting for the posting stage.
+
+  - TokenBucket: ``rate`` tokens/second, up to ``burst`` banked.  acquire()
+    blocks only as long as needed, instead of a fixed sleep per request.
+  - HostLimiter: a TokenBucket + concurrency cap per host, configured from
+    the sources' ``rate_limit`` entries (see config.get_sources()).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # total seconds callers spent blocked
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens``, blocking until available. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.waited += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostLimiter:
+    """Per-host token bucket + concurrency cap, shared by every source on that host."""
+
+    def __init__(self):
+        self._hosts: dict[str, tuple[TokenBucket, threading.BoundedSemaphore]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, limits: dict) -> None:
+        """Register a host; the first source configuring a host wins."""
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    TokenBucket(limits["per_second"], limits.get("burst", 1)),
+                    threading.BoundedSemaphore(max(1, limits.get("concurrency", 1))),
+                )
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        bucket, semaphore = self._hosts[host]
+        with semaphore:
+            bucket.acquire()
+            yield
+
+    def waited(self) -> dict[str, float]:
+        return {host: round(bucket.waited, 2) for host, (bucket, _) in self._hosts.items()}
@@ -3,20 +3,28 @@ Main scheduler / pipeline orchestrator.
 
 Runs the full import pipeline on a configurable interval.
 
-Architecture (v3 — single AI call for all sources):
-  1. Fetch from all enabled sources (collectors)
-  2. Deduplicate against history
-  3. ONE AI call to select posts across all sources
-     (AI is told per-source quotas so each source gets fair picks)
+Architecture (v3 — one batched AI selection for all sources):
+  1. Fetch from all enabled sources (collectors) in parallel
+     (thread pool, per-host concurrency cap, per-source time budget);
+     incremental sources resume from their stored cursor
+  2. Deduplicate against history (canonical URL + near-duplicate titles)
+  3. One batched AI selection across all sources: each source's top
+     candidates (by score) are rated, reusing cached ratings, in at most
+     AI_MAX_CALLS_PER_CYCLE token-budgeted prompts; the top-rated posts
+     per source fill its quota.
      Sources with skip_ai=True bypass AI and import ALL fetched posts.
   4. Collect all selected posts and SHUFFLE them so posts from
      different sources are interleaved (not posted source-by-source).
-  5. Post selected items to each source's dedicated Lemmy community
-  6. Fetch top comments (score-based, no AI) for sources that support it
+  5. Fetch top comments (score-based, no AI) for every selected post in
+     parallel, under per-host rate limits (config "rate_limit")
+  6. Post selected items + comments to each source's dedicated Lemmy
+     community as soon as each post's comments are ready, paced by one
+     token bucket for all Lemmy writes
   7. Record results
 
-This minimises API calls to 1 per cycle (vs N per source),
-cutting token usage by ~90%.
+AI calls per cycle are bounded by AI_MAX_CALLS_PER_CYCLE (often 1, or 0
+when every candidate already has a cached rating) instead of one per source,
+and prompt size by AI_PROMPT_TOKEN_BUDGET.
 """
 
 from __future__ import annotations
@@ -26,9 +34,12 @@ import random
 import re
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from urllib.parse import urlparse
 
 import config
+import llm_client
 from ai_selector import select_posts_batch
 from collectors import (
     RedditCollector,
@@ -46,10 +57,12 @@ from collectors import (
     InstagramCollector,
     NineGagCollector,
 )
+from collectors import http_client
 from collectors.base import BaseCollector
 from dedup import DedupStore
 from lemmy_client import LemmyClient
-from models import NormalizedPost
+from models import NormalizedComment, NormalizedPost
+from rate_limit import HostLimiter, TokenBucket
 
 logger = logging.getLogger("content_importer.scheduler")
 
@@ -84,6 +97,89 @@ def _is_korean(post: NormalizedPost) -> bool:
     return len(hangul_chars) / non_space >= 0.3
 
 
+def _source_host(src: dict) -> str:
+    """Host key used to cap concurrent fetches against the same site."""
+    if src.get("host"):
+        return src["host"]
+    for key in ("url", "search_url"):
+        if src.get(key):
+            return urlparse(src[key]).netloc
+    return src["type"]
+
+
+def _fetch_all(
+    collectors: dict[str, tuple[dict, BaseCollector]]
+) -> dict[str, dict]:
+    """
+    Run ``collector.fetch()`` for every source concurrently.
+
+    Returns ``{source_name: {"posts": [...] | None, "seconds": float,
+    "error": str | None, "validators": [...]}}`` — ``validators`` are the
+    source's conditional-GET validators, saved by the caller once the
+    source has been processed.
+    A source whose fetch outlives its budget is reported as timed out; its
+    worker thread is abandoned (collectors use request timeouts, so it ends
+    on its own) and its result is discarded.
+    """
+    host_slots: dict[str, threading.BoundedSemaphore] = {}
+    for src, _ in collectors.values():
+        host_slots.setdefault(
+            _source_host(src), threading.BoundedSemaphore(config.FETCH_PER_HOST_CONCURRENCY)
+        )
+
+    started: dict[str, float] = {}
+
+    def run(name: str, src: dict, collector: BaseCollector) -> list[NormalizedPost]:
+        with host_slots[_source_host(src)]:
+            started[name] = time.monotonic()
+            with http_client.defer_validators() as validators:
+                return collector.fetch(), validators
+
+    results: dict[str, dict] = {}
+    stage_deadline = time.monotonic() + config.FETCH_STAGE_TIMEOUT_SECONDS
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(config.FETCH_MAX_WORKERS, len(collectors))),
+        thread_name_prefix="fetch",
+    )
+    try:
+        futures = {
+            pool.submit(run, name, src, collector): name
+            for name, (src, collector) in collectors.items()
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for fut in done:
+                name = futures[fut]
+                elapsed = now - started.get(name, now)
+                try:
+                    posts, validators = fut.result()
+                    results[name] = {
+                        "posts": posts, "seconds": elapsed, "error": None, "validators": validators,
+                    }
+                except Exception as e:
+                    results[name] = {"posts": None, "seconds": elapsed, "error": str(e), "validators": []}
+
+            for fut in list(pending):
+                name = futures[fut]
+                src = collectors[name][0]
+                budget = src.get("fetch_timeout", config.FETCH_TIMEOUT_SECONDS)
+                t0 = started.get(name)
+                if (t0 is not None and now - t0 > budget) or now > stage_deadline:
+                    pending.discard(fut)
+                    fut.cancel()
+                    results[name] = {
+                        "posts": None,
+                        "seconds": now - t0 if t0 is not None else 0.0,
+                        "error": "timeout",
+                        "validators": [],
+                    }
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
 def run_import_cycle(
     dedup: DedupStore, lemmy: LemmyClient
 ) -> dict:
@@ -103,6 +199,7 @@ def run_import_cycle(
     # Collect new posts per source: { source_name: (source_cfg, [posts], collector) }
     source_pools: dict[str, tuple[dict, list[NormalizedPost], BaseCollector]] = {}
 
+    collectors: dict[str, tuple[dict, BaseCollector]] = {}
     for src in sources:
         src_name = src["name"]
         collector_cls = COLLECTOR_REGISTRY.get(src["type"])
@@ -110,41 +207,109 @@ def run_import_cycle(
             logger.warning("Unknown type '%s' for '%s'", src["type"], src_name)
             source_results[src_name] = {"status": "unknown_type"}
             continue
+        collectors[src_name] = (src, collector_cls(src))
 
-        collector = collector_cls(src)
-        try:
-            posts = collector.fetch()
-        except Exception as e:
-            logger.error("Collector '%s' failed: %s", src_name, e)
-            source_results[src_name] = {"status": "fetch_error", "error": str(e)}
+    # Incremental sources only fetch items past their stored high-water mark
+    stored_cursors = dedup.get_cursors(
+        [name for name, (_, collector) in collectors.items() if collector.incremental]
+    )
+    for name, cursor in stored_cursors.items():
+        collectors[name][1].cursor = cursor
+
+    fetch_started = time.monotonic()
+    fetch_results = _fetch_all(collectors)
+    fetch_seconds = time.monotonic() - fetch_started
+    fetch_timings = {name: round(r["seconds"], 2) for name, r in fetch_results.items()}
+
+    # Dedup runs on this thread once all fetches are back — one call over
+    # every source (config order) so the same story from two sources is
+    # caught as a near-duplicate too
+    fetched_by_source: dict[str, list[NormalizedPost]] = {}
+    for src_name, (src, collector) in collectors.items():
+        result = fetch_results[src_name]
+        if result["error"] == "timeout":
+            logger.error("Collector '%s' timed out after %.1fs", src_name, result["seconds"])
+            source_results[src_name] = {
+                "status": "fetch_timeout", "fetch_seconds": fetch_timings[src_name],
+            }
+            continue
+        if result["error"] is not None:
+            logger.error("Collector '%s' failed: %s", src_name, result["error"])
+            source_results[src_name] = {
+                "status": "fetch_error", "error": result["error"],
+                "fetch_seconds": fetch_timings[src_name],
+            }
             continue
 
+        posts = result["posts"]
         fetched = len(posts)
         total_fetched += fetched
 
         if not posts:
-            logger.info("[%s] No posts fetched", src_name)
-            source_results[src_name] = {"fetched": 0, "posted": 0, "status": "no_posts"}
+            logger.info("[%s] No posts fetched (%.1fs)", src_name, result["seconds"])
+            source_results[src_name] = {
+                "fetched": 0, "posted": 0, "status": "no_posts",
+                "fetch_seconds": fetch_timings[src_name],
+            }
             continue
 
-        new_posts = dedup.filter_new(posts)
+        fetched_by_source[src_name] = posts
+
+    new_ids = {
+        id(p) for p in dedup.filter_new([p for posts in fetched_by_source.values() for p in posts])
+    }
+
+    for src_name, posts in fetched_by_source.items():
+        src, collector = collectors[src_name]
+        fetched = len(posts)
+        new_posts = [p for p in posts if id(p) in new_ids]
         total_new += len(new_posts)
 
         if not new_posts:
             logger.info("[%s] All %d duplicates", src_name, fetched)
-            source_results[src_name] = {"fetched": fetched, "posted": 0, "status": "all_duplicates"}
+            source_results[src_name] = {
+                "fetched": fetched, "posted": 0, "status": "all_duplicates",
+                "fetch_seconds": fetch_timings[src_name],
+            }
             continue
 
         source_pools[src_name] = (src, new_posts, collector)
-        logger.info("[%s] fetched=%d, new=%d", src_name, fetched, len(new_posts))
+        logger.info(
+            "[%s] fetched=%d, new=%d (%.1fs)", src_name, fetched, len(new_posts), fetch_timings[src_name]
+        )
+
+    slowest = max(fetch_timings.values(), default=0.0)
+    logger.info(
+        "Fetch stage: %d sources in %.1fs (slowest %.1fs, sum %.1fs)",
+        len(collectors), fetch_seconds, slowest, sum(fetch_timings.values()),
+    )
+
+    # Cursors and HTTP validators (ETag / body hash) advance only once the
+    # cycle gets this far without raising, and only for sources whose fetch
+    # succeeded; otherwise the next cycle re-fetches the same window (dedup
+    # covers the overlap) instead of seeing a 304 / unchanged feed.
+    def save_cursors() -> None:
+        succeeded = [name for name in collectors if fetch_results[name]["error"] is None]
+        dedup.set_cursors({
+            name: collectors[name][1].next_cursor
+            for name in succeeded
+            if collectors[name][1].incremental and collectors[name][1].next_cursor
+        })
+        http_client.save_validators(
+            [row for name in succeeded for row in fetch_results[name]["validators"]]
+        )
 
     if not source_pools:
+        save_cursors()
         dedup.finish_run(run_id, total_fetched, 0, "no_new_posts")
-        return {"fetched": total_fetched, "posted": 0, "status": "no_new_posts"}
+        return {
+            "fetched": total_fetched, "posted": 0, "status": "no_new_posts",
+            "fetch_seconds": round(fetch_seconds, 2), "sources": source_results,
+        }
 
     # ── Phase 2: AI selection (or skip for skip_ai sources) ─────
     # Sources with skip_ai=True: import ALL new posts (no AI, no score filter)
-    # Other sources: single AI batch call as usual
+    # Other sources: one batched AI selection (token-budgeted prompts + rating cache)
     skip_ai_selected: dict[str, list[NormalizedPost]] = {}
     ai_source_pools: dict[str, tuple[dict, list[NormalizedPost], BaseCollector]] = {}
 
@@ -170,7 +335,7 @@ def run_import_cycle(
         for p in posts:
             all_new.append((name, p))
 
-    # Single AI/score selection for non-skip sources
+    # Batched AI/score selection for non-skip sources
     if all_new:
         ai_selected_by_source = select_posts_batch(all_new, quotas)
     else:
@@ -199,41 +364,77 @@ def run_import_cycle(
     src_posted: dict[str, int] = {}
     src_comments: dict[str, int] = {}
 
-    for post, src_name, src_cfg, collector in all_selected:
-        # Apply fallback thumbnail if post has none and source defines one
-        if not post.thumbnail_url and src_cfg.get("fallback_thumbnail"):
-            post.thumbnail_url = src_cfg["fallback_thumbnail"]
-            logger.debug("[%s] Applied fallback thumbnail for '%s'", src_name, post.title[:40])
+    host_limiter = HostLimiter()
+    for src_cfg, _, _collector in source_pools.values():
+        host_limiter.configure(
+            _source_host(src_cfg), src_cfg.get("rate_limit", config.DEFAULT_HOST_RATE_LIMIT)
+        )
+    lemmy_bucket = TokenBucket(config.LEMMY_WRITES_PER_SECOND, config.LEMMY_WRITE_BURST)
 
+    def prepare(
+        post: NormalizedPost, src_name: str, src_cfg: dict, collector: BaseCollector
+    ) -> tuple[bool, list[NormalizedComment]]:
+        """Liveness check + top comments for one post (runs on the comment pool)."""
+        host = _source_host(src_cfg)
         # ── Pre-post liveness check (4chan threads can 404 fast) ──
-        if hasattr(collector, "verify_alive") and not collector.verify_alive(post):
-            logger.info("[%s] Skipped dead thread: '%s'", src_name, post.title[:60])
-            continue
-
-        community = src_cfg.get("community", config.LEMMY_DEFAULT_COMMUNITY)
-        target = KOREAN_COMMUNITY if _is_korean(post) else community
-        post_id = lemmy.create_post(post, target)
-        if post_id:
+        if hasattr(collector, "verify_alive"):
+            with host_limiter.slot(host):
+                if not collector.verify_alive(post):
+                    return False, []
+        if not (comments_enabled and collector.supports_comments):
+            return True, []
+        try:
+            with host_limiter.slot(host):
+                return True, collector.fetch_comments(post, limit=comments_per_post)
+        except Exception as e:
+            logger.warning(
+                "[%s] Comment fetch failed for '%s': %s",
+                src_name, post.title[:40], e,
+            )
+            return True, []
+
+    posting_started = time.monotonic()
+    with ThreadPoolExecutor(
+        max_workers=max(1, config.COMMENT_FETCH_WORKERS), thread_name_prefix="comments"
+    ) as pool:
+        # Submitted in posting order, so the post at the head of the queue
+        # is usually ready by the time the previous one has been written
+        prepared = [
+            pool.submit(prepare, post, src_name, src_cfg, collector)
+            for post, src_name, src_cfg, collector in all_selected
+        ]
+
+        for (post, src_name, src_cfg, collector), future in zip(all_selected, prepared):
+            # Apply fallback thumbnail if post has none and source defines one
+            if not post.thumbnail_url and src_cfg.get("fallback_thumbnail"):
+                post.thumbnail_url = src_cfg["fallback_thumbnail"]
+                logger.debug("[%s] Applied fallback thumbnail for '%s'", src_name, post.title[:40])
+
+            try:
+                alive, comments = future.result()
+            except Exception as e:
+                logger.warning("[%s] Pre-post check failed for '%s': %s", src_name, post.title[:40], e)
+                alive, comments = True, []
+            if not alive:
+                logger.info("[%s] Skipped dead thread: '%s'", src_name, post.title[:60])
+                continue
+
+            community = src_cfg.get("community", config.LEMMY_DEFAULT_COMMUNITY)
+            target = KOREAN_COMMUNITY if _is_korean(post) else community
+            lemmy_bucket.acquire()
+            post_id = lemmy.create_post(post, target)
+            if not post_id:
+                continue
             dedup.mark_imported(post, post_id)
             src_posted[src_name] = src_posted.get(src_name, 0) + 1
 
-            # ── Phase 4: Fetch & post top comments (score-based) ──
-            if comments_enabled and collector.supports_comments:
-                try:
-                    comments = collector.fetch_comments(post, limit=comments_per_post)
-                    for comment in comments:
-                        cid = lemmy.create_comment(post_id, comment)
-                        if cid:
-                            src_comments[src_name] = src_comments.get(src_name, 0) + 1
-                            total_comments += 1
-                        time.sleep(0.5)  # rate limit between comments
-                except Exception as e:
-                    logger.warning(
-                        "[%s] Comment fetch failed for '%s': %s",
-                        src_name, post.title[:40], e,
-                    )
-
-            time.sleep(1.0)
+            for comment in comments:
+                lemmy_bucket.acquire()
+                cid = lemmy.create_comment(post_id, comment)
+                if cid:
+                    src_comments[src_name] = src_comments.get(src_name, 0) + 1
+                    total_comments += 1
+    posting_seconds = time.monotonic() - posting_started
 
     total_posted = sum(src_posted.values())
 
@@ -252,6 +453,7 @@ def run_import_cycle(
             "comments": sc,
             "community": community,
             "skip_ai": src_cfg.get("skip_ai", False),
+            "fetch_seconds": fetch_timings[src_name],
             "status": "ok",
         }
         logger.info(
@@ -260,6 +462,7 @@ def run_import_cycle(
             " (skip_ai)" if src_cfg.get("skip_ai") else "",
         )
 
+    save_cursors()
     dedup.finish_run(run_id, total_fetched, total_posted, "ok")
     logger.info(
         "═══ Import cycle done: fetched=%d, new=%d, posted=%d, comments=%d ═══",
@@ -271,6 +474,11 @@ def run_import_cycle(
         "new": total_new,
         "posted": total_posted,
         "comments": total_comments,
+        "fetch_seconds": round(fetch_seconds, 2),
+        "posting_seconds": round(posting_seconds, 2),
+        "rate_limit_wait_seconds": {"lemmy": round(lemmy_bucket.waited, 2), **host_limiter.waited()},
+        "http": dict(http_client.stats),  # cumulative since startup
+        "llm": llm_client.metrics(),  # cumulative since startup
         "sources": source_results,
         "status": "ok",
     }
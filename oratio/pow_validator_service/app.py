@@ -4,145 +4,93 @@ Lemmy 회원가입 시 Proof of Work 검증 프록시 서비스
 
 Rust 백엔드 수정 없이 PoW 검증 기능 추가!
 + 스팸 필터: 보이지 않는 유니코드 문자(soft hyphen 등)를 벗겨낸 뒤 키워드 매칭
+
+ASGI(FastAPI) 앱: Lemmy/멤버십 서비스 호출은 공유 httpx.AsyncClient 커넥션 풀을
+사용하므로, Lemmy 응답이 느려도 워커 프로세스가 묶이지 않고 동시 요청 수는
+소켓(커넥션 풀) 한도로만 제한된다.
 """
 
-from flask import Flask, request, jsonify
-import requests
+import asyncio
 import hashlib
+import hmac
+import logging
 import time
-import re
-import unicodedata
-import json
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any, List, Tuple
 
-app = Flask(__name__)
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from pow_difficulty import DifficultyController
+from pow_ledger import pow_ledger
+from spam_filter import (
+    SPAM_KEYWORD_PATTERNS, SPAM_MATCHER,
+    strip_invisible_chars, check_content_for_spam,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(name)s] %(levelname)s — %(message)s",
+)
+logger = logging.getLogger('pow_validator')
 
 # 설정 (환경변수 우선, 없으면 기본값 사용)
 import os
 POW_DIFFICULTY = int(os.environ.get('POW_DIFFICULTY', '16'))  # 최소 난이도 (적응형 난이도: 클라이언트가 16~18 사이에서 결정)
+# 댓글 PoW 최소 난이도 (댓글은 게시글/회원가입보다 낮은 난이도)
+COMMENT_POW_DIFFICULTY = int(os.environ.get('COMMENT_POW_DIFFICULTY', '13'))
 POW_MAX_AGE_SECONDS = int(os.environ.get('POW_MAX_AGE_SECONDS', '600'))  # 10분
 LEMMY_BACKEND_URL = os.environ.get('LEMMY_BACKEND_URL', 'http://lemmy:8536')  # Docker 네트워크 내부
 
+# 업스트림 커넥션 풀 (워커 프로세스당)
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_MAX_CONNECTIONS', '200'))
+UPSTREAM_MAX_KEEPALIVE = int(os.environ.get('UPSTREAM_MAX_KEEPALIVE', '50'))
+LEMMY_PROXY_TIMEOUT = float(os.environ.get('LEMMY_PROXY_TIMEOUT', '30'))
+MEMBERSHIP_CHECK_TIMEOUT = float(os.environ.get('MEMBERSHIP_CHECK_TIMEOUT', '5'))
 
-# ============================================================
-# 스팸 필터 시스템
-# ============================================================
-# 봇이 "P­a­y­A­t­H­o­m­e" 처럼 글자 사이에 보이지 않는 문자를 
-# 끼워넣어 필터를 우회하므로, 먼저 숨겨진 문자를 벗겨낸 뒤 검사한다.
-# ============================================================
-
-# 스팸 키워드 목록 (대소문자 무시, 정규식 지원)
-# 새 스팸 패턴이 보이면 여기에 추가하면 됨
-SPAM_KEYWORD_PATTERNS: List[str] = [
-    # --- 돈벌기 스캠 사이트 ---
-    r'payathome\d*\.com',
-    r'workathome\d*\.com',
-    r'earnathome\d*\.com',
-    r'makemoneyathome\d*\.com',
-    r'jobathome\d*\.com',
-    r'homejobs?\d*\.com',
-    r'easymoney\d*\.com',
-    r'smartjob\d*\.com',
-    r'dollartree\d*\.com',      # 스캠에서 자주 사용되는 도메인
-    # --- 돈벌기 스캠 문구 패턴 ---
-    r'i\s*(basically\s*)?make\s*(about\s*)?\$\d[\d,]*.*?a\s*month\s*online',
-    r'enough\s*to\s*(comfortably\s*)?replace\s*my\s*(old\s*)?jobs?\s*income',
-    # ❌ 제거됨: 'only work N hours a week from home' → 정상 재택근무 글에 오탐
-    # ❌ 제거됨: 'amazed how easy it was' → 일상 표현이라 오탐 위험 높음
-    r'you\s*can\s*check\s*more\s*[.=>\-]+',
-]
-
-# 환경변수로 추가 패턴 로드 (docker-compose.yml에서 설정 가능)
-_extra_patterns = os.environ.get('SPAM_EXTRA_PATTERNS', '')
-if _extra_patterns:
-    try:
-        SPAM_KEYWORD_PATTERNS.extend(json.loads(_extra_patterns))
-        app.logger.info(f"Loaded {len(json.loads(_extra_patterns))} extra spam patterns from env")
-    except json.JSONDecodeError:
-        # 단일 패턴이면 그냥 추가
-        SPAM_KEYWORD_PATTERNS.append(_extra_patterns)
-
-# 미리 컴파일 (서버 시작 시 1회)
-SPAM_COMPILED_PATTERNS = []
-for pat in SPAM_KEYWORD_PATTERNS:
-    try:
-        SPAM_COMPILED_PATTERNS.append(re.compile(pat, re.IGNORECASE | re.DOTALL))
-    except re.error as e:
-        print(f"[WARN] Invalid spam pattern skipped: {pat!r} ({e})")
+# true면 /api/pow/challenge에서 받은 서명된 챌린지만 허용 (클라이언트 생성 챌린지 거부)
+POW_REQUIRE_SIGNED_CHALLENGE = os.environ.get('POW_REQUIRE_SIGNED_CHALLENGE', 'false').lower() == 'true'
+# 빈 값/docker-compose 기본값은 누구나 아는 값이라 서명 키로 쓰지 않음
+PUBLIC_API_KEYS = {'', 'changeme'}
 
 
-def strip_invisible_chars(text: str) -> str:
+def load_challenge_secret() -> bytes:
     """
-    텍스트에서 보이지 않는/조작용 유니코드 문자를 모두 제거한다.
-    
-    제거 대상:
-      - Soft Hyphen (U+00AD)  ← 이번 스팸봇이 사용
-      - Zero-Width Space (U+200B)
-      - Zero-Width Non-Joiner (U+200C)
-      - Zero-Width Joiner (U+200D)
-      - Left/Right-to-Left marks (U+200E, U+200F)
-      - 기타 유니코드 "Format" 카테고리(Cf) 문자들
-    
-    Returns:
-        눈에 보이는 문자만 남긴 깨끗한 텍스트
+    서버 발급 챌린지 서명 키 (워커 간 공유되어야 함)
+
+    POW_CHALLENGE_SECRET → LEMMY_API_KEY에서 파생 → 둘 다 없으면
+      - 서명 필수 모드: 위조 가능한 키로 시작하지 않도록 시작 거부
+      - 그 외: 무작위 키를 생성해 ledger에 보관 (모든 워커가 같은 키 사용) 후 경고
     """
-    return ''.join(
-        ch for ch in text
-        if unicodedata.category(ch) != 'Cf'
-    )
+    secret = os.environ.get('POW_CHALLENGE_SECRET', '')
+    if secret:
+        return secret.encode()
+    api_key = os.environ.get('LEMMY_API_KEY', '')
+    if api_key not in PUBLIC_API_KEYS:
+        return hashlib.sha256(f"pow-challenge:{api_key}".encode()).hexdigest().encode()
+    if POW_REQUIRE_SIGNED_CHALLENGE:
+        raise RuntimeError(
+            "POW_REQUIRE_SIGNED_CHALLENGE=true requires POW_CHALLENGE_SECRET "
+            "(or a non-default LEMMY_API_KEY) to sign challenges"
+        )
+    logger.warning("POW_CHALLENGE_SECRET is not set — signing challenges with a generated secret")
+    return pow_ledger.shared_secret('pow_challenge').encode()
 
 
-def check_spam(text: str) -> Tuple[bool, Optional[str]]:
-    """
-    텍스트가 스팸인지 검사한다.
-    
-    1) 보이지 않는 문자를 벗겨냄
-    2) 스팸 키워드 패턴 매칭
-    
-    Returns:
-        (is_spam, matched_pattern_or_None)
-    """
-    if not text:
-        return False, None
-    
-    cleaned = strip_invisible_chars(text)
-    
-    for pattern in SPAM_COMPILED_PATTERNS:
-        match = pattern.search(cleaned)
-        if match:
-            return True, match.group(0)
-    
-    return False, None
+POW_CHALLENGE_SECRET = load_challenge_secret()
+# 클라이언트 시계가 빠른 경우 허용하는 미래 타임스탬프 범위
+POW_CLOCK_SKEW_SECONDS = int(os.environ.get('POW_CLOCK_SKEW_SECONDS', '60'))
 
 
-def check_content_for_spam(data: dict, content_type: str) -> Optional[Tuple]:
-    """
-    게시글/댓글/회원가입 데이터에서 텍스트 필드를 추출하여 스팸 검사.
-    
-    Args:
-        data: 요청 JSON 데이터
-        content_type: 'comment', 'post', 'register' 중 하나
-    
-    Returns:
-        None이면 스팸 아님, (field, matched) 튜플이면 스팸
-    """
-    fields_to_check = []
-    
-    if content_type == 'comment':
-        fields_to_check = ['content']
-    elif content_type == 'post':
-        fields_to_check = ['name', 'body', 'url']
-    elif content_type == 'register':
-        fields_to_check = ['username', 'answer']  # 가입 시 답변란도 검사
-    
-    for field in fields_to_check:
-        value = data.get(field)
-        if value and isinstance(value, str):
-            is_spam, matched = check_spam(value)
-            if is_spam:
-                return (field, matched)
-    
-    return None
+# 요청률에 따라 기본 난이도 위로 올라가는 서버 측 요구 난이도
+difficulty_controller = DifficultyController({
+    'register': POW_DIFFICULTY,
+    'post': POW_DIFFICULTY,
+    'comment': COMMENT_POW_DIFFICULTY,
+})
+
 
 # PoW 검증 결과
 class PowVerificationResult:
@@ -150,6 +98,8 @@ class PowVerificationResult:
     INVALID_HASH = "invalid_hash"
     INVALID_DIFFICULTY = "invalid_difficulty"
     EXPIRED = "expired"
+    INVALID_SIGNATURE = "invalid_signature"
+    REPLAYED = "replayed"
     MISSING = "missing"
 
 
@@ -195,12 +145,45 @@ def check_difficulty(hash_hex: str, difficulty: int) -> bool:
     return bits_checked >= difficulty
 
 
+def record_pow_request(endpoint: str, ip: str, challenge: str, nonce: int, user_hash: str):
+    """적응형 난이도용 요청 기록 — 엔드포인트 전체 요청률에는 기본 난이도 이상의 올바른 해시만 반영"""
+    proof_ok = (
+        sha256(f"{challenge}:{nonce}") == user_hash
+        and check_difficulty(user_hash, difficulty_controller.base_difficulty[endpoint])
+    )
+    difficulty_controller.record(endpoint, ip, proof_ok)
+
+
+def challenge_signature(payload: str) -> str:
+    """서버 발급 챌린지의 HMAC 서명 (앞 16자)"""
+    return hmac.new(POW_CHALLENGE_SECRET, payload.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def is_challenge_signature_valid(challenge: str) -> bool:
+    """
+    챌린지 서명 확인 (상태 저장 없이 검증)
+    
+    서버 발급: "timestamp-random-signature" → 서명 일치해야 함
+    클라이언트 생성: "timestamp-random" → POW_REQUIRE_SIGNED_CHALLENGE가 아니면 허용
+    """
+    parts = challenge.split('-')
+    if len(parts) == 3:
+        payload = f"{parts[0]}-{parts[1]}"
+        return hmac.compare_digest(parts[2], challenge_signature(payload))
+    return not POW_REQUIRE_SIGNED_CHALLENGE
+
+
+def challenge_expires_at(challenge: str) -> int:
+    """챌린지가 만료되는 시각 (unix 초) — 이후에는 ledger에서 지워도 됨"""
+    return int(challenge.split('-')[0]) // 1000 + POW_MAX_AGE_SECONDS + 1
+
+
 def is_challenge_valid(challenge: str, max_age_seconds: int = POW_MAX_AGE_SECONDS) -> bool:
     """
     챌린지 유효성 검증 (타임스탬프 확인)
     
     Args:
-        challenge: 챌린지 문자열 (형식: "timestamp-randomstring")
+        challenge: 챌린지 문자열 (형식: "timestamp-randomstring[-signature]")
         max_age_seconds: 최대 유효 시간 (초)
     
     Returns:
@@ -218,25 +201,28 @@ def is_challenge_valid(challenge: str, max_age_seconds: int = POW_MAX_AGE_SECOND
         now_ms = int(time.time() * 1000)
         age_seconds = (now_ms - timestamp_ms) / 1000
         
-        return age_seconds <= max_age_seconds
+        # 미래 타임스탬프로 유효 시간을 늘리는 것 방지
+        return -POW_CLOCK_SKEW_SECONDS <= age_seconds <= max_age_seconds
     
     except (ValueError, IndexError):
         return False
 
 
-def filter_hop_by_hop_headers(response_headers):
+def filter_hop_by_hop_headers(response_headers: httpx.Headers) -> List[Tuple[str, str]]:
     """
     프록시 응답에서 hop-by-hop 헤더를 제거.
     Content-Encoding, Transfer-Encoding 등이 남으면
     ERR_CONTENT_DECODING_FAILED 오류 발생.
+    Content-Length는 디코딩된 본문 기준으로 다시 계산되도록 제거.
+    Set-Cookie 등 중복 헤더는 그대로 유지 (multi_items).
     """
     hop_by_hop = {
         'content-encoding', 'transfer-encoding', 'connection',
         'keep-alive', 'proxy-authenticate', 'proxy-authorization',
-        'te', 'trailers', 'upgrade'
+        'te', 'trailers', 'upgrade', 'content-length'
     }
     return [
-        (key, value) for key, value in response_headers.items()
+        (key, value) for key, value in response_headers.multi_items()
         if key.lower() not in hop_by_hop
     ]
 
@@ -275,29 +261,158 @@ def verify_proof_of_work(
     if not is_challenge_valid(challenge):
         return PowVerificationResult.EXPIRED
     
+    # 5. 서버 발급 챌린지 서명 검증
+    if not is_challenge_signature_valid(challenge):
+        return PowVerificationResult.INVALID_SIGNATURE
+    
+    # 재사용 여부는 요청을 실제로 처리할 때 pow_ledger.reserve()로 확인
     return PowVerificationResult.VALID
 
 
-@app.route('/api/v3/user/register', methods=['POST'])
-def register_with_pow():
+# ============================================================
+# 업스트림 HTTP 클라이언트 (Lemmy / 멤버십 서비스)
+# ============================================================
+
+http_client: Optional[httpx.AsyncClient] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+        ),
+        timeout=LEMMY_PROXY_TIMEOUT,
+    )
+    snapshot_task = None
+    if MEMBERSHIP_SNAPSHOT_INTERVAL > 0:
+        snapshot_task = asyncio.create_task(active_members_snapshot_loop())
+    try:
+        yield
+    finally:
+        if snapshot_task:
+            snapshot_task.cancel()
+        await http_client.aclose()
+        http_client = None
+
+
+app = FastAPI(title="Oratio PoW Validator", lifespan=lifespan)
+
+
+def client_ip(request: Request) -> str:
+    # nginx 뒤에서는 request.client가 nginx 주소이므로 X-Real-IP 우선
+    real_ip = request.headers.get('x-real-ip')
+    if real_ip:
+        return real_ip.strip()
+    return request.client.host if request.client else '?'
+
+
+def strip_pow_fields(data: dict) -> dict:
+    """Lemmy는 PoW 필드를 모르므로 제거한 사본 반환"""
+    lemmy_data = data.copy()
+    lemmy_data.pop('pow_challenge', None)
+    lemmy_data.pop('pow_nonce', None)
+    lemmy_data.pop('pow_hash', None)
+    return lemmy_data
+
+
+def build_forward_headers(request: Request) -> Dict[str, str]:
+    """
+    클라이언트 헤더를 Lemmy로 전달 (Authorization/쿠키 포함).
+    Accept-Encoding 제거: httpx가 자동 디코딩하므로 gzip 응답을 받으면 안됨
+    """
+    forward_headers = {
+        k: v for k, v in request.headers.items()
+        if k.lower() not in ('host', 'content-length', 'accept-encoding', 'transfer-encoding')
+    }
+    forward_headers['content-type'] = 'application/json'
+    return forward_headers
+
+
+async def proxy_to_lemmy(path: str, lemmy_data: dict, headers: Dict[str, str],
+                         pow_challenge: Optional[str] = None) -> Response:
+    """
+    Lemmy 백엔드로 POST 전달 후 응답을 그대로 반환 (hop-by-hop 헤더 제거)
+    
+    pow_challenge가 있으면 전달 전에 ledger에 사용 처리하고,
+    Lemmy가 요청을 처리하지 못하면 다시 풀어서 같은 풀이로 재시도할 수 있게 한다.
+    """
+    if pow_challenge and not pow_ledger.reserve(pow_challenge, challenge_expires_at(pow_challenge)):
+        logger.warning(f"PoW replay rejected: path={path}, challenge={pow_challenge[:20]}...")
+        return pow_failure_response(PowVerificationResult.REPLAYED)
+    try:
+        upstream = await http_client.post(
+            f"{LEMMY_BACKEND_URL}{path}",
+            json=lemmy_data,
+            headers=headers,
+        )
+    except Exception:
+        if pow_challenge:
+            pow_ledger.release(pow_challenge)
+        raise
+    if pow_challenge and upstream.status_code >= 400:
+        pow_ledger.release(pow_challenge)
+    response = Response(content=upstream.content, status_code=upstream.status_code)
+    for key, value in filter_hop_by_hop_headers(upstream.headers):
+        response.headers.append(key, value)
+    return response
+
+
+def pow_failure_response(result: str) -> JSONResponse:
+    error_messages = {
+        PowVerificationResult.INVALID_HASH: 'Invalid Proof of Work: hash mismatch',
+        PowVerificationResult.INVALID_DIFFICULTY: 'Invalid Proof of Work: difficulty not met',
+        PowVerificationResult.EXPIRED: 'Invalid Proof of Work: challenge expired',
+        PowVerificationResult.INVALID_SIGNATURE: 'Invalid Proof of Work: challenge signature mismatch',
+        PowVerificationResult.REPLAYED: 'Invalid Proof of Work: solution already used',
+    }
+    # reason 필드를 추가하여 클라이언트가 실패 유형을 구분할 수 있게 함
+    reason_map = {
+        PowVerificationResult.INVALID_HASH: 'hash_mismatch',
+        PowVerificationResult.INVALID_DIFFICULTY: 'difficulty_not_met',
+        PowVerificationResult.EXPIRED: 'expired',
+        PowVerificationResult.INVALID_SIGNATURE: 'invalid_signature',
+        PowVerificationResult.REPLAYED: 'replayed',
+    }
+    return JSONResponse({
+        'error': 'invalid_proof_of_work',
+        'message': error_messages.get(result, 'Invalid Proof of Work'),
+        'reason': reason_map.get(result, 'unknown')
+    }, status_code=400)
+
+
+BACKEND_ERROR = {
+    'error': 'backend_error',
+    'message': 'Failed to connect to backend'
+}
+INTERNAL_ERROR = {
+    'error': 'internal_error',
+    'message': 'Internal server error'
+}
+
+
+@app.post('/api/v3/user/register')
+async def register_with_pow(request: Request):
     """
     PoW 검증 후 Lemmy 백엔드로 회원가입 요청 전달
     """
     try:
-        data = request.get_json()
+        data = await request.json()
         
         # 🛡️ 스팸 필터 검사 (PoW 전에 먼저 — 스팸이면 계산 낭비할 필요 없음)
         spam_result = check_content_for_spam(data, 'register')
         if spam_result:
             field, matched = spam_result
-            app.logger.warning(
+            logger.warning(
                 f"SPAM BLOCKED (register): field={field}, matched={matched!r}, "
-                f"IP={request.remote_addr}, username={data.get('username', '?')}"
+                f"IP={client_ip(request)}, username={data.get('username', '?')}"
             )
-            return jsonify({
+            return JSONResponse({
                 'error': 'spam_detected',
                 'message': 'Your registration was flagged as spam.'
-            }), 403
+            }, status_code=403)
         
         # PoW 필드 추출
         pow_challenge = data.get('pow_challenge')
@@ -306,93 +421,67 @@ def register_with_pow():
         
         # PoW 필드 존재 확인
         if not all([pow_challenge, pow_nonce is not None, pow_hash]):
-            return jsonify({
+            return JSONResponse({
                 'error': 'proof_of_work_required',
                 'message': 'Proof of Work is required for registration'
-            }), 400
+            }, status_code=400)
         
-        # PoW 검증
+        # PoW 검증 (현재 요청률 기준 난이도)
+        ip = client_ip(request)
+        record_pow_request('register', ip, pow_challenge, int(pow_nonce), pow_hash)
+        required = difficulty_controller.enforced_difficulty('register', ip)
         result = verify_proof_of_work(
             pow_challenge,
             int(pow_nonce),
             pow_hash,
-            POW_DIFFICULTY
+            required
         )
         
         # 검증 실패 처리
         if result != PowVerificationResult.VALID:
-            error_messages = {
-                PowVerificationResult.INVALID_HASH: 'Invalid Proof of Work: hash mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'Invalid Proof of Work: difficulty not met',
-                PowVerificationResult.EXPIRED: 'Invalid Proof of Work: challenge expired',
-            }
-            reason_map = {
-                PowVerificationResult.INVALID_HASH: 'hash_mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'difficulty_not_met',
-                PowVerificationResult.EXPIRED: 'expired',
-            }
-            
-            app.logger.warning(f"PoW verification failed for register: reason={result}, challenge={pow_challenge[:20]}...")
-            
-            return jsonify({
-                'error': 'invalid_proof_of_work',
-                'message': error_messages.get(result, 'Invalid Proof of Work'),
-                'reason': reason_map.get(result, 'unknown')
-            }), 400
-        
-        # ✅ PoW 검증 성공!
-        # Lemmy는 PoW 필드를 모르므로 제거
-        lemmy_data = data.copy()
-        lemmy_data.pop('pow_challenge', None)
-        lemmy_data.pop('pow_nonce', None)
-        lemmy_data.pop('pow_hash', None)
+            logger.warning(
+                f"PoW verification failed for register: reason={result}, "
+                f"challenge={pow_challenge[:20]}..., difficulty>={required}, IP={ip}"
+            )
+            return pow_failure_response(result)
         
-        # Lemmy 백엔드로 전달
-        response = requests.post(
-            f"{LEMMY_BACKEND_URL}/api/v3/user/register",
-            json=lemmy_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
+        # ✅ PoW 검증 성공! → Lemmy 백엔드로 전달
+        return await proxy_to_lemmy(
+            '/api/v3/user/register',
+            strip_pow_fields(data),
+            {'content-type': 'application/json'},
+            pow_challenge,
         )
-        
-        # Lemmy 응답 반환 (hop-by-hop 헤더 제거로 ERR_CONTENT_DECODING_FAILED 방지)
-        return response.content, response.status_code, filter_hop_by_hop_headers(response.headers)
     
-    except requests.RequestException as e:
-        app.logger.error(f"Lemmy backend request failed: {e}")
-        return jsonify({
-            'error': 'backend_error',
-            'message': 'Failed to connect to backend'
-        }), 503
+    except httpx.HTTPError as e:
+        logger.error(f"Lemmy backend request failed: {e}")
+        return JSONResponse(BACKEND_ERROR, status_code=503)
     
     except Exception as e:
-        app.logger.error(f"Unexpected error: {e}")
-        return jsonify({
-            'error': 'internal_error',
-            'message': 'Internal server error'
-        }), 500
+        logger.error(f"Unexpected error: {e}")
+        return JSONResponse(INTERNAL_ERROR, status_code=500)
 
 
-@app.route('/api/v3/post', methods=['POST'])
-def create_post_with_pow():
+@app.post('/api/v3/post')
+async def create_post_with_pow(request: Request):
     """
     PoW 검증 후 Lemmy 백엔드로 게시글 작성 요청 전달
     """
     try:
-        data = request.get_json()
+        data = await request.json()
         
         # 🛡️ 스팸 필터 검사
         spam_result = check_content_for_spam(data, 'post')
         if spam_result:
             field, matched = spam_result
-            app.logger.warning(
+            logger.warning(
                 f"SPAM BLOCKED (post): field={field}, matched={matched!r}, "
-                f"IP={request.remote_addr}"
+                f"IP={client_ip(request)}"
             )
-            return jsonify({
+            return JSONResponse({
                 'error': 'spam_detected',
                 'message': 'Your post was flagged as spam.'
-            }), 403
+            }, status_code=403)
         
         # PoW 필드 추출
         pow_challenge = data.get('pow_challenge')
@@ -401,136 +490,210 @@ def create_post_with_pow():
         
         # PoW 필드 존재 확인
         if not all([pow_challenge, pow_nonce is not None, pow_hash]):
-            return jsonify({
+            return JSONResponse({
                 'error': 'proof_of_work_required',
                 'message': 'Proof of Work is required for creating posts'
-            }), 400
+            }, status_code=400)
         
-        # PoW 검증
+        # PoW 검증 (현재 요청률 기준 난이도)
+        ip = client_ip(request)
+        record_pow_request('post', ip, pow_challenge, int(pow_nonce), pow_hash)
+        required = difficulty_controller.enforced_difficulty('post', ip)
         result = verify_proof_of_work(
             pow_challenge,
             int(pow_nonce),
             pow_hash,
-            POW_DIFFICULTY
+            required
         )
         
         # 검증 실패 처리
         if result != PowVerificationResult.VALID:
-            error_messages = {
-                PowVerificationResult.INVALID_HASH: 'Invalid Proof of Work: hash mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'Invalid Proof of Work: difficulty not met',
-                PowVerificationResult.EXPIRED: 'Invalid Proof of Work: challenge expired',
-            }
-            # reason 필드를 추가하여 클라이언트가 실패 유형을 구분할 수 있게 함
-            reason_map = {
-                PowVerificationResult.INVALID_HASH: 'hash_mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'difficulty_not_met',
-                PowVerificationResult.EXPIRED: 'expired',
-            }
-            
-            app.logger.warning(f"PoW verification failed for post: reason={result}, challenge={pow_challenge[:20]}...")
-            
-            return jsonify({
-                'error': 'invalid_proof_of_work',
-                'message': error_messages.get(result, 'Invalid Proof of Work'),
-                'reason': reason_map.get(result, 'unknown')
-            }), 400
-        
-        # ✅ PoW 검증 성공!
-        # Lemmy는 PoW 필드를 모르므로 제거
-        lemmy_data = data.copy()
-        lemmy_data.pop('pow_challenge', None)
-        lemmy_data.pop('pow_nonce', None)
-        lemmy_data.pop('pow_hash', None)
-        
-        # Lemmy 백엔드로 전달 (Accept-Encoding 제거: requests가 자동 디코딩하므로 gzip 응답 받으면 안됨)
-        forward_headers = {
-            k: v for k, v in request.headers
-            if k.lower() not in ('host', 'content-length', 'accept-encoding', 'transfer-encoding')
-        }
-        forward_headers['Content-Type'] = 'application/json'
-        response = requests.post(
-            f"{LEMMY_BACKEND_URL}/api/v3/post",
-            json=lemmy_data,
-            headers=forward_headers,
-            timeout=30
-        )
+            logger.warning(
+                f"PoW verification failed for post: reason={result}, "
+                f"challenge={pow_challenge[:20]}..., difficulty>={required}, IP={ip}"
+            )
+            return pow_failure_response(result)
         
-        # Lemmy 응답 반환 (hop-by-hop 헤더 제거로 ERR_CONTENT_DECODING_FAILED 방지)
-        return response.content, response.status_code, filter_hop_by_hop_headers(response.headers)
+        # ✅ PoW 검증 성공! → Lemmy 백엔드로 전달
+        return await proxy_to_lemmy('/api/v3/post', strip_pow_fields(data), build_forward_headers(request), pow_challenge)
     
-    except requests.RequestException as e:
-        app.logger.error(f"Lemmy backend request failed: {e}")
-        return jsonify({
-            'error': 'backend_error',
-            'message': 'Failed to connect to backend'
-        }), 503
+    except httpx.HTTPError as e:
+        logger.error(f"Lemmy backend request failed: {e}")
+        return JSONResponse(BACKEND_ERROR, status_code=503)
     
     except Exception as e:
-        app.logger.error(f"Unexpected error: {e}")
-        return jsonify({
-            'error': 'internal_error',
-            'message': 'Internal server error'
-        }), 500
+        logger.error(f"Unexpected error: {e}")
+        return JSONResponse(INTERNAL_ERROR, status_code=500)
 
 
-# 댓글 PoW 최소 난이도 (댓글은 게시글/회원가입보다 낮은 난이도)
-COMMENT_POW_DIFFICULTY = int(os.environ.get('COMMENT_POW_DIFFICULTY', '13'))
-
 # 멤버십 서비스 URL (Docker 내부)
 MEMBERSHIP_SERVICE_URL = os.environ.get('MEMBERSHIP_SERVICE_URL', 'http://bitcoincash-service:8081')
 LEMMY_API_KEY = os.environ.get('LEMMY_API_KEY', '')
 
+# 멤버십 조회 캐시 (댓글마다 Lemmy + 멤버십 서비스 2회 호출을 피하기 위함)
+MEMBERSHIP_TOKEN_CACHE_TTL = int(os.environ.get('MEMBERSHIP_TOKEN_CACHE_TTL', '300'))    # 토큰 → 유저명
+MEMBERSHIP_STATUS_CACHE_TTL = int(os.environ.get('MEMBERSHIP_STATUS_CACHE_TTL', '60'))   # 유저명 → 활성 여부
+MEMBERSHIP_NEGATIVE_CACHE_TTL = int(os.environ.get('MEMBERSHIP_NEGATIVE_CACHE_TTL', '30'))  # 실패/비회원 결과
+MEMBERSHIP_CACHE_MAX_ENTRIES = int(os.environ.get('MEMBERSHIP_CACHE_MAX_ENTRIES', '10000'))
+# 활성 멤버 목록 스냅샷 갱신 주기 (0이면 비활성)
+MEMBERSHIP_SNAPSHOT_INTERVAL = int(os.environ.get('MEMBERSHIP_SNAPSHOT_INTERVAL', '30'))
+
 
-def check_membership_from_auth(auth_header: Optional[str]) -> bool:
+class TTLCache:
     """
-    Authorization 헤더(Bearer JWT)로 Lemmy에서 유저 정보를 가져온 뒤,
-    멤버십 서비스에서 Gold Badge 여부를 확인한다.
-    멤버십이 활성화되어 있으면 True를 반환.
+    항목별 TTL을 갖는 LRU 캐시.
+    이벤트 루프 한 곳에서만 사용하므로 락이 필요 없다.
     """
-    if not auth_header:
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+# sha256(Authorization) → username (None = 로그인되지 않은 토큰)
+token_user_cache = TTLCache(MEMBERSHIP_CACHE_MAX_ENTRIES, MEMBERSHIP_TOKEN_CACHE_TTL)
+# username → is_active
+membership_status_cache = TTLCache(MEMBERSHIP_CACHE_MAX_ENTRIES, MEMBERSHIP_STATUS_CACHE_TTL)
+
+# 멤버십 서비스의 활성 멤버 목록 스냅샷 (주기적으로 통째로 갱신)
+active_members_snapshot = {'names': frozenset(), 'refreshed_at': 0.0, 'errors': 0}
+
+
+def snapshot_is_fresh() -> bool:
+    if MEMBERSHIP_SNAPSHOT_INTERVAL <= 0:
         return False
+    return time.monotonic() - active_members_snapshot['refreshed_at'] < MEMBERSHIP_SNAPSHOT_INTERVAL * 3
+
 
+async def refresh_active_members_snapshot() -> bool:
+    """활성 멤버 유저명 목록을 멤버십 서비스에서 한 번에 받아옴"""
     try:
-        # 1) Lemmy API로 현재 유저 정보 조회
-        resp = requests.get(
-            f"{LEMMY_BACKEND_URL}/api/v3/site",
-            headers={"Authorization": auth_header},
-            timeout=5,
+        resp = await http_client.get(
+            f"{MEMBERSHIP_SERVICE_URL}/api/membership/active-users",
+            timeout=MEMBERSHIP_CHECK_TIMEOUT,
         )
-        if resp.status_code != 200:
-            return False
+        data = resp.json()
+        if resp.status_code != 200 or not data.get('success'):
+            raise ValueError(f"status={resp.status_code}")
+        active_members_snapshot['names'] = frozenset(u['name'] for u in data.get('active_users', []))
+        active_members_snapshot['refreshed_at'] = time.monotonic()
+        return True
+    except Exception as e:
+        active_members_snapshot['errors'] += 1
+        logger.warning(f"Active membership snapshot refresh failed: {e}")
+        return False
 
-        site_data = resp.json()
-        my_user = site_data.get("my_user")
-        if not my_user:
-            return False
 
-        username = my_user["local_user_view"]["person"]["name"]
+async def active_members_snapshot_loop():
+    while True:
+        await refresh_active_members_snapshot()
+        await asyncio.sleep(MEMBERSHIP_SNAPSHOT_INTERVAL)
 
-        # 2) 멤버십 서비스에서 활성 여부 확인
-        mem_resp = requests.get(
-            f"{MEMBERSHIP_SERVICE_URL}/api/membership/status/{username}",
-            headers={"X-API-Key": LEMMY_API_KEY},
-            timeout=5,
-        )
-        if mem_resp.status_code != 200:
-            return False
 
-        mem_data = mem_resp.json()
-        is_active = mem_data.get("membership", {}).get("is_active", False)
+async def lookup_username(auth_header: str) -> Optional[str]:
+    """Bearer 토큰의 유저명 (토큰 해시 기준 캐시)"""
+    token_key = hashlib.sha256(auth_header.encode()).hexdigest()
+    cached = token_user_cache.get(token_key)
+    if cached is not TTLCache._MISSING:
+        return cached
+
+    resp = await http_client.get(
+        f"{LEMMY_BACKEND_URL}/api/v3/site",
+        headers={"Authorization": auth_header},
+        timeout=MEMBERSHIP_CHECK_TIMEOUT,
+    )
+    if resp.status_code >= 500:
+        return None  # 일시 장애는 캐시하지 않음
+
+    my_user = resp.json().get("my_user") if resp.status_code == 200 else None
+    if not my_user:
+        token_user_cache.set(token_key, None, MEMBERSHIP_NEGATIVE_CACHE_TTL)
+        return None
+
+    username = my_user["local_user_view"]["person"]["name"]
+    token_user_cache.set(token_key, username)
+    return username
+
 
+async def lookup_membership_active(username: str) -> bool:
+    """유저명의 멤버십 활성 여부 (스냅샷 → 캐시 → 멤버십 서비스 순)"""
+    if snapshot_is_fresh() and username in active_members_snapshot['names']:
+        return True
+
+    cached = membership_status_cache.get(username)
+    if cached is not TTLCache._MISSING:
+        return cached
+
+    # 스냅샷에 없는 유저 (방금 결제한 신규 멤버일 수 있음) → 직접 조회
+    mem_resp = await http_client.get(
+        f"{MEMBERSHIP_SERVICE_URL}/api/membership/status/{username}",
+        headers={"X-API-Key": LEMMY_API_KEY},
+        timeout=MEMBERSHIP_CHECK_TIMEOUT,
+    )
+    if mem_resp.status_code != 200:
+        return False  # 장애는 캐시하지 않음
+
+    is_active = bool(mem_resp.json().get("membership", {}).get("is_active", False))
+    membership_status_cache.set(
+        username, is_active, None if is_active else MEMBERSHIP_NEGATIVE_CACHE_TTL
+    )
+    return is_active
+
+
+async def check_membership_from_auth(auth_header: Optional[str]) -> bool:
+    """
+    Authorization 헤더(Bearer JWT)로 Lemmy에서 유저 정보를 가져온 뒤,
+    멤버십 서비스에서 Gold Badge 여부를 확인한다.
+    멤버십이 활성화되어 있으면 True를 반환.
+
+    토큰 → 유저명, 유저명 → 활성 여부는 TTL 캐시로, 활성 멤버 목록은 주기 스냅샷으로
+    처리하므로 캐시가 따뜻하면 네트워크 호출 없이 끝난다.
+    """
+    if not auth_header:
+        return False
+
+    try:
+        username = await lookup_username(auth_header)
+        if not username:
+            return False
+
+        is_active = await lookup_membership_active(username)
         if is_active:
-            app.logger.info(f"Membership ACTIVE for user={username} — comment PoW exempted")
+            logger.info(f"Membership ACTIVE for user={username} — comment PoW exempted")
         return is_active
 
     except Exception as e:
-        app.logger.error(f"Membership check failed: {e}")
+        logger.error(f"Membership check failed: {e}")
         return False
 
 
-@app.route('/api/v3/comment', methods=['POST'])
-def create_comment_with_pow():
+@app.post('/api/v3/comment')
+async def create_comment_with_pow(request: Request):
     """
     PoW 검증 후 Lemmy 백엔드로 댓글 작성 요청 전달
     
@@ -540,20 +703,20 @@ def create_comment_with_pow():
     내부 서비스(content-importer 등)는 Docker 내부에서 Lemmy로 직접 연결하므로 영향 없음.
     """
     try:
-        data = request.get_json()
+        data = await request.json()
         
         # 🛡️ 스팸 필터 검사 (PoW 전에 먼저!)
         spam_result = check_content_for_spam(data, 'comment')
         if spam_result:
             field, matched = spam_result
-            app.logger.warning(
+            logger.warning(
                 f"SPAM BLOCKED (comment): field={field}, matched={matched!r}, "
-                f"IP={request.remote_addr}"
+                f"IP={client_ip(request)}"
             )
-            return jsonify({
+            return JSONResponse({
                 'error': 'spam_detected',
                 'message': 'Your comment was flagged as spam.'
-            }), 403
+            }, status_code=403)
         
         # PoW 필드 추출
         pow_challenge = data.get('pow_challenge')
@@ -564,137 +727,94 @@ def create_comment_with_pow():
         if not all([pow_challenge, pow_nonce is not None, pow_hash]):
             # 멤버십 유저인지 확인 (Authorization 헤더로 판별)
             auth_header = request.headers.get('Authorization')
-            if check_membership_from_auth(auth_header):
+            if await check_membership_from_auth(auth_header):
                 # ✅ 멤버십 유저 — PoW 면제, 바로 Lemmy로 전달
-                app.logger.info(
-                    f"Comment PoW EXEMPTED (membership): IP={request.remote_addr}"
-                )
-                lemmy_data = data.copy()
-                lemmy_data.pop('pow_challenge', None)
-                lemmy_data.pop('pow_nonce', None)
-                lemmy_data.pop('pow_hash', None)
-
-                forward_headers = {
-                    k: v for k, v in request.headers
-                    if k.lower() not in ('host', 'content-length', 'accept-encoding', 'transfer-encoding')
-                }
-                forward_headers['Content-Type'] = 'application/json'
-                response = requests.post(
-                    f"{LEMMY_BACKEND_URL}/api/v3/comment",
-                    json=lemmy_data,
-                    headers=forward_headers,
-                    timeout=30,
+                logger.info(
+                    f"Comment PoW EXEMPTED (membership): IP={client_ip(request)}"
                 )
-                return response.content, response.status_code, filter_hop_by_hop_headers(response.headers)
+                return await proxy_to_lemmy('/api/v3/comment', strip_pow_fields(data), build_forward_headers(request))
 
-            app.logger.warning(
-                f"Comment REJECTED: missing PoW fields from IP={request.remote_addr}"
+            logger.warning(
+                f"Comment REJECTED: missing PoW fields from IP={client_ip(request)}"
             )
-            return jsonify({
+            return JSONResponse({
                 'error': 'proof_of_work_required',
                 'message': 'Proof of Work is required for comment creation',
-            }), 403
+            }, status_code=403)
         
-        # PoW 검증 (댓글용 낮은 난이도)
+        # PoW 검증 (댓글용 낮은 난이도, 현재 요청률 기준)
+        ip = client_ip(request)
+        record_pow_request('comment', ip, pow_challenge, int(pow_nonce), pow_hash)
+        required = difficulty_controller.enforced_difficulty('comment', ip)
         result = verify_proof_of_work(
             pow_challenge,
             int(pow_nonce),
             pow_hash,
-            COMMENT_POW_DIFFICULTY
+            required
         )
         
         # 검증 실패 처리
         if result != PowVerificationResult.VALID:
-            error_messages = {
-                PowVerificationResult.INVALID_HASH: 'Invalid Proof of Work: hash mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'Invalid Proof of Work: difficulty not met',
-                PowVerificationResult.EXPIRED: 'Invalid Proof of Work: challenge expired',
-            }
-            reason_map = {
-                PowVerificationResult.INVALID_HASH: 'hash_mismatch',
-                PowVerificationResult.INVALID_DIFFICULTY: 'difficulty_not_met',
-                PowVerificationResult.EXPIRED: 'expired',
-            }
-            
-            app.logger.warning(
+            logger.warning(
                 f"Comment PoW verification failed: reason={result}, "
-                f"challenge={pow_challenge[:20]}..., IP={request.remote_addr}"
+                f"challenge={pow_challenge[:20]}..., difficulty>={required}, IP={ip}"
             )
-            
-            return jsonify({
-                'error': 'invalid_proof_of_work',
-                'message': error_messages.get(result, 'Invalid Proof of Work'),
-                'reason': reason_map.get(result, 'unknown')
-            }), 400
+            return pow_failure_response(result)
         
         # ✅ PoW 검증 성공!
-        app.logger.info(
-            f"Comment PoW verified: IP={request.remote_addr}, "
-            f"nonce={pow_nonce}, difficulty>={COMMENT_POW_DIFFICULTY}"
+        logger.info(
+            f"Comment PoW verified: IP={ip}, "
+            f"nonce={pow_nonce}, difficulty>={required}"
         )
         
-        # Lemmy는 PoW 필드를 모르므로 제거
-        lemmy_data = data.copy()
-        lemmy_data.pop('pow_challenge', None)
-        lemmy_data.pop('pow_nonce', None)
-        lemmy_data.pop('pow_hash', None)
-        
         # Lemmy 백엔드로 전달
-        forward_headers = {
-            k: v for k, v in request.headers
-            if k.lower() not in ('host', 'content-length', 'accept-encoding', 'transfer-encoding')
-        }
-        forward_headers['Content-Type'] = 'application/json'
-        response = requests.post(
-            f"{LEMMY_BACKEND_URL}/api/v3/comment",
-            json=lemmy_data,
-            headers=forward_headers,
-            timeout=30
-        )
-        
-        return response.content, response.status_code, filter_hop_by_hop_headers(response.headers)
+        return await proxy_to_lemmy('/api/v3/comment', strip_pow_fields(data), build_forward_headers(request), pow_challenge)
     
-    except requests.RequestException as e:
-        app.logger.error(f"Lemmy backend request failed (comment): {e}")
-        return jsonify({
-            'error': 'backend_error',
-            'message': 'Failed to connect to backend'
-        }), 503
+    except httpx.HTTPError as e:
+        logger.error(f"Lemmy backend request failed (comment): {e}")
+        return JSONResponse(BACKEND_ERROR, status_code=503)
     
     except Exception as e:
-        app.logger.error(f"Unexpected error (comment): {e}")
-        return jsonify({
-            'error': 'internal_error',
-            'message': 'Internal server error'
-        }), 500
+        logger.error(f"Unexpected error (comment): {e}")
+        return JSONResponse(INTERNAL_ERROR, status_code=500)
 
 
-@app.route('/api/pow/challenge', methods=['GET'])
-def get_pow_challenge():
+@app.get('/api/pow/challenge')
+async def get_pow_challenge(request: Request, endpoint: str = 'post'):
     """
     PoW 챌린지 생성 (선택사항)
     프론트엔드에서 생성해도 되지만, 서버에서 제공할 수도 있음
+    서버 발급 챌린지는 HMAC 서명이 붙어 있어 저장 없이 위조 여부를 확인할 수 있음
+    
+    difficulty는 endpoint(register/post/comment)와 요청 IP 대역의 현재 요청률 기준 요구 난이도
     """
-    import random
-    import string
+    if endpoint not in difficulty_controller.base_difficulty:
+        return JSONResponse({
+            'error': 'invalid_endpoint',
+            'message': f"endpoint must be one of {sorted(difficulty_controller.base_difficulty)}"
+        }, status_code=400)
+    
+    import secrets
     
     timestamp = int(time.time() * 1000)
-    random_str = ''.join(random.choices(string.ascii_lowercase + string.digits, k=10))
-    challenge = f"{timestamp}-{random_str}"
+    random_str = secrets.token_hex(5)
+    payload = f"{timestamp}-{random_str}"
+    challenge = f"{payload}-{challenge_signature(payload)}"
     
-    return jsonify({
+    return {
         'challenge': challenge,
-        'difficulty': POW_DIFFICULTY,
+        'endpoint': endpoint,
+        'difficulty': difficulty_controller.required_difficulty(endpoint, client_ip(request)),
         'max_age_seconds': POW_MAX_AGE_SECONDS
-    })
+    }
 
 
-@app.route('/api/pow/verify', methods=['POST'])
-def verify_pow_endpoint():
+@app.post('/api/pow/verify')
+async def verify_pow_endpoint(request: Request):
     """
     PoW 검증 테스트용 엔드포인트
     """
-    data = request.get_json()
+    data = await request.json()
     
     result = verify_proof_of_work(
         data.get('challenge'),
@@ -703,29 +823,39 @@ def verify_pow_endpoint():
         data.get('difficulty', POW_DIFFICULTY)
     )
     
-    return jsonify({
+    return {
         'valid': result == PowVerificationResult.VALID,
         'result': result
-    })
+    }
 
 
-@app.route('/health', methods=['GET'])
-def health_check():
+@app.get('/health')
+async def health_check():
     """헬스 체크"""
-    return jsonify({
+    return {
         'status': 'healthy',
         'service': 'pow-validator',
         'difficulty': POW_DIFFICULTY,
         'comment_difficulty': COMMENT_POW_DIFFICULTY,
+        'adaptive_difficulty': difficulty_controller.status(),
         'spam_filter': {
             'enabled': True,
-            'pattern_count': len(SPAM_COMPILED_PATTERNS)
+            'pattern_count': SPAM_MATCHER.pattern_count,
+            'stats': SPAM_MATCHER.stats,
+        },
+        'pow_ledger': pow_ledger.status(),
+        'membership_cache': {
+            'tokens': token_user_cache.stats(),
+            'status': membership_status_cache.stats(),
+            'snapshot_members': len(active_members_snapshot['names']),
+            'snapshot_fresh': snapshot_is_fresh(),
+            'snapshot_errors': active_members_snapshot['errors'],
         }
-    })
+    }
 
 
-@app.route('/api/spam/test', methods=['POST'])
-def test_spam_filter():
+@app.post('/api/spam/test')
+async def test_spam_filter(request: Request):
     """
     스팸 필터 테스트 엔드포인트 (관리자용)
     
@@ -736,31 +866,33 @@ def test_spam_filter():
     응답 예시:
       {"is_spam": true, "matched": "make about $8,000...a month online", "cleaned_text": "..."}
     """
-    data = request.get_json()
+    data = await request.json()
     text = data.get('text', '')
     
     cleaned = strip_invisible_chars(text)
-    is_spam, matched = check_spam(text)
+    found = SPAM_MATCHER.search(cleaned) if text else None
     
-    return jsonify({
-        'is_spam': is_spam,
-        'matched': matched,
+    return {
+        'is_spam': found is not None,
+        'matched': found[0] if found else None,
+        'matched_group': found[1] if found else None,
         'original_length': len(text),
         'cleaned_length': len(cleaned),
         'invisible_chars_removed': len(text) - len(cleaned),
         'cleaned_text': cleaned[:500]  # 미리보기 (최대 500자)
-    })
+    }
 
 
-@app.route('/api/spam/patterns', methods=['GET'])
-def list_spam_patterns():
+@app.get('/api/spam/patterns')
+async def list_spam_patterns():
     """현재 등록된 스팸 패턴 목록 (관리자용)"""
-    return jsonify({
+    return {
         'pattern_count': len(SPAM_KEYWORD_PATTERNS),
         'patterns': SPAM_KEYWORD_PATTERNS
-    })
+    }
 
 
 if __name__ == '__main__':
     # 개발용
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    import uvicorn
+    uvicorn.run('app:app', host='0.0.0.0', port=5001, reload=True)
@@ -0,0 +1,140 @@
+"""
+스팸 필터 벤치마크
+기존 방식(패턴별 순차 re.search + 문자 단위 Cf 제거)과 현재 spam_filter 엔진을
+같은 본문 코퍼스로 비교하고, 두 엔진의 판정이 다른 본문을 출력한다.
+코퍼스 뒤에 백트래킹 유도용 본문(ADVERSARIAL_TEXTS)을 붙여 최악의 경우도 함께 측정한다.
+
+사용법:
+    # 파일 코퍼스 (한 줄에 하나: 일반 텍스트 또는 {"name": ..., "body": ...} JSON)
+    python bench_spam_filter.py corpus.jsonl
+
+    # 운영 Lemmy에서 최근 게시글/댓글 본문을 받아서 사용
+    python bench_spam_filter.py --lemmy https://oratio.space --pages 20
+
+    # 반복 횟수 지정
+    python bench_spam_filter.py corpus.jsonl --repeat 5
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from typing import List
+
+from spam_filter import SPAM_KEYWORD_PATTERNS, SPAM_MATCHER, check_spam
+
+# 정규식 백트래킹을 유도하는 긴 본문 (시간 예산 초과 시에도 스팸이 통과하면 안 됨)
+ADVERSARIAL_TEXTS = [
+    # 스팸 도메인이 끝에 있음 → 트라이 검사로 잡혀야 함
+    ("i make $1 " * 3000) + " visit payathome.com",
+    # 도메인 없음 → 예산 초과 시 검사 미완료(차단)로 판정돼야 함
+    ("i make $1 " * 3000) + " a month",
+]
+
+
+def load_corpus_file(path: str) -> List[str]:
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                texts.append(line)
+                continue
+            if isinstance(item, dict):
+                texts.extend(v for k, v in item.items() if k in ('name', 'body', 'content', 'url') and isinstance(v, str))
+            elif isinstance(item, str):
+                texts.append(item)
+    return texts
+
+
+def load_corpus_lemmy(base_url: str, pages: int) -> List[str]:
+    import httpx
+
+    texts = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        for page in range(1, pages + 1):
+            posts = client.get('/api/v3/post/list', params={'sort': 'New', 'limit': 50, 'page': page}).json()
+            for view in posts.get('posts', []):
+                texts.extend(v for v in (view['post'].get('name'), view['post'].get('body')) if v)
+            comments = client.get('/api/v3/comment/list', params={'sort': 'New', 'limit': 50, 'page': page}).json()
+            texts.extend(view['comment']['content'] for view in comments.get('comments', []))
+    return texts
+
+
+def legacy_check(compiled, text: str):
+    cleaned = ''.join(ch for ch in text if unicodedata.category(ch) != 'Cf')
+    for pattern in compiled:
+        match = pattern.search(cleaned)
+        if match:
+            return match.group(0)
+    return None
+
+
+def current_check(text: str):
+    is_spam, matched = check_spam(text)
+    return matched if is_spam else None
+
+
+def run(name: str, fn, texts: List[str], repeat: int) -> List[float]:
+    per_text = []
+    for text in texts:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn(text)
+        per_text.append((time.perf_counter() - started) * 1e6 / repeat)
+    total_ms = sum(per_text) / 1000
+    quantiles = statistics.quantiles(per_text, n=100) if len(per_text) > 1 else per_text * 99
+    print(f"{name:>8}: total {total_ms:9.2f} ms | mean {statistics.mean(per_text):8.1f} µs | "
+          f"p50 {quantiles[49]:8.1f} µs | p99 {quantiles[98]:8.1f} µs | max {max(per_text):8.1f} µs")
+    return per_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', help='코퍼스 파일 (텍스트 또는 JSON lines)')
+    parser.add_argument('--lemmy', help='코퍼스를 가져올 Lemmy 인스턴스 URL')
+    parser.add_argument('--pages', type=int, default=10, help='--lemmy 사용 시 가져올 페이지 수 (페이지당 50개)')
+    parser.add_argument('--repeat', type=int, default=3, help='본문당 반복 횟수')
+    args = parser.parse_args()
+
+    if args.corpus:
+        texts = load_corpus_file(args.corpus)
+    elif args.lemmy:
+        texts = load_corpus_lemmy(args.lemmy, args.pages)
+    else:
+        parser.error('corpus 파일 또는 --lemmy URL이 필요합니다')
+
+    if not texts:
+        sys.exit('코퍼스가 비어 있습니다')
+    texts.extend(ADVERSARIAL_TEXTS)
+
+    total_chars = sum(len(t) for t in texts)
+    print(f"코퍼스: {len(texts)}개 본문, {total_chars:,}자 (평균 {total_chars // len(texts)}자), "
+          f"패턴 {len(SPAM_KEYWORD_PATTERNS)}개\n")
+
+    compiled = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in SPAM_KEYWORD_PATTERNS]
+    run('legacy', lambda t: legacy_check(compiled, t), texts, args.repeat)
+    run('current', current_check, texts, args.repeat)
+
+    mismatches = [(t, legacy_check(compiled, t), current_check(t)) for t in texts]
+    mismatches = [m for m in mismatches if (m[1] is None) != (m[2] is None)]
+    print(f"\n판정 불일치: {len(mismatches)}건")
+    for text, legacy, current in mismatches[:20]:
+        print(f"  legacy={legacy!r} current={current!r} text={text[:80]!r}")
+    print("\n백트래킹 유도 본문:")
+    for text in ADVERSARIAL_TEXTS:
+        started = time.perf_counter()
+        verdict = check_spam(text)
+        print(f"  {len(text):,}자 → {verdict} ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    print(f"엔진 통계: {SPAM_MATCHER.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Adaptive PoW Difficulty
+엔드포인트별 / IP 대역별 요청률을 슬라이딩 윈도우로 추적해서 요구 난이도를 올리고 내린다.
+
+요청률이 기준치의 2배가 될 때마다 1비트씩(= 요청당 작업량 2배) 올라가므로,
+봇 웨이브가 몰리면 요청당 비용이 자동으로 커지고 트래픽이 잦아들면 다시 기본값으로 돌아온다.
+
+- IP 대역: IPv4 /24, IPv6 /48 (같은 대역에서 주소만 바꿔가며 보내는 봇 대응)
+- 엔드포인트 전체 요청률은 기본 난이도를 만족하는 해시를 낸 요청만 센다
+  (공짜로 보낼 수 있는 가짜 해시로 모든 사용자의 난이도를 올리지 못하게).
+  IP 대역 요청률은 모든 요청을 세므로 가짜 해시를 보낸 대역만 불이익을 받음
+- 카운터는 워커 프로세스별 메모리에 있음 → 기준치는 워커 1개 기준 (gunicorn 워커 수로 나눠 설정)
+"""
+
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+POW_ADAPTIVE_ENABLED = os.environ.get('POW_ADAPTIVE_ENABLED', 'true').lower() == 'true'
+POW_RATE_WINDOW_SECONDS = int(os.environ.get('POW_RATE_WINDOW_SECONDS', '60'))
+POW_RATE_BUCKET_SECONDS = int(os.environ.get('POW_RATE_BUCKET_SECONDS', '5'))
+# 추가 난이도 상한 (기본 난이도 + 최대 N비트)
+POW_MAX_EXTRA_BITS = int(os.environ.get('POW_MAX_EXTRA_BITS', '4'))
+# 요구 난이도가 오르는 중에 이미 계산을 시작한 정상 클라이언트를 위해 검증 시 허용하는 여유 비트
+POW_DIFFICULTY_GRACE_BITS = int(os.environ.get('POW_DIFFICULTY_GRACE_BITS', '1'))
+# 이 요청률(분당, 워커당)을 넘으면 난이도 상승 시작
+POW_ENDPOINT_RATE_BASELINE = {
+    'register': float(os.environ.get('POW_REGISTER_RATE_BASELINE', '5')),
+    'post': float(os.environ.get('POW_POST_RATE_BASELINE', '10')),
+    'comment': float(os.environ.get('POW_COMMENT_RATE_BASELINE', '30')),
+}
+POW_IP_RATE_BASELINE = float(os.environ.get('POW_IP_RATE_BASELINE', '6'))
+POW_MAX_TRACKED_PREFIXES = int(os.environ.get('POW_MAX_TRACKED_PREFIXES', '10000'))
+
+
+class SlidingWindowCounter:
+    """버킷 단위 슬라이딩 윈도우 카운터 (분당 요청 수)"""
+
+    __slots__ = ('buckets',)
+
+    def __init__(self):
+        self.buckets = deque()  # [bucket_start, count]
+
+    def _expire(self, now: float):
+        horizon = now - POW_RATE_WINDOW_SECONDS
+        while self.buckets and self.buckets[0][0] <= horizon:
+            self.buckets.popleft()
+
+    def hit(self, now: float):
+        bucket = now - (now % POW_RATE_BUCKET_SECONDS)
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([bucket, 1])
+        self._expire(now)
+
+    def per_minute(self, now: float) -> float:
+        self._expire(now)
+        return sum(count for _, count in self.buckets) * 60 / POW_RATE_WINDOW_SECONDS
+
+
+def extra_bits(rate: float, baseline: float) -> int:
+    """기준치 이하 0비트, 이후 요청률이 2배 될 때마다 +1비트"""
+    if baseline <= 0 or rate <= baseline:
+        return 0
+    return min(POW_MAX_EXTRA_BITS, int(math.log2(rate / baseline)) + 1)
+
+
+def ip_prefix(ip: str) -> str:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    prefix = 24 if addr.version == 4 else 48
+    return str(ipaddress.ip_network(f"{addr}/{prefix}", strict=False))
+
+
+class DifficultyController:
+    def __init__(self, base_difficulty: Dict[str, int]):
+        self.base_difficulty = dict(base_difficulty)
+        self._endpoints = {name: SlidingWindowCounter() for name in self.base_difficulty}
+        self._prefixes: "OrderedDict[str, SlidingWindowCounter]" = OrderedDict()
+
+    def record(self, endpoint: str, ip: str, proof_ok: bool):
+        """PoW가 필요한 요청 1건 기록
+
+        IP 대역 카운터는 항상, 엔드포인트 카운터는 proof_ok(해시가 맞고 기본 난이도 이상)일 때만 증가
+        """
+        now = time.monotonic()
+        if proof_ok:
+            self._endpoints[endpoint].hit(now)
+        prefix = ip_prefix(ip)
+        counter = self._prefixes.get(prefix)
+        if counter is None:
+            counter = self._prefixes[prefix] = SlidingWindowCounter()
+            while len(self._prefixes) > POW_MAX_TRACKED_PREFIXES:
+                self._prefixes.popitem(last=False)
+        else:
+            self._prefixes.move_to_end(prefix)
+        counter.hit(now)
+
+    def required_difficulty(self, endpoint: str, ip: Optional[str] = None) -> int:
+        """클라이언트에게 요구하는 현재 난이도"""
+        base = self.base_difficulty[endpoint]
+        if not POW_ADAPTIVE_ENABLED:
+            return base
+        now = time.monotonic()
+        bits = extra_bits(self._endpoints[endpoint].per_minute(now), POW_ENDPOINT_RATE_BASELINE[endpoint])
+        if ip is not None:
+            counter = self._prefixes.get(ip_prefix(ip))
+            if counter is not None:
+                bits += extra_bits(counter.per_minute(now), POW_IP_RATE_BASELINE)
+        return base + min(POW_MAX_EXTRA_BITS, bits)
+
+    def enforced_difficulty(self, endpoint: str, ip: Optional[str] = None) -> int:
+        """검증 시 최소 난이도 (요구 난이도 - 여유 비트, 기본 난이도 이상)"""
+        base = self.base_difficulty[endpoint]
+        return max(base, self.required_difficulty(endpoint, ip) - POW_DIFFICULTY_GRACE_BITS)
+
+    def status(self) -> Dict[str, Any]:
+        """/health용: 엔드포인트별 요청률과 난이도, 가장 활발한 IP 대역"""
+        now = time.monotonic()
+        endpoints = {}
+        for name, counter in self._endpoints.items():
+            rate = counter.per_minute(now)
+            endpoints[name] = {
+                'rate_per_min': round(rate, 1),
+                'baseline_per_min': POW_ENDPOINT_RATE_BASELINE[name],
+                'base_difficulty': self.base_difficulty[name],
+                'difficulty': self.required_difficulty(name),
+            }
+        busiest = sorted(
+            ((prefix, counter.per_minute(now)) for prefix, counter in self._prefixes.items()),
+            key=lambda item: item[1], reverse=True
+        )[:5]
+        return {
+            'enabled': POW_ADAPTIVE_ENABLED,
+            'window_seconds': POW_RATE_WINDOW_SECONDS,
+            'max_extra_bits': POW_MAX_EXTRA_BITS,
+            'endpoints': endpoints,
+            'tracked_prefixes': len(self._prefixes),
+            'busiest_prefixes': [
+                {'prefix': prefix, 'rate_per_min': round(rate, 1),
+                 'extra_bits': extra_bits(rate, POW_IP_RATE_BASELINE)}
+                for prefix, rate in busiest if rate > 0
+            ],
+        }
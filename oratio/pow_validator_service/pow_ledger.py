@@ -0,0 +1,123 @@
+"""
+PoW Solution Ledger
+이미 사용된 PoW 챌린지를 기록해서 같은 풀이를 재사용(리플레이)하지 못하게 한다.
+
+- gunicorn 워커들이 공유하도록 SQLite(WAL) 파일 하나에 저장
+- 각 항목은 챌린지 유효 시간(POW_MAX_AGE_SECONDS)이 지나면 어차피 만료로 거부되므로
+  그 이후에는 삭제 → 최근 유효 시간 동안의 트래픽 분량만 보관 (메모리/디스크 사용량 제한)
+- 예약(reserve) 후 Lemmy 요청이 실패하면 해제(release)해서 사용자가 같은 풀이로 재시도 가능
+- 챌린지 서명 키가 설정되지 않았을 때 워커들이 같은 키를 쓰도록 생성한 키도 보관 (shared_secret)
+"""
+
+import logging
+import os
+import secrets
+import sqlite3
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger('pow_validator.ledger')
+
+POW_LEDGER_PATH = os.environ.get('POW_LEDGER_PATH', '/tmp/pow_ledger.db')
+POW_LEDGER_PURGE_INTERVAL = int(os.environ.get('POW_LEDGER_PURGE_INTERVAL', '60'))
+
+
+class PowLedger:
+    def __init__(self, path: str = POW_LEDGER_PATH):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._last_purge = 0.0
+        self.stats = {'reserved': 0, 'replays': 0, 'released': 0, 'purged': 0, 'errors': 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        # fork 이후 부모 프로세스의 연결을 재사용하지 않음
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS used_challenges (
+                    challenge TEXT PRIMARY KEY,
+                    expires_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_used_challenges_expires ON used_challenges(expires_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS secrets (
+                    name TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def reserve(self, challenge: str, expires_at: int) -> bool:
+        """
+        챌린지를 사용 처리. 이미 사용된 챌린지면 False (리플레이).
+
+        ledger 자체에 문제가 있으면 True를 반환 (PoW 검증은 이미 통과했으므로 서비스 중단보다는 통과 처리)
+        """
+        try:
+            conn = self._connection()
+            self._maybe_purge(conn)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO used_challenges (challenge, expires_at) VALUES (?, ?)",
+                (challenge, expires_at)
+            )
+            if cursor.rowcount == 0:
+                self.stats['replays'] += 1
+                return False
+            self.stats['reserved'] += 1
+            return True
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.error(f"PoW ledger reserve failed: {e}")
+            return True
+
+    def release(self, challenge: str):
+        """예약 취소 (Lemmy가 요청을 처리하지 못했을 때)"""
+        try:
+            self._connection().execute("DELETE FROM used_challenges WHERE challenge = ?", (challenge,))
+            self.stats['released'] += 1
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.error(f"PoW ledger release failed: {e}")
+
+    def shared_secret(self, name: str) -> str:
+        """
+        워커 간 공유되는 무작위 키. 처음 요청한 워커가 생성하고 나머지는 같은 값을 읽는다.
+
+        ledger 파일이 남아 있는 동안은 재시작해도 같은 키 유지.
+        ledger를 쓸 수 없으면 이 프로세스에서만 쓰는 키를 반환 (다른 워커가 발급한 챌린지는 서명 불일치)
+        """
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR IGNORE INTO secrets (name, value) VALUES (?, ?)",
+                (name, secrets.token_hex(32))
+            )
+            return conn.execute("SELECT value FROM secrets WHERE name = ?", (name,)).fetchone()[0]
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logger.error(f"PoW ledger shared secret failed, using a per-process secret: {e}")
+            return secrets.token_hex(32)
+
+    def _maybe_purge(self, conn: sqlite3.Connection):
+        now = time.time()
+        if now - self._last_purge < POW_LEDGER_PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cursor = conn.execute("DELETE FROM used_challenges WHERE expires_at < ?", (int(now),))
+        self.stats['purged'] += max(cursor.rowcount, 0)
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            size = self._connection().execute("SELECT COUNT(*) FROM used_challenges").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {'entries': size, **self.stats}
+
+
+pow_ledger = PowLedger()
@@ -0,0 +1,307 @@
+"""
+Spam Filter Engine
+스팸 키워드 매칭 엔진 (pow_validator app.py와 벤치마크 스크립트에서 공용)
+
+봇이 "P­a­y­A­t­H­o­m­e" 처럼 글자 사이에 보이지 않는 문자를
+끼워넣어 필터를 우회하므로, 먼저 숨겨진 문자를 벗겨낸 뒤 검사한다.
+
+패턴 수 × 본문 길이만큼 정규식을 반복 실행하지 않도록:
+  - 보이지 않는 문자는 미리 만든 str.translate 테이블로 한 번에 제거
+  - `<단어>\\d*\\.com` 형태의 도메인 패턴과 순수 문자열 패턴은 트라이 정규식으로 합침
+  - 나머지 정규식은 이름 붙은 그룹의 단일 alternation으로 합쳐 한 번만 스캔
+  - 트라이(도메인/문자열)는 백트래킹이 없으므로 길이 상한까지 전체를 한 번에 검사
+  - 백트래킹 가능한 정규식만 윈도우 단위 스캔 + 시간 예산으로 최악의 경우를 제한,
+    예산을 넘기면 "검사 미완료"(SCAN_INCOMPLETE)로 보고 → 스팸으로 간주해 차단
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('pow_validator.spam')
+
+# 필드당 검사할 최대 문자 수 (그 이후는 검사하지 않음)
+SPAM_MAX_FIELD_CHARS = int(os.environ.get('SPAM_MAX_FIELD_CHARS', '50000'))
+# 윈도우 단위 스캔: 한 번에 검사하는 길이와 윈도우 사이 겹침 (겹침보다 긴 문구는 윈도우 경계에서 놓칠 수 있음)
+SPAM_SCAN_WINDOW = int(os.environ.get('SPAM_SCAN_WINDOW', '8192'))
+SPAM_SCAN_OVERLAP = int(os.environ.get('SPAM_SCAN_OVERLAP', '512'))
+# 필드 하나의 정규식 윈도우 스캔에 쓸 수 있는 시간 (초과 시 검사 미완료 → 차단)
+SPAM_SCAN_BUDGET_MS = float(os.environ.get('SPAM_SCAN_BUDGET_MS', '50'))
+
+# 시간 예산 초과로 끝까지 검사하지 못했을 때 search()가 돌려주는 그룹 이름
+SCAN_INCOMPLETE = 'scan_incomplete'
+
+
+# ============================================================
+# 스팸 패턴
+# ============================================================
+
+SPAM_KEYWORD_PATTERNS: List[str] = [
+    # --- 돈벌기 스캠 사이트 ---
+    r'payathome\d*\.com',
+    r'workathome\d*\.com',
+    r'earnathome\d*\.com',
+    r'makemoneyathome\d*\.com',
+    r'jobathome\d*\.com',
+    r'homejobs?\d*\.com',
+    r'easymoney\d*\.com',
+    r'smartjob\d*\.com',
+    r'dollartree\d*\.com',      # 스캠에서 자주 사용되는 도메인
+    # --- 돈벌기 스캠 문구 패턴 ---
+    r'i\s*(basically\s*)?make\s*(about\s*)?\$\d[\d,]*.*?a\s*month\s*online',
+    r'enough\s*to\s*(comfortably\s*)?replace\s*my\s*(old\s*)?jobs?\s*income',
+    # ❌ 제거됨: 'only work N hours a week from home' → 정상 재택근무 글에 오탐
+    # ❌ 제거됨: 'amazed how easy it was' → 일상 표현이라 오탐 위험 높음
+    r'you\s*can\s*check\s*more\s*[.=>\-]+',
+]
+
+# 환경변수로 추가 패턴 로드 (docker-compose.yml에서 설정 가능)
+_extra_patterns = os.environ.get('SPAM_EXTRA_PATTERNS', '')
+if _extra_patterns:
+    try:
+        SPAM_KEYWORD_PATTERNS.extend(json.loads(_extra_patterns))
+        logger.info(f"Loaded {len(json.loads(_extra_patterns))} extra spam patterns from env")
+    except json.JSONDecodeError:
+        # 단일 패턴이면 그냥 추가
+        SPAM_KEYWORD_PATTERNS.append(_extra_patterns)
+
+
+# ============================================================
+# 보이지 않는 문자 제거
+# ============================================================
+
+# 유니코드 "Format" 카테고리(Cf) 전체 → 삭제 (서버 시작 시 1회 생성)
+INVISIBLE_CHARS_TABLE: Dict[int, None] = {
+    cp: None for cp in range(sys.maxunicode + 1)
+    if unicodedata.category(chr(cp)) == 'Cf'
+}
+
+
+def strip_invisible_chars(text: str) -> str:
+    """
+    텍스트에서 보이지 않는/조작용 유니코드 문자를 모두 제거한다.
+    
+    제거 대상:
+      - Soft Hyphen (U+00AD)  ← 이번 스팸봇이 사용
+      - Zero-Width Space (U+200B)
+      - Zero-Width Non-Joiner (U+200C)
+      - Zero-Width Joiner (U+200D)
+      - Left/Right-to-Left marks (U+200E, U+200F)
+      - 기타 유니코드 "Format" 카테고리(Cf) 문자들
+    
+    Returns:
+        눈에 보이는 문자만 남긴 깨끗한 텍스트
+    """
+    return text.translate(INVISIBLE_CHARS_TABLE)
+
+
+# ============================================================
+# 매칭 엔진
+# ============================================================
+
+# `payathome\d*\.com` 처럼 "문자열 + 숫자 + 도메인" 형태
+_DOMAIN_PATTERN = re.compile(r'^([a-z0-9]+)\\d\*\\\.([a-z]{2,})$')
+# 정규식 메타문자가 없는 순수 문자열 패턴
+_LITERAL_PATTERN = re.compile(r'^[A-Za-z0-9 ]+$')
+# 합치면 번호가 바뀌는 역참조 / 중간에 둘 수 없는 전역 플래그
+_UNCOMBINABLE = re.compile(r'\\[1-9]|\(\?P=|^\(\?[aiLmsux]+\)')
+# 이스케이프(\S, \W 등)를 뺀 나머지에 대문자가 있는 패턴은 소문자 텍스트에 쓸 수 없음
+_ESCAPE = re.compile(r'\\.')
+
+_FLAGS = re.IGNORECASE | re.DOTALL
+
+
+def _has_uppercase_literal(pattern: str) -> bool:
+    return any(ch.isupper() for ch in _ESCAPE.sub('', pattern))
+
+
+def trie_regex(words: List[str]) -> str:
+    """문자열 목록을 공통 접두사를 공유하는 정규식으로 변환 (예: ab|ac → a(?:b|c))"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class SpamMatcher:
+    """
+    여러 스팸 패턴을 한 번의 스캔으로 검사하는 매처.
+    
+    그룹 이름으로 어떤 패턴이 걸렸는지 알 수 있다:
+    domain_<tld> (합쳐진 도메인 패턴), literal (순수 문자열), p<N> (N번째 정규식 패턴),
+    SCAN_INCOMPLETE (시간 예산 초과로 정규식 검사를 끝내지 못함)
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self.stats = {'scans': 0, 'matches': 0, 'truncated': 0, 'timeouts': 0, 'slowest_ms': 0.0}
+
+        domains: Dict[str, List[str]] = {}
+        literals: List[str] = []
+        trie_branches: List[str] = []
+        branches: List[str] = []
+        self.separate: List[Tuple[str, re.Pattern]] = []
+
+        for i, pat in enumerate(self.patterns):
+            try:
+                re.compile(pat, _FLAGS)
+            except re.error as e:
+                logger.warning(f"Invalid spam pattern skipped: {pat!r} ({e})")
+                continue
+
+            domain = _DOMAIN_PATTERN.match(pat)
+            if domain:
+                domains.setdefault(domain.group(2), []).append(domain.group(1))
+            elif _LITERAL_PATTERN.match(pat):
+                literals.append(pat)
+            elif _UNCOMBINABLE.search(pat) or _has_uppercase_literal(pat):
+                self.separate.append((f"p{i}", re.compile(pat, _FLAGS)))
+            else:
+                branches.append(f"(?P<p{i}>{pat})")
+
+        if literals:
+            trie_branches.append(f"(?P<literal>{trie_regex(literals)})")
+        for tld, stems in sorted(domains.items()):
+            trie_branches.append(f"(?P<domain_{tld}>{trie_regex(stems)}\\d*\\.{re.escape(tld)})")
+
+        # 합친 패턴은 소문자로 바꾼 텍스트에 대소문자 구분 모드로 실행:
+        # IGNORECASE를 빼야 sre의 첫 글자 필터가 동작해 2배가량 빠름
+        # 트라이 패턴: 백트래킹 없음 → 전체 텍스트를 한 번에 검사
+        self.trie: Optional[re.Pattern] = re.compile('|'.join(trie_branches), re.DOTALL) if trie_branches else None
+        # 나머지 정규식: 백트래킹 가능 → 윈도우 + 시간 예산
+        self.combined: Optional[re.Pattern] = re.compile('|'.join(branches), re.DOTALL) if branches else None
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> Optional[Tuple[str, str]]:
+        """
+        정리된 텍스트에서 스팸 패턴 검색.
+        
+        Returns:
+            (매칭된 문자열, 그룹 이름) 또는 None.
+            시간 예산을 넘기면 ('', SCAN_INCOMPLETE) — 통과시키지 말 것
+        """
+        started = time.perf_counter()
+        deadline = started + SPAM_SCAN_BUDGET_MS / 1000
+        self.stats['scans'] += 1
+
+        if len(text) > SPAM_MAX_FIELD_CHARS:
+            text = text[:SPAM_MAX_FIELD_CHARS]
+            self.stats['truncated'] += 1
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # 'İ'(U+0130)만 소문자 변환 시 2글자가 됨 → 위치가 원문과 같도록 먼저 치환
+            lowered = text.replace('\u0130', 'i').lower()
+        end = len(text)
+
+        result = None
+        if self.trie is not None:
+            match = self.trie.search(lowered)
+            if match:
+                result = text[match.start():match.end()], match.lastgroup
+
+        pos = 0
+        while result is None and pos < end and (self.combined is not None or self.separate):
+            window_end = min(end, pos + SPAM_SCAN_WINDOW)
+            result = self._search_window(text, lowered, pos, window_end)
+            if result or window_end >= end:
+                break
+            if time.perf_counter() > deadline:
+                self.stats['timeouts'] += 1
+                logger.warning(f"Spam scan time budget exceeded at {window_end}/{end} chars — treated as spam")
+                result = '', SCAN_INCOMPLETE
+                break
+            pos = window_end - SPAM_SCAN_OVERLAP
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > self.stats['slowest_ms']:
+            self.stats['slowest_ms'] = round(elapsed_ms, 3)
+        if result and result[1] != SCAN_INCOMPLETE:
+            self.stats['matches'] += 1
+        return result
+
+    def _search_window(self, text: str, lowered: str, pos: int, endpos: int) -> Optional[Tuple[str, str]]:
+        if self.combined is not None:
+            match = self.combined.search(lowered, pos, endpos)
+            if match:
+                return text[match.start():match.end()], match.lastgroup
+        for name, pattern in self.separate:
+            match = pattern.search(text, pos, endpos)
+            if match:
+                return match.group(0), name
+        return None
+
+
+SPAM_MATCHER = SpamMatcher(SPAM_KEYWORD_PATTERNS)
+
+
+def check_spam(text: str) -> Tuple[bool, Optional[str]]:
+    """
+    텍스트가 스팸인지 검사한다.
+    
+    1) 보이지 않는 문자를 벗겨냄
+    2) 스팸 키워드 패턴 매칭 (단일 스캔)
+    
+    시간 예산 안에 검사를 끝내지 못한 텍스트도 스팸으로 판정한다 (matched = '<scan incomplete>').
+    
+    Returns:
+        (is_spam, matched_pattern_or_None)
+    """
+    if not text:
+        return False, None
+    
+    found = SPAM_MATCHER.search(strip_invisible_chars(text))
+    if found:
+        return True, found[0] if found[1] != SCAN_INCOMPLETE else '<scan incomplete>'
+    
+    return False, None
+
+
+def check_content_for_spam(data: dict, content_type: str) -> Optional[Tuple]:
+    """
+    게시글/댓글/회원가입 데이터에서 텍스트 필드를 추출하여 스팸 검사.
+    
+    Args:
+        data: 요청 JSON 데이터
+        content_type: 'comment', 'post', 'register' 중 하나
+    
+    Returns:
+        None이면 스팸 아님, (field, matched) 튜플이면 스팸
+    """
+    fields_to_check = []
+    
+    if content_type == 'comment':
+        fields_to_check = ['content']
+    elif content_type == 'post':
+        fields_to_check = ['name', 'body', 'url']
+    elif content_type == 'register':
+        fields_to_check = ['username', 'answer']  # 가입 시 답변란도 검사
+    
+    for field in fields_to_check:
+        value = data.get(field)
+        if value and isinstance(value, str):
+            is_spam, matched = check_spam(value)
+            if is_spam:
+                return (field, matched)
+    
+    return None